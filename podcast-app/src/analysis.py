@@ -0,0 +1,118 @@
+import os
+import numpy as np
+from audio_io import open_audio, recording_size
+from meters import to_db, k_weighted_power, gated_loudness, LUFS_BLOCK
+from peaks import PeakPyramid, PeaksCancelled
+from regions import REGION_BLOCK, block_rms, find_regions
+
+# Datos técnicos de una grabación calculados en una sola pasada: formato,
+# tamaño, pico, sonoridad integrada, una miniatura de la forma de onda y
+# las regiones de voz y silencio (regions.py).
+# Se guardan en la base de datos (db.update_stats_many) para que la lista
+# y la vista de detalles no tengan que abrir el archivo de audio.
+
+THUMB_POINTS = 256          # pares (min, max) de la miniatura
+ANALYSIS_BLOCK = 65536      # frames por lectura
+
+
+def encode_thumb(mins, maxs):
+    """Miniatura a bytes (float16 intercalados): 1 KB para 256 puntos"""
+    return np.column_stack((mins, maxs)).astype('<f2').tobytes()
+
+
+def decode_thumb(data, samplerate, frames):
+    """Miniatura guardada -> PeakPyramid de un nivel lista para show_peaks()"""
+    pairs = np.frombuffer(data, dtype='<f2').reshape(-1, 2).astype(np.float32)
+    step = max(1, -(-frames // len(pairs))) if len(pairs) else 1
+    return PeakPyramid(samplerate, frames, [(pairs[:, 0].copy(), pairs[:, 1].copy())], base_block=step)
+
+
+def analyze(filename, thumb_points=THUMB_POINTS, cancelled=None):
+    """Recorre el archivo una vez y devuelve un dict con sus datos técnicos"""
+    mtime_ns = os.stat(filename).st_mtime_ns
+    with open_audio(filename) as audio:
+        samplerate, channels, frames = audio.samplerate, audio.channels, audio.frames
+        fmt, subtype = audio.format, audio.subtype
+        points = max(1, min(thumb_points, frames))
+        step = max(1, -(-frames // points))  # frames por punto de la miniatura
+        mins = np.full(points, np.inf, dtype=np.float32)
+        maxs = np.full(points, -np.inf, dtype=np.float32)
+        peak = 0.0
+
+        lufs_block = max(1, int(LUFS_BLOCK * samplerate))
+        rest = np.zeros((0, channels), dtype=np.float32)
+        powers = []
+
+        region_block = max(1, int(REGION_BLOCK * samplerate))
+        region_rest = np.zeros((0, channels), dtype=np.float32)
+        levels = []
+
+        pos = 0
+        for block in audio.blocks(ANALYSIS_BLOCK):
+            if cancelled is not None and cancelled():
+                raise PeaksCancelled()
+            n = len(block)
+            peak = max(peak, float(np.abs(block).max()) if n else 0.0)
+
+            # Miniatura: min/max de la mezcla mono por tramos de 'step' frames
+            mono = block.mean(axis=1) if channels > 1 else block[:, 0]
+            ids = (pos + np.arange(n)) // step
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+            np.minimum.at(mins, ids[starts], np.minimum.reduceat(mono, starts))
+            np.maximum.at(maxs, ids[starts], np.maximum.reduceat(mono, starts))
+            pos += n
+
+            # Potencia ponderada K por bloques de 100 ms (lo que sobra pasa al siguiente)
+            data = np.concatenate([rest, block]) if len(rest) else block
+            full = len(data) - len(data) % lufs_block
+            if full:
+                blocks = data[:full].reshape(-1, lufs_block, channels)
+                powers.append(k_weighted_power(blocks, samplerate).sum(axis=1))
+            rest = data[full:].copy()
+
+            # RMS por bloques para las regiones de voz y silencio
+            data = np.concatenate([region_rest, block]) if len(region_rest) else block
+            levels.append(block_rms(data, region_block))
+            region_rest = data[len(data) - len(data) % region_block:].copy()
+
+    # Puntos sin muestras (archivo más corto de lo que decía la cabecera)
+    mins[~np.isfinite(mins)] = 0.0
+    maxs[~np.isfinite(maxs)] = 0.0
+    loudness = gated_loudness(np.concatenate(powers)) if powers else None
+    regions = find_regions(to_db(np.concatenate(levels)), region_block / samplerate) if levels else []
+    if regions and samplerate:
+        # La última región llega hasta el final aunque el último bloque no esté completo
+        start, _end, kind = regions[-1]
+        regions[-1] = (start, frames / samplerate, kind)
+    return {
+        "samplerate": samplerate,
+        "channels": channels,
+        "frames": frames,
+        "duration": frames / samplerate if samplerate else None,
+        "format": fmt,
+        "subtype": subtype,
+        "file_size": recording_size(filename),
+        "mtime_ns": mtime_ns,
+        "peak": float(to_db(peak)),
+        "loudness": loudness,
+        "thumb": encode_thumb(mins, maxs),
+        "regions": regions,
+    }
+
+
+def describe(samplerate, channels, fmt, subtype, file_size, peak, loudness):
+    """Resumen legible de los datos técnicos (lo que falte se omite)"""
+    parts = []
+    if samplerate:
+        parts.append(f"{samplerate / 1000:g} kHz")
+    if channels:
+        parts.append({1: "mono", 2: "estéreo"}.get(channels, f"{channels} canales"))
+    if fmt:
+        parts.append(f"{fmt} {subtype}" if subtype else fmt)
+    if file_size is not None:
+        parts.append(f"{file_size / (1024 * 1024):.1f} MB")
+    if peak is not None:
+        parts.append(f"pico {peak:.1f} dBFS")
+    if loudness is not None:
+        parts.append(f"{loudness:.1f} LUFS")
+    return " · ".join(parts)
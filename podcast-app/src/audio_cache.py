@@ -0,0 +1,215 @@
+import os
+import hashlib
+import threading
+import traceback
+from collections import OrderedDict
+import numpy as np
+from audio_io import open_audio, MappedWav
+from peaks import cached_peaks, build_peaks, peaks_from_array, save_peaks, PeaksCancelled
+
+# Caché compartida (Player y WaveformWidget) de audio decodificado y de
+# pirámides de picos, con un presupuesto de bytes y expulsión LRU.
+# Las entradas se identifican por ruta y se invalidan si cambia el
+# mtime o el tamaño del archivo.
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DECODE_BLOCK = 65536
+
+
+def _signature(filename):
+    st = os.stat(filename)
+    return st.st_mtime_ns, st.st_size
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    # PeakPyramid
+    return sum(mins.nbytes + maxs.nbytes for mins, maxs in value.levels)
+
+
+class AudioCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, mmap_dir=None):
+        self.max_bytes = max_bytes
+        # Si se indica, el PCM se decodifica a un archivo .f32 en esa carpeta y
+        # se abre con np.memmap: la memoria la gestiona la caché del sistema
+        self.mmap_dir = mmap_dir
+        self._entries = OrderedDict()  # (tipo, ruta) -> (firma, valor, bytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entry_bytes(self):
+        # Una sola entrada no puede vaciar la caché entera
+        return self.max_bytes // 2
+
+    # ---------- Núcleo LRU ----------
+
+    def _lookup(self, kind, filename):
+        key = (kind, os.path.abspath(filename))
+        signature = _signature(filename)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != signature:
+                # El archivo cambió: la entrada ya no vale
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _store(self, kind, filename, value, signature):
+        nbytes = _nbytes(value)
+        if nbytes > self.max_entry_bytes:
+            return
+        key = (kind, os.path.abspath(filename))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (signature, value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _sig, _value, nbytes = self._entries.pop(key)
+        self.bytes -= nbytes
+
+    def invalidate(self, filename):
+        path = os.path.abspath(filename)
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == path]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    # ---------- Audio decodificado ----------
+
+    def pcm_bytes(self, filename):
+        """Lo que ocuparía el archivo decodificado en float32"""
+        with open_audio(filename) as audio:
+            return audio.frames * audio.channels * 4
+
+    def lookup_pcm(self, filename):
+        """Audio (frames x canales, float32) si ya está en caché; si no, None"""
+        return self._lookup("pcm", filename)
+
+    def fits(self, filename):
+        return self.pcm_bytes(filename) <= self.max_entry_bytes
+
+    def get_pcm(self, filename, cancelled=None):
+        """Audio decodificado en float32 (de la caché o leyéndolo ahora)"""
+        data = self._lookup("pcm", filename)
+        if data is not None:
+            return data
+        signature = _signature(filename)
+        audio = open_audio(filename)
+        if isinstance(audio, MappedWav) and audio.is_float:
+            # WAV float32: el propio mapeo ya es el PCM, no hay nada que decodificar
+            data = audio.data
+        elif self.mmap_dir:
+            data = self._decode_mmap(audio, signature, cancelled)
+        else:
+            data = self._decode(audio, cancelled)
+        self._store("pcm", filename, data, signature)
+        return data
+
+    def _decode_into(self, audio, data, cancelled):
+        """Decodifica por bloques directamente sobre data; devuelve los frames leídos"""
+        with audio:
+            pos = 0
+            while pos < len(data):
+                if cancelled is not None and cancelled():
+                    raise PeaksCancelled()
+                n = len(audio.read(pos, pos + DECODE_BLOCK, out=data[pos:pos + DECODE_BLOCK]))
+                if n == 0:
+                    break
+                pos += n
+        return pos
+
+    def _decode(self, audio, cancelled):
+        data = np.empty((audio.frames, audio.channels), dtype=np.float32)
+        return data[:self._decode_into(audio, data, cancelled)]
+
+    def _decode_mmap(self, audio, signature, cancelled):
+        os.makedirs(self.mmap_dir, exist_ok=True)
+        tag = f"{os.path.abspath(audio.filename)}|{signature[0]}|{signature[1]}"
+        path = os.path.join(self.mmap_dir, hashlib.sha1(tag.encode()).hexdigest() + ".f32")
+        shape = (audio.frames, audio.channels)
+        if os.path.exists(path):
+            audio.close()
+        else:
+            tmp = path + ".tmp"
+            out = np.memmap(tmp, dtype=np.float32, mode='w+', shape=shape)
+            try:
+                self._decode_into(audio, out, cancelled)
+                out.flush()
+            except BaseException as error:
+                # Sin esto el .tmp a tamaño completo se queda para siempre en mmap_dir.
+                # Antes de borrarlo se suelta el mapeo, también el que guarda la
+                # traza (en Windows no se puede borrar un archivo mapeado)
+                traceback.clear_frames(error.__traceback__)
+                del out
+                os.remove(tmp)
+                raise
+            del out
+            os.replace(tmp, path)
+        return np.memmap(path, dtype=np.float32, mode='r', shape=shape)
+
+    # ---------- Pirámides de picos ----------
+
+    def lookup_peaks(self, filename):
+        """Pirámide en memoria o en disco (sin calcular nada); si no hay, None"""
+        peaks = self._lookup("peaks", filename)
+        if peaks is None:
+            peaks = cached_peaks(filename)
+            if peaks is not None:
+                self._store("peaks", filename, peaks, _signature(filename))
+        return peaks
+
+    def get_peaks(self, filename, cancelled=None):
+        peaks = self.lookup_peaks(filename)
+        if peaks is not None:
+            return peaks
+        signature = _signature(filename)
+        if self.fits(filename):
+            # Decodificamos una sola vez: el mismo PCM lo usará el reproductor
+            data = self.get_pcm(filename, cancelled)
+            with open_audio(filename) as audio:
+                samplerate = audio.samplerate
+            peaks = peaks_from_array(data, samplerate, cancelled)
+        else:
+            peaks = build_peaks(filename, cancelled)
+        save_peaks(filename, peaks)
+        self._store("peaks", filename, peaks, signature)
+        return peaks
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Caché de audio de todo el proceso"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache()
+        return _cache
+
+
+def configure_cache(max_bytes=DEFAULT_MAX_BYTES, mmap_dir=None):
+    """Cambia el presupuesto (y la carpeta de mmap); vacía la caché actual"""
+    global _cache
+    with _cache_lock:
+        _cache = AudioCache(max_bytes, mmap_dir)
+        return _cache
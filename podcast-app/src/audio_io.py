@@ -0,0 +1,269 @@
+import os
+import json
+import struct
+from abc import ABC, abstractmethod
+import numpy as np
+import soundfile as sf
+
+# Acceso aleatorio a grabaciones.
+# Los WAV sin comprimir (PCM 8/16/24/32 bits o float32) se abren con
+# np.memmap sobre la sección de datos: abrir un archivo de varios GB no lee
+# nada, solo se cargan (y se comparten en la caché del sistema) las páginas
+# que se tocan. El resto de formatos se decodifican por bloques con SoundFile.
+# Una grabación por tramos (ver segments.py) se abre como un único flujo
+# continuo a partir de su manifiesto.
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+MANIFEST_SUFFIX = ".segments.json"
+
+
+class NotMappable(Exception):
+    """El archivo no es un WAV PCM/float que se pueda mapear directamente"""
+
+
+def _parse_wav(filename):
+    """Devuelve (formato, canales, samplerate, bits, offset_datos, bytes_datos)"""
+    file_size = os.path.getsize(filename)
+    with open(filename, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            raise NotMappable(filename)
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                break
+            chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+            start = f.tell()
+            if chunk_id == b'fmt ':
+                body = f.read(size)
+                tag, channels, samplerate, _byterate, _align, bits = struct.unpack('<HHIIHH', body[:16])
+                if tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    tag = struct.unpack('<H', body[24:26])[0]  # 2 primeros bytes del GUID
+                fmt = (tag, channels, samplerate, bits)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise NotMappable(filename)
+                # Si la cabecera no se cerró (grabación cortada) usamos lo que haya en disco
+                available = file_size - start
+                if size == 0xFFFFFFFF or size > available or size == 0:
+                    size = available
+                return fmt + (start, size)
+            f.seek(start + size + (size & 1))
+    raise NotMappable(filename)
+
+
+class AudioReader(ABC):
+    """Interfaz común: samplerate, channels, frames y read(start, stop) en float32"""
+
+    @abstractmethod
+    def read(self, start, stop, out=None):
+        """Frames [start, stop) como float32 (frames x canales), en 'out' si se da"""
+
+    def blocks(self, blocksize, start=0, stop=None):
+        """Recorre [start, stop) en bloques float32 (frames x canales)"""
+        stop = self.frames if stop is None else min(stop, self.frames)
+        for pos in range(start, stop, blocksize):
+            yield self.read(pos, min(pos + blocksize, stop))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MappedWav(AudioReader):
+    """Vista sin copia (np.memmap) de los datos de un WAV sin comprimir"""
+
+    def __init__(self, filename):
+        tag, channels, samplerate, bits, offset, size = _parse_wav(filename)
+        if tag == WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+            sample_bytes = bits // 8
+        elif tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+            sample_bytes = 4
+        else:
+            raise NotMappable(filename)
+        self.filename = filename
+        self.samplerate = samplerate
+        self.channels = channels
+        self.bits = bits
+        self.is_float = tag == WAVE_FORMAT_IEEE_FLOAT
+        self.format = "WAV"
+        self.subtype = "FLOAT" if self.is_float else {8: "PCM_U8", 16: "PCM_16", 24: "PCM_24", 32: "PCM_32"}[bits]
+        self.frames = size // (sample_bytes * channels)
+        if self.frames == 0:
+            self._raw = np.zeros((0, channels), dtype=np.float32)
+        elif bits == 24:
+            # No hay tipo de 24 bits: bytes sueltos y se montan al leer
+            self._raw = np.memmap(filename, dtype=np.uint8, mode='r', offset=offset,
+                                  shape=(self.frames, channels, 3))
+        else:
+            dtype = {8: np.uint8, 16: '<i2', 32: '<f4' if self.is_float else '<i4'}[bits]
+            self._raw = np.memmap(filename, dtype=dtype, mode='r', offset=offset,
+                                  shape=(self.frames, channels))
+
+    @property
+    def data(self):
+        """Los datos tal cual están en disco (int16, int32, float32...) sin copiar"""
+        return self._raw
+
+    def read(self, start, stop, out=None):
+        start = max(0, start)
+        stop = min(stop, self.frames)
+        n = max(0, stop - start)
+        if out is None:
+            out = np.empty((n, self.channels), dtype=np.float32)
+        else:
+            out = out[:n]
+        raw = self._raw[start:stop]
+        if self.is_float:
+            out[:] = raw
+        elif self.bits == 16:
+            np.multiply(raw, 1 / 32768.0, out=out, casting='unsafe')
+        elif self.bits == 32:
+            np.multiply(raw, 1 / 2147483648.0, out=out, casting='unsafe')
+        elif self.bits == 8:
+            # 8 bits sin signo, centrado en 128
+            np.multiply(raw, 1 / 128.0, out=out, casting='unsafe')
+            out -= 1.0
+        else:
+            # 24 bits little endian: el byte alto (con signo) va desplazado 16
+            value = raw[..., 2].astype(np.int8).astype(np.int32) << 16
+            value |= raw[..., 1].astype(np.int32) << 8
+            value |= raw[..., 0]
+            np.multiply(value, 1 / 8388608.0, out=out, casting='unsafe')
+        return out
+
+    def close(self):
+        mm = getattr(self._raw, '_mmap', None)
+        self._raw = None
+        if mm is not None:
+            mm.close()
+
+
+class BlockAudio(AudioReader):
+    """Formatos comprimidos (FLAC, OGG...): se decodifica por bloques con SoundFile"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._f = sf.SoundFile(filename)
+        self.samplerate = self._f.samplerate
+        self.channels = self._f.channels
+        self.frames = self._f.frames
+        self.format = self._f.format
+        self.subtype = self._f.subtype
+
+    def read(self, start, stop, out=None):
+        start = max(0, start)
+        n = max(0, min(stop, self.frames) - start)
+        if out is None:
+            out = np.empty((n, self.channels), dtype=np.float32)
+        if self._f.tell() != start:
+            self._f.seek(start)
+        return self._f.read(out=out[:n])
+
+    def close(self):
+        self._f.close()
+
+
+def repair_wav_header(filename):
+    """Reescribe los tamaños RIFF y data según lo que hay en disco (tras un corte)"""
+    _tag, _channels, _samplerate, _bits, offset, size = _parse_wav(filename)
+    with open(filename, 'r+b') as f:
+        f.seek(4)
+        f.write(struct.pack('<I', min(offset + size - 8, 0xFFFFFFFF)))
+        f.seek(offset - 4)
+        f.write(struct.pack('<I', min(size, 0xFFFFFFFF)))
+
+
+# ---------- Grabaciones por tramos ----------
+
+def is_manifest(filename):
+    return filename.endswith(MANIFEST_SUFFIX)
+
+
+def load_manifest(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def segment_files(filename):
+    """Rutas de los tramos de una grabación (o [filename] si es un archivo normal)"""
+    if not is_manifest(filename):
+        return [filename]
+    base = os.path.dirname(filename)
+    return [os.path.join(base, seg["file"]) for seg in load_manifest(filename)["segments"]]
+
+
+def recording_size(filename):
+    """Bytes en disco de la grabación, sumando todos sus tramos"""
+    return sum(os.path.getsize(path) for path in segment_files(filename) if os.path.exists(path))
+
+
+class SegmentedAudio(AudioReader):
+    """Los tramos de una grabación leídos como un único flujo continuo"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._parts = []
+        try:
+            for path in segment_files(filename):
+                if os.path.exists(path):
+                    self._parts.append(open_audio(path))
+        except BaseException:
+            self.close()
+            raise
+        if not self._parts:
+            raise ValueError(f"Grabación sin tramos: {filename}")
+        first = self._parts[0]
+        self.samplerate = first.samplerate
+        self.channels = first.channels
+        self.format = first.format
+        self.subtype = first.subtype
+        # Frames reales de cada tramo (el manifiesto puede ir por detrás tras un corte)
+        self._starts = np.cumsum([0] + [part.frames for part in self._parts])
+        self.frames = int(self._starts[-1])
+
+    def read(self, start, stop, out=None):
+        start = max(0, start)
+        stop = min(stop, self.frames)
+        n = max(0, stop - start)
+        if out is None:
+            out = np.empty((n, self.channels), dtype=np.float32)
+        else:
+            out = out[:n]
+        first = int(np.searchsorted(self._starts, start, side='right')) - 1
+        pos = start
+        for i in range(max(first, 0), len(self._parts)):
+            if pos >= stop:
+                break
+            offset = int(self._starts[i])
+            end = min(stop, int(self._starts[i + 1]))
+            if end > pos:
+                self._parts[i].read(pos - offset, end - offset, out=out[pos - start:end - start])
+                pos = end
+        return out
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        self._parts = []
+
+
+def open_audio(filename):
+    """MappedWav si el archivo se puede mapear; si no, BlockAudio.
+
+    Un manifiesto de tramos se abre como SegmentedAudio.
+    """
+    if is_manifest(filename):
+        return SegmentedAudio(filename)
+    try:
+        return MappedWav(filename)
+    except NotMappable:
+        return BlockAudio(filename)
@@ -0,0 +1,163 @@
+import threading
+import numpy as np
+from ringbuffer import RingBuffer
+from audio_io import open_audio
+
+# Lectura de audio en streaming para la reproducción: el archivo se abre con
+# open_audio (WAV mapeado en memoria o decodificación por bloques) y se va
+# leyendo poco a poco, nunca entero en memoria.
+
+
+class FileSource:
+    """Fuente que lee un archivo por bloques a partir de una posición.
+
+    audio: un AudioReader ya abierto (p.ej. edits.EditedAudio) en lugar del archivo.
+    """
+
+    def __init__(self, filename, audio=None):
+        self._audio = audio if audio is not None else open_audio(filename)
+        self.samplerate = self._audio.samplerate
+        self.channels = self._audio.channels
+        self.frames = self._audio.frames
+        self._pos = 0
+
+    def read_into(self, out):
+        """Rellena out (frames x canales, float32); devuelve los frames leídos"""
+        n = len(self._audio.read(self._pos, self._pos + len(out), out=out))
+        self._pos += n
+        return n
+
+    def seek(self, frame):
+        self._pos = max(0, min(int(frame), self.frames))
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._audio.close()
+
+
+class ArraySource:
+    """Lector sobre audio ya decodificado en memoria (p.ej. desde la caché).
+
+    Tiene la misma interfaz que PrefetchReader: copiar de un array es
+    instantáneo, así que no necesita hilo ni buffer intermedio.
+    """
+
+    def __init__(self, data, samplerate):
+        self._data = data
+        self.samplerate = samplerate
+        self.channels = data.shape[1]
+        self.frames = len(data)
+        self.position = 0
+        self.underruns = 0
+
+    @property
+    def eof(self):
+        return self.position >= self.frames
+
+    @property
+    def finished(self):
+        return self.eof
+
+    def seek(self, frame):
+        self.position = max(0, min(int(frame), self.frames))
+
+    def tell(self):
+        return self.position
+
+    def read_into(self, out):
+        start = self.position
+        n = max(0, min(len(out), self.frames - start))
+        out[:n] = self._data[start:start + n]
+        out[n:] = 0
+        self.position = start + n
+        return n
+
+    def close(self):
+        self._data = None
+
+
+class PrefetchReader:
+    """Lee por adelantado en un hilo y deja los bloques en un buffer circular.
+
+    El callback de audio solo copia del buffer (read_into), así nunca espera
+    al disco ni al decodificador (tampoco a los fallos de página de un WAV
+    mapeado: los provoca este hilo).
+    """
+
+    def __init__(self, source, blocksize=8192, buffer_seconds=1.0):
+        self.source = source
+        self.samplerate = source.samplerate
+        self.channels = source.channels
+        self.frames = source.frames
+        capacity = max(int(buffer_seconds * source.samplerate), blocksize * 2)
+        self._ring = RingBuffer(capacity, source.channels)
+        self._block = np.zeros((blocksize, source.channels), dtype='float32')
+        self._wake = threading.Event()
+        # El lock solo protege el buffer frente a un seek; las copias son cortas
+        self._lock = threading.Lock()
+        self._generation = 0     # cambia en cada seek: descarta lecturas viejas
+        self._seek_to = None     # seek pendiente que aplicará el hilo lector
+        self.position = source.tell()  # siguiente frame que entregará read_into
+        self._closed = False
+        self.eof = False
+        self.underruns = 0  # veces que el callback se quedó sin datos
+        self._thread = threading.Thread(target=self._prefetch_thread, daemon=True)
+        self._thread.start()
+
+    @property
+    def finished(self):
+        """True cuando ya se ha entregado todo el archivo"""
+        return self.eof and self._ring.readable() == 0
+
+    def seek(self, frame):
+        """Mueve la lectura sin parar el stream: vacía el buffer y avisa al hilo"""
+        frame = max(0, min(int(frame), self.frames))
+        with self._lock:
+            self._generation += 1
+            self._seek_to = frame
+            self._ring.clear()
+            self.position = frame
+            self.eof = False
+        self._wake.set()
+
+    def _prefetch_thread(self):
+        while not self._closed:
+            with self._lock:
+                generation = self._generation
+                seek_to, self._seek_to = self._seek_to, None
+                full = self.eof or self._ring.writable() < len(self._block)
+            if seek_to is not None:
+                self.source.seek(seek_to)
+            elif full:
+                # Buffer lleno (o fin de archivo): esperamos a que el callback consuma
+                self._wake.wait(0.05)
+                self._wake.clear()
+                continue
+            n = self.source.read_into(self._block)
+            with self._lock:
+                if generation != self._generation:
+                    continue  # Hubo un seek mientras leíamos: bloque obsoleto
+                if n:
+                    self._ring.write(self._block[:n])
+                if n < len(self._block):
+                    self.eof = True
+
+    def read_into(self, out):
+        """Llamado desde el callback de audio. Lo que falte se rellena con silencio"""
+        with self._lock:
+            n = self._ring.read_into(out)
+            self.position += n
+        if n < len(out):
+            out[n:] = 0
+            if not self.eof:
+                self.underruns += 1
+        self._wake.set()
+        return n
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.source.close()
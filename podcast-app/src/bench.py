@@ -0,0 +1,438 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+# Banco de pruebas de rendimiento, reproducible y sin tarjeta de sonido ni
+# pantalla: Qt en modo offscreen y el sounddevice de mentira de las pruebas
+# (tests/fake_sounddevice.py), que genera la entrada y consume la salida sin
+# PortAudio.
+#
+#   python bench.py                        todo, comparando con bench_baseline.json
+#   python bench.py --quick player export  solo esos casos, con archivos cortos
+#   python bench.py --save-baseline        guarda los resultados como referencia
+#
+# Los archivos WAV/FLAC sintéticos y las bases de datos de prueba se generan
+# una vez en --data y se reutilizan. Cada caso corre en un proceso nuevo, así
+# que el pico de RSS es solo suyo. El tiempo es el mejor de --repeat vueltas
+# y la memoria de Python (tracemalloc, incluye numpy) se mide en una vuelta
+# aparte para no falsear los tiempos.
+#
+# bench_baseline.json no está en el repositorio: los tiempos dependen de la
+# máquina, así que cada uno se hace la suya. La primera vez hay que correr
+# con --save-baseline (sin referencia solo se informa, no se compara) y
+# volver a guardarla cuando un cambio mejore los números a propósito.
+
+SAMPLERATE = 44100
+LENGTHS = (30, 300, 1800)          # segundos de audio de los archivos de prueba
+QUICK_LENGTHS = (10, 60)
+CATALOG_SIZES = (1000, 10000, 100000)
+QUICK_CATALOG_SIZES = (1000, 10000)
+SEEKS = 20                         # saltos por archivo en el caso del reproductor
+RECORD_SPEED = 50.0                # la entrada de mentira va 50 veces más rápido que el tiempo real
+TOLERANCE = 0.25                   # +25 % respecto a la referencia = regresión
+MIN_SECONDS_DELTA = 0.005          # diferencias menores son ruido
+MIN_ALLOC_DELTA = 1.0              # MB
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+
+
+# ---------- sounddevice de mentira ----------
+
+def _fake_sounddevice():
+    """El mismo sounddevice de mentira que las pruebas (tests/fake_sounddevice.py)"""
+    if TESTS not in sys.path:
+        sys.path.insert(0, TESTS)
+    import fake_sounddevice
+    return fake_sounddevice
+
+
+# ---------- Datos de prueba ----------
+
+def _fixture(data, seconds, kind):
+    """WAV float32 (como graba Recorder) o FLAC de 16 bits de 'seconds' segundos, generado por bloques"""
+    import numpy as np
+    import soundfile as sf
+    ext, fmt, subtype = {"wav": (".wav", "WAV", "FLOAT"), "flac": (".flac", "FLAC", "PCM_16")}[kind]
+    path = os.path.join(data, f"bench_{seconds}s{ext}")
+    if os.path.exists(path):
+        return path
+    tmp = path + ".part"
+    frames = seconds * SAMPLERATE
+    with sf.SoundFile(tmp, mode='w', samplerate=SAMPLERATE, channels=1, format=fmt, subtype=subtype) as f:
+        for i, start in enumerate(range(0, frames, 60 * SAMPLERATE)):
+            n = min(60 * SAMPLERATE, frames - start)
+            f.write(_fake_sounddevice().speech_like(np.random.default_rng(i), n, SAMPLERATE))
+    os.replace(tmp, path)
+    return path
+
+
+def _catalog(data, rows):
+    """Base de datos con 'rows' grabaciones inventadas (títulos y descripciones para FTS)"""
+    from db import RecordingRepository
+    path = os.path.join(data, f"bench_catalog_{rows}.db")
+    if os.path.exists(path):
+        return path
+    tmp = path + ".part"
+    for leftover in (tmp, tmp + "-wal", tmp + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    words = ("entrevista", "tertulia", "noticias", "música", "deportes", "ciencia", "cine", "historia")
+    repo = RecordingRepository(tmp)
+    repo.init_schema()
+    batch = 10000
+    for first in range(0, rows, batch):
+        repo.add_many(
+            (f"grabaciones/rec_{i:07d}.wav", f"Episodio {i} de {words[i % len(words)]}",
+             f"Programa {i} sobre {words[i % 7]} y {words[i % 5]}", 60.0 + i % 3600)
+            for i in range(first, min(rows, first + batch))
+        )
+    repo.connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    repo.close()
+    os.replace(tmp, path)
+    return path
+
+
+# ---------- Medidas ----------
+
+def _peak_rss_mb():
+    """Pico de memoria residente del proceso (MB); None si aquí no se sabe medir"""
+    try:
+        import resource
+    except ImportError:
+        return _peak_working_set_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024  # bytes en macOS, KB en Linux
+
+
+def _peak_working_set_mb():
+    """Windows: PeakWorkingSetSize de GetProcessMemoryInfo"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+    except ImportError:
+        return None
+
+    class Counters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")
+        ]
+    counters = Counters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        ok = ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+    except AttributeError:
+        return None
+    return counters.PeakWorkingSetSize / 2 ** 20 if ok else None
+
+
+def _measure(func, repeat, setup=None):
+    """Mejor tiempo de 'repeat' vueltas de func() y pico de tracemalloc en una vuelta más.
+
+    setup() se llama antes de cada vuelta, fuera del tiempo. Lo que devuelva
+    func() en la última vuelta cronometrada, si es un dict, se añade al resultado.
+    """
+    times = []
+    extra = None
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        extra = func()
+        times.append(time.perf_counter() - started)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result = {"seconds": min(times), "alloc_mb": peak / 2 ** 20, "rss_mb": _peak_rss_mb()}
+    if isinstance(extra, dict):
+        result.update(extra)
+    return result
+
+
+# ---------- Casos (cada uno en su propio proceso) ----------
+
+def bench_player(data, lengths, repeat):
+    """Player.load hasta tener el primer bloque para la tarjeta, y latencia de seek"""
+    import numpy as np
+    from audio_cache import configure_cache
+    from player import Player
+    results = {}
+    rng = np.random.default_rng(1)
+    for seconds in lengths:
+        for kind in ("wav", "flac"):
+            path = _fixture(data, seconds, kind)
+            player = Player()
+            buf = np.zeros((player.blocksize, 1), dtype=np.float32)
+
+            def first_block():
+                # Lo que tardaría el callback en recibir un bloque completo (no silencio)
+                while player._reader.read_into(buf) < len(buf):
+                    time.sleep(0.0001)
+
+            def load():
+                player.load(path)
+                first_block()
+                player.close()
+
+            results[f"player.load {kind} {seconds}s"] = _measure(load, repeat, setup=configure_cache)
+
+            positions = rng.uniform(0, seconds * 0.95, SEEKS)
+
+            def seeks():
+                for position in positions:
+                    player.seek(position)
+                    first_block()
+
+            player.load(path)
+            result = _measure(seeks, repeat)
+            player.close()
+            result["seconds"] /= SEEKS
+            results[f"player.seek {kind} {seconds}s"] = result
+    return results
+
+
+def bench_waveform(data, lengths, repeat):
+    """WaveformWidget.plot_file: sin caché, con la caché en disco (.peaks.npz) y en memoria"""
+    from PySide6.QtWidgets import QApplication
+    from audio_cache import configure_cache
+    from peaks import sidecar_path
+    from waveform_widget import WaveformWidget
+    app = QApplication.instance() or QApplication([])
+    wave = WaveformWidget()
+    wave.resize(1200, 300)
+    wave.show()
+    app.processEvents()
+    results = {}
+    for seconds in lengths:
+        path = _fixture(data, seconds, "wav")
+
+        def cold():
+            if os.path.exists(sidecar_path(path)):
+                os.remove(sidecar_path(path))
+            configure_cache()
+
+        def plot():
+            wave.plot_file(path)
+            app.processEvents()
+
+        results[f"waveform.plot_file cold {seconds}s"] = _measure(plot, repeat, setup=cold)
+        results[f"waveform.plot_file disk {seconds}s"] = _measure(plot, repeat, setup=configure_cache)
+        results[f"waveform.plot_file memory {seconds}s"] = _measure(plot, repeat)
+    wave.close()
+    return results
+
+
+def bench_recorder(data, lengths, repeat):
+    """Recorder con entrada de mentira a RECORD_SPEED x tiempo real: codificación y pérdidas"""
+    from recorder import Recorder
+    results = {}
+    seconds = min(lengths[-1], 300)
+    out = os.path.join(data, "out")
+    os.makedirs(out, exist_ok=True)
+    stream = _fake_sounddevice().FakeStream
+    stream.speed = RECORD_SPEED
+    stream.input_frames = seconds * SAMPLERATE
+    try:
+        for fmt in ("wav", "flac", "ogg"):
+            stats = {}
+
+            def record():
+                rec = Recorder(os.path.join(out, "bench_rec"), samplerate=SAMPLERATE, file_format=fmt)
+                rec.start()
+                deadline = time.monotonic() + seconds * 2
+                while rec.encoded_frames + rec.overflows < seconds * SAMPLERATE and time.monotonic() < deadline:
+                    time.sleep(0.005)
+                rec.stop()
+                stats.update(overflows=rec.overflows, max_fill=rec.max_fill,
+                             encoder_load=rec.encoder_load)
+                return {"x_realtime": seconds / max(rec.encode_seconds, 1e-9)}
+
+            result = _measure(record, repeat)
+            result.update(stats)
+            results[f"recorder.write {fmt} {seconds}s"] = result
+    finally:
+        stream.speed = 1.0
+        stream.input_frames = None
+    return results
+
+
+def bench_catalog(data, sizes, repeat):
+    """list_recordings y la carga de la lista (primera página y entera) según el tamaño del catálogo"""
+    from PySide6.QtWidgets import QApplication
+    from catalog_model import RecordingListModel, PAGE_SIZE
+    from db import RecordingRepository
+    QApplication.instance() or QApplication([])
+    results = {}
+    for rows in sizes:
+        repo = RecordingRepository(_catalog(data, rows))
+        repo.init_schema()
+        model = RecordingListModel(repo)
+
+        def load_list(pages=None):
+            # Lo que hace MainWindow.load_list y después la vista al ir bajando
+            model.reload()
+            while model.canFetchMore() and (pages is None or model.rowCount() < pages * PAGE_SIZE):
+                model.fetchMore()
+
+        results[f"catalog.list_recordings {rows}"] = _measure(repo.list, repeat)
+        results[f"catalog.load_list first page {rows}"] = _measure(lambda: load_list(1), repeat)
+        results[f"catalog.load_list all {rows}"] = _measure(load_list, repeat)
+        results[f"catalog.search {rows}"] = _measure(lambda: repo.search("tertulia música"), repeat)
+        repo.close()
+    return results
+
+
+def bench_export(data, lengths, repeat):
+    """exporter.transcode a FLAC desde el WAV float32 de la grabación"""
+    from exporter import transcode
+    out = os.path.join(data, "out")
+    os.makedirs(out, exist_ok=True)
+    results = {}
+    for seconds in lengths:
+        src = _fixture(data, seconds, "wav")
+        dst = os.path.join(out, f"bench_{seconds}s.flac")
+
+        def export():
+            info = transcode(src, dst, "flac")
+            return {"src_mb": info["src_bytes"] / 2 ** 20}
+
+        result = _measure(export, repeat)
+        result["x_realtime"] = seconds / result["seconds"]
+        result["mb_per_s"] = result["src_mb"] / result["seconds"]
+        results[f"export.flac {seconds}s"] = result
+    return results
+
+
+CASES = {
+    "player": bench_player,
+    "waveform": bench_waveform,
+    "recorder": bench_recorder,
+    "catalog": bench_catalog,
+    "export": bench_export,
+}
+
+
+def _run_case(name, data, quick, repeat):
+    """Se ejecuta en un proceso nuevo (spawn): nada de lo cargado antes cuenta"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    _fake_sounddevice().install()
+    if name == "catalog":
+        sizes = QUICK_CATALOG_SIZES if quick else CATALOG_SIZES
+    else:
+        sizes = QUICK_LENGTHS if quick else LENGTHS
+    return CASES[name](data, sizes, repeat)
+
+
+# ---------- Referencia e informe ----------
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Regresiones: [(nombre, métrica, referencia, ahora)] de tiempo o memoria por encima de la tolerancia"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, min_delta in (("seconds", MIN_SECONDS_DELTA), ("alloc_mb", MIN_ALLOC_DELTA)):
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > min_delta:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def _format_seconds(seconds):
+    return f"{seconds * 1000:9.2f} ms" if seconds < 1 else f"{seconds:9.3f} s "
+
+
+def report(results, baseline):
+    width = max([len(name) for name in results] + [10])
+    print(f"{'caso':<{width}}  {'tiempo':>12} {'vs ref':>7}  {'python':>9}  {'rss':>8}  extra")
+    for name, result in results.items():
+        base = baseline.get(name, {}).get("seconds")
+        change = f"{(result['seconds'] / base - 1) * 100:+6.0f}%" if base else "      -"
+        rss = f"{result['rss_mb']:6.0f}MB" if result.get("rss_mb") is not None else "       -"
+        extra = "  ".join(f"{key}={value:.3g}" if isinstance(value, float) else f"{key}={value}"
+                          for key, value in result.items()
+                          if key not in ("seconds", "alloc_mb", "rss_mb"))
+        print(f"{name:<{width}}  {_format_seconds(result['seconds'])} {change}  "
+              f"{result['alloc_mb']:7.1f}MB  {rss}  {extra}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench.py", description="Banco de pruebas de rendimiento")
+    parser.add_argument("cases", nargs="*", help=f"casos: {', '.join(CASES)} (por defecto todos)")
+    parser.add_argument("--quick", action="store_true", help="archivos y catálogos pequeños")
+    parser.add_argument("--repeat", type=int, default=None, help="vueltas por medida (3 con --quick, si no 5)")
+    parser.add_argument("--data", default=os.path.join(tempfile.gettempdir(), "podcast_bench"),
+                        help="carpeta de los datos de prueba (por defecto %(default)s)")
+    parser.add_argument("--baseline", default=BASELINE, help="referencia (por defecto %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="guardar estos resultados como referencia")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="margen antes de avisar (0.25 = 25 %%)")
+    parser.add_argument("--json", help="escribir también los resultados en este archivo")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"casos desconocidos: {', '.join(unknown)}")
+    cases = args.cases or list(CASES)
+    repeat = args.repeat or (3 if args.quick else 5)
+    os.makedirs(args.data, exist_ok=True)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name in cases:
+        print(f"[{name}] ...", file=sys.stderr, flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results.update(pool.submit(_run_case, name, args.data, args.quick, repeat).result())
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    report(results, baseline)
+
+    document = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "repeat": repeat,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=1)
+    if args.save_baseline:
+        # Se mezcla con la referencia anterior: guardar solo unos casos no borra los demás
+        document["results"] = dict(baseline, **results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=1)
+        print(f"Referencia guardada en {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, old, new in regressions:
+        print(f"REGRESIÓN {name}: {metric} {old:.4g} -> {new:.4g} ({(new / old - 1) * 100:+.0f}%)")
+    if not baseline:
+        print("Sin referencia: usa --save-baseline para guardar una")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
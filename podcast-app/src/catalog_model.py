@@ -0,0 +1,150 @@
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+# Modelo perezoso para la lista de grabaciones: pide a la base de datos
+# páginas de PAGE_SIZE filas solo cuando la vista llega al final (fetchMore)
+# y actualiza filas sueltas en vez de reconstruir toda la lista.
+# Con un texto de búsqueda activo las páginas salen del índice FTS5.
+
+PAGE_SIZE = 200
+
+# Columnas de las filas que devuelve el repositorio (db.RECORD_COLUMNS)
+(COL_ID, COL_TITLE, COL_FILENAME, COL_DESCRIPTION, COL_CREATED, COL_DURATION,
+ COL_SAMPLERATE, COL_CHANNELS, COL_FORMAT, COL_SUBTYPE, COL_FILE_SIZE, COL_PEAK,
+ COL_LOUDNESS) = range(13)
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def record_details(row):
+    """Resumen técnico de una fila (sin abrir el archivo)"""
+    from analysis import describe  # numpy y soundfile: no hacen falta para pintar la lista
+    return describe(row[COL_SAMPLERATE], row[COL_CHANNELS], row[COL_FORMAT], row[COL_SUBTYPE],
+                    row[COL_FILE_SIZE], row[COL_PEAK], row[COL_LOUDNESS])
+
+
+class RecordingListModel(QAbstractListModel):
+    FilenameRole = Qt.UserRole
+    RecordRole = Qt.UserRole + 1
+
+    def __init__(self, repo, parent=None):
+        super().__init__(parent)
+        self.repo = repo
+        self._rows = []
+        self._by_filename = {}
+        self._has_more = True
+        self._query = ""
+
+    # ---------- Interfaz de Qt ----------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            title = row[COL_TITLE] if row[COL_TITLE] else row[COL_FILENAME]
+            duration = format_duration(row[COL_DURATION])
+            return f"{title}  ({duration})" if duration else title
+        if role == Qt.ToolTipRole:
+            details = record_details(row)
+            return f"{row[COL_FILENAME]}\n{details}" if details else row[COL_FILENAME]
+        if role == self.FilenameRole:
+            return row[COL_FILENAME]
+        if role == self.RecordRole:
+            return row
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._has_more:
+            return
+        if self._query:
+            page = self.repo.search(self._query, PAGE_SIZE, len(self._rows))
+        else:
+            after = None
+            if self._rows:
+                last = self._rows[-1]
+                after = (last[COL_CREATED], last[COL_ID])
+            page = self.repo.list_page(after, PAGE_SIZE)
+        self._has_more = len(page) == PAGE_SIZE
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        for i, row in enumerate(page):
+            self._by_filename[row[COL_FILENAME]] = first + i
+        self._rows.extend(page)
+        self.endInsertRows()
+
+    # ---------- Actualizaciones puntuales ----------
+
+    def reload(self, first_page=None):
+        """Vacía el modelo; la vista volverá a pedir la primera página.
+
+        Con first_page (leída p.ej. en otro hilo) la lista arranca ya con esas filas.
+        """
+        self.beginResetModel()
+        self._rows = list(first_page or [])
+        self._reindex()
+        self._has_more = first_page is None or len(first_page) == PAGE_SIZE
+        self.endResetModel()
+
+    def set_search(self, query):
+        """Filtra por texto (vacío = lista completa por fecha)"""
+        query = query.strip()
+        if query == self._query:
+            return
+        self._query = query
+        self.reload()
+
+    def _reindex(self):
+        self._by_filename = {row[COL_FILENAME]: i for i, row in enumerate(self._rows)}
+
+    def row_of(self, filename):
+        """Fila cargada de esa grabación o -1"""
+        return self._by_filename.get(filename, -1)
+
+    def record(self, row):
+        return self._rows[row]
+
+    def refresh(self, filename):
+        """Vuelve a leer una fila de la base de datos (p.ej. tras editar el título)"""
+        row = self.row_of(filename)
+        if row < 0:
+            return
+        record = self.repo.get(filename)
+        if record is None:
+            self.remove(filename)
+            return
+        self._rows[row] = record
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def prepend(self, filename):
+        """Añade arriba una grabación recién creada (la más reciente)"""
+        record = self.repo.get(filename)
+        if record is None or self.row_of(filename) >= 0:
+            return
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._rows.insert(0, record)
+        self._reindex()
+        self.endInsertRows()
+
+    def remove(self, filename):
+        row = self.row_of(filename)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self._reindex()
+        self.endRemoveRows()
@@ -0,0 +1,350 @@
+import os
+import sys
+import json
+import time
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Herramienta de línea de comandos (sin Qt): mantenimiento de la biblioteca
+# y grabación desde scripts o servidores sin pantalla.
+#
+#   python cli.py index [--watch]
+#   python cli.py export flac [--edited] [archivos...]
+#   python cli.py waveforms [--force] [archivos...]
+#   python cli.py stats [archivos...]
+#   python cli.py normalize --target -16 --format flac [archivos...]
+#   python cli.py record salida.wav --seconds 60 --format flac
+#
+# Sin archivos, los comandos trabajan sobre toda la biblioteca. El progreso
+# va a stderr y el resultado, en JSON, a stdout. Los módulos pesados se
+# importan dentro de cada comando para que arrancar sea inmediato.
+
+
+def _progress(args, done, total, label):
+    if not args.quiet:
+        print(f"[{done}/{total}] {label}", file=sys.stderr, flush=True)
+
+
+def _emit(result):
+    json.dump(result, sys.stdout, indent=1, ensure_ascii=False, default=str)
+    sys.stdout.write("\n")
+
+
+def _repository(args):
+    from db import RecordingRepository
+    repo = RecordingRepository(args.db)
+    repo.init_schema()
+    return repo
+
+
+def _targets(args, repo):
+    """Archivos indicados o, si no hay, todas las grabaciones del catálogo"""
+    if args.files:
+        return list(args.files)
+    return [row[2] for row in repo.list()]
+
+
+def _run_pool(args, func, items, extra=None):
+    """Reparte func(item, *extra[item]) en un pool de procesos; devuelve {item: resultado o error}"""
+    results = {}
+    if not items:
+        return results
+    extra = extra or {}
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(func, item, *extra.get(item, ())): item for item in items}
+        for done, future in enumerate(as_completed(futures), start=1):
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            except Exception as error:  # Un archivo roto no para el lote
+                results[item] = {"error": f"{type(error).__name__}: {error}"}
+            _progress(args, done, len(items), item)
+    return results
+
+
+# ---------- Trabajos (se ejecutan en los procesos del pool) ----------
+
+def _waveform_job(filename, force=False):
+    from peaks import load_peaks, build_peaks, save_peaks
+    started = time.perf_counter()
+    if force:
+        peaks = build_peaks(filename)
+        save_peaks(filename, peaks)
+    else:
+        peaks = load_peaks(filename)
+    return {"levels": len(peaks.levels), "frames": peaks.frames,
+            "seconds": time.perf_counter() - started}
+
+
+def _waveform_job_force(filename):
+    return _waveform_job(filename, force=True)
+
+
+def _stats_job(filename):
+    from analysis import analyze
+    stats = analyze(filename)
+    stats["thumb"] = stats["thumb"].hex()  # bytes -> JSON
+    return stats
+
+
+def _loudness_job(filename):
+    from loudness import measure
+    return measure(filename)
+
+
+def _normalize_job(filename, measurement, target, ceiling, fmt):
+    from loudness import normalize, normalized_path, gain_for
+    gain = gain_for(measurement["loudness"], target)
+    return normalize(filename, normalized_path(filename, fmt), fmt, gain, measurement["true_peak"], ceiling)
+
+
+def _mtime_ns(filename):
+    try:
+        return os.stat(filename).st_mtime_ns
+    except OSError:
+        return None
+
+
+# ---------- Comandos ----------
+
+def cmd_index(args):
+    from library_scanner import LibraryScanner, RECORDINGS_DIR
+    repo = _repository(args)
+    scanner = LibraryScanner(repo, args.dir or RECORDINGS_DIR, max_workers=args.jobs)
+    while True:
+        result = scanner.scan()
+        analyzed = []
+        if not args.no_stats:
+            pending = len(repo.stale_stats(10 ** 9))
+            while True:
+                batch = scanner.analyze_pending(limit=64)
+                if not batch:
+                    break
+                analyzed += batch
+                _progress(args, len(analyzed), max(pending, len(analyzed)), batch[-1])
+        result["analyzed"] = analyzed
+        _emit(result if args.verbose else {
+            key: len(value) if isinstance(value, list) else value for key, value in result.items()
+        })
+        if not args.watch:
+            return 0
+        time.sleep(args.interval)
+
+
+def cmd_export(args):
+    from exporter import ExportService
+    repo = _repository(args)
+    files = _targets(args, repo)
+    service = ExportService(args.jobs)
+    jobs = {service.submit(src, args.format, clips=repo.edits(src) if args.edited else None): src
+            for src in files}
+    results = {}
+    done = 0
+    try:
+        for job_id, kind, value in service.wait():
+            if kind == "progress":
+                continue
+            done += 1
+            src = jobs[job_id]
+            results[src] = value if kind == "finished" else {kind: value}
+            _progress(args, done, len(jobs), src)
+    finally:
+        service.shutdown()
+    _emit(results)
+    return 0 if all("error" not in r for r in results.values()) else 1
+
+
+def cmd_waveforms(args):
+    repo = _repository(args)
+    files = _targets(args, repo)
+    results = _run_pool(args, _waveform_job_force if args.force else _waveform_job, files)
+    _emit(results)
+    return 0 if all("error" not in r for r in results.values()) else 1
+
+
+def cmd_stats(args):
+    repo = _repository(args)
+    files = _targets(args, repo)
+    results = _run_pool(args, _stats_job, files)
+    # Lo calculado se guarda en el catálogo (solo las grabaciones que ya están en él)
+    known = {f for f in files if repo.get(f) is not None}
+    repo.update_stats_many(
+        (f, r["mtime_ns"], dict(r, thumb=bytes.fromhex(r["thumb"])))
+        for f, r in results.items() if "error" not in r and f in known
+    )
+    for r in results.values():
+        r.pop("thumb", None)
+    _emit(results)
+    return 0 if all("error" not in r for r in results.values()) else 1
+
+
+def cmd_normalize(args):
+    from loudness import normalized_path, TARGET_LUFS, CEILING_DBTP
+    if args.target is None:
+        args.target = TARGET_LUFS
+    if args.ceiling is None:
+        args.ceiling = CEILING_DBTP
+    repo = _repository(args)
+    files = _targets(args, repo)
+    cached = repo.loudness_measurements()
+
+    # Pasada 1: solo se mide lo que ha cambiado desde la última medida guardada
+    stale = [f for f in files if args.force or f not in cached or cached[f][0] != _mtime_ns(f)]
+    measured = _run_pool(args, _loudness_job, stale)
+    repo.set_loudness_many((f, m) for f, m in measured.items() if "error" not in m)
+    cached.update(repo.loudness_measurements())
+
+    results, measurements, pending = {}, {}, []
+    for f in files:
+        if "error" in measured.get(f, {}):
+            results[f] = measured[f]
+            continue
+        _mtime, lufs, true_peak, sample_peak, output, output_mtime_ns, target, ceiling = cached[f]
+        measurements[f] = {"loudness": lufs, "true_peak": true_peak, "sample_peak": sample_peak,
+                           "measured": f in measured}
+        dst = normalized_path(f, args.format)
+        # Pasada 2 solo si no hay ya una salida al día con el mismo objetivo y techo
+        if (not args.force and output == dst and (target, ceiling) == (args.target, args.ceiling)
+                and output_mtime_ns == _mtime_ns(dst)):
+            results[f] = dict(measurements[f], dst=dst, skipped=True)
+        else:
+            pending.append(f)
+    if args.measure_only:
+        results.update((f, measurements[f]) for f in pending)
+        _emit(results)
+        return 0 if all("error" not in r for r in results.values()) else 1
+
+    job = partial(_normalize_job, target=args.target, ceiling=args.ceiling, fmt=args.format)
+    normalized = _run_pool(args, job, pending, {f: (measurements[f],) for f in pending})
+    repo.set_normalized_many(
+        (f, r["dst"], r["dst_mtime_ns"], args.target, args.ceiling)
+        for f, r in normalized.items() if "error" not in r
+    )
+    for f, r in normalized.items():
+        r.pop("dst_mtime_ns", None)
+        results[f] = dict(measurements[f], **r)
+    _emit(results)
+    return 0 if all("error" not in r for r in results.values()) else 1
+
+
+def cmd_record(args):
+    from audio_io import open_audio
+    if len(args.device) > 1:
+        from multitrack import MultiTrackRecorder, TrackSpec
+        tracks = [TrackSpec(_device(d), args.channels) for d in args.device]
+        rec = MultiTrackRecorder(args.output, tracks, samplerate=args.samplerate,
+                                 merge=args.merge, segment_seconds=_segment_seconds(args),
+                                 file_format=args.format)
+    else:
+        from recorder import Recorder
+        rec = Recorder(args.output, samplerate=args.samplerate, channels=args.channels,
+                       segment_seconds=_segment_seconds(args), file_format=args.format,
+                       device=_device(args.device[0]) if args.device else None)
+    rec.start()
+    started = time.monotonic()
+    try:
+        while args.seconds is None or time.monotonic() - started < args.seconds:
+            time.sleep(0.5)
+            if not args.quiet:
+                print(f"\rgrabando {time.monotonic() - started:7.1f} s", end="", file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        pass  # Ctrl+C termina la grabación de forma ordenada
+    rec.stop()
+    if not args.quiet:
+        print(file=sys.stderr)
+
+    files = getattr(rec, "stems", None) or [rec.filename]
+    result = {"files": {}, "overflows": rec.overflows, "xruns": rec.xruns}
+    for filename in files:
+        with open_audio(filename) as audio:
+            result["files"][filename] = {"frames": audio.frames, "samplerate": audio.samplerate,
+                                         "channels": audio.channels}
+    if args.catalog:
+        repo = _repository(args)
+        if hasattr(rec, "tracks"):
+            from multitrack import save_to_catalog
+            save_to_catalog(repo, rec)
+        else:
+            info = result["files"][rec.filename]
+            repo.add(rec.filename, title=rec.filename, duration=info["frames"] / info["samplerate"])
+    _emit(result)
+    return 0
+
+
+def _device(value):
+    return int(value) if value.isdigit() else value
+
+
+def _segment_seconds(args):
+    return args.segment_minutes * 60 if args.segment_minutes else None
+
+
+# Nombres de exporter.FORMATS: se repiten aquí para no cargar numpy y
+# soundfile solo por construir el parser (tests/test_cli.py los compara)
+EXPORT_FORMATS = ("flac", "ogg", "wav16", "wav24", "wav32f")
+
+
+def build_parser():
+    from db import DB_PATH
+    parser = argparse.ArgumentParser(prog="cli.py", description="Podcast App Pro sin interfaz gráfica")
+    parser.add_argument("--db", default=DB_PATH, help="base de datos (por defecto %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="procesos en paralelo")
+    parser.add_argument("-q", "--quiet", action="store_true", help="sin progreso en stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("index", help="sincroniza la carpeta de grabaciones con el catálogo")
+    p.add_argument("--dir", default=None, help="por defecto la carpeta de grabaciones de la aplicación")
+    p.add_argument("--watch", action="store_true", help="seguir vigilando la carpeta")
+    p.add_argument("--interval", type=float, default=2.0)
+    p.add_argument("--no-stats", action="store_true", help="no calcular los datos técnicos")
+    p.add_argument("-v", "--verbose", action="store_true", help="listar las rutas cambiadas")
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser("export", help="exporta/transcodifica grabaciones")
+    p.add_argument("format", choices=EXPORT_FORMATS)
+    p.add_argument("--edited", action="store_true", help="aplicar la edición guardada (si la hay)")
+    p.add_argument("files", nargs="*")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("waveforms", help="genera las cachés de forma de onda (.peaks.npz)")
+    p.add_argument("--force", action="store_true", help="recalcular aunque estén al día")
+    p.add_argument("files", nargs="*")
+    p.set_defaults(func=cmd_waveforms)
+
+    p = sub.add_parser("stats", help="calcula formato, pico y sonoridad de cada grabación")
+    p.add_argument("files", nargs="*")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("normalize", help="normaliza la sonoridad (LUFS) con limitador de pico real")
+    p.add_argument("--target", type=float, default=None, help="LUFS (por defecto loudness.TARGET_LUFS)")
+    p.add_argument("--ceiling", type=float, default=None,
+                   help="pico real máximo en dBTP (por defecto loudness.CEILING_DBTP)")
+    p.add_argument("--format", choices=EXPORT_FORMATS, default="flac")
+    p.add_argument("--measure-only", action="store_true", help="solo medir (y guardar las medidas)")
+    p.add_argument("--force", action="store_true", help="volver a medir y escribir aunque esté al día")
+    p.add_argument("files", nargs="*")
+    p.set_defaults(func=cmd_normalize)
+
+    p = sub.add_parser("record", help="graba a un archivo")
+    p.add_argument("output")
+    p.add_argument("--seconds", type=float, default=None, help="duración (por defecto hasta Ctrl+C)")
+    p.add_argument("--format", choices=["wav", "flac", "ogg"], default="wav")
+    p.add_argument("--samplerate", type=int, default=44100)
+    p.add_argument("--channels", type=int, default=1)
+    p.add_argument("--device", action="append", default=[],
+                   help="dispositivo de entrada (repetir para grabar varias pistas)")
+    p.add_argument("--merge", action="store_true", help="con varias pistas, unirlas en un archivo")
+    p.add_argument("--segment-minutes", type=float, default=None, help="grabar por tramos")
+    p.add_argument("--catalog", action="store_true", help="dar de alta la grabación en el catálogo")
+    p.set_defaults(func=cmd_record)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,365 @@
+import os
 import sqlite3
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
 
 
 DB_PATH = "podcast.db"
 
+# Las sentencias son constantes para que sqlite3 las reutilice de su caché
+# de sentencias preparadas en vez de compilarlas en cada llamada.
+# Columnas de cada fila de grabación, en este orden (ver catalog_model.COL_*)
+RECORD_COLUMNS = (
+    "id, title, filename, description, created_at, duration, "
+    "samplerate, channels, format, subtype, file_size, peak, loudness"
+)
+SQL_INSERT = (
+    "INSERT OR IGNORE INTO recordings (title, filename, description, created_at, duration) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+SQL_LIST = f"SELECT {RECORD_COLUMNS} FROM recordings ORDER BY created_at DESC"
+# Paginación por clave (keyset): seguimos desde la última fila vista en vez de
+# usar OFFSET, así cada página cuesta lo mismo aunque haya 100k grabaciones.
+SQL_PAGE_FIRST = (
+    f"SELECT {RECORD_COLUMNS} FROM recordings "
+    "ORDER BY created_at DESC, id DESC LIMIT ?"
+)
+SQL_PAGE_AFTER = (
+    f"SELECT {RECORD_COLUMNS} FROM recordings "
+    "WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?"
+)
+SQL_COUNT = "SELECT COUNT(*) FROM recordings"
+# Búsqueda de texto completo: bm25 ordena por relevancia (el título pesa más)
+SQL_SEARCH = (
+    f"SELECT {', '.join('r.' + c.strip() for c in RECORD_COLUMNS.split(','))} "
+    "FROM recordings_fts JOIN recordings r ON r.id = recordings_fts.rowid "
+    "WHERE recordings_fts MATCH ? ORDER BY bm25(recordings_fts, 10.0, 1.0) LIMIT ? OFFSET ?"
+)
+SQL_GET = f"SELECT {RECORD_COLUMNS} FROM recordings WHERE filename=?"
+SQL_UPDATE_TITLE = "UPDATE recordings SET title=? WHERE filename=?"
+SQL_UPDATE_META = "UPDATE recordings SET title=?, description=? WHERE filename=?"
+SQL_DELETE = "DELETE FROM recordings WHERE filename=?"
+# Escáner de la carpeta: firma (mtime, tamaño, inodo) de cada archivo visto
+SQL_SCAN_STATES = (
+    "SELECT r.filename, s.mtime_ns, s.size, s.inode FROM recordings r "
+    "LEFT JOIN scan_state s ON s.filename = r.filename"
+)
+# Si la grabación ya existe solo se actualiza la duración: título y
+# descripción pueden haberse editado a mano
+SQL_UPSERT_SCANNED = (
+    "INSERT INTO recordings (title, filename, description, created_at, duration) "
+    "VALUES (?, ?, '', ?, ?) "
+    "ON CONFLICT(filename) DO UPDATE SET duration=excluded.duration"
+)
+SQL_UPSERT_SCAN_STATE = (
+    "INSERT INTO scan_state (filename, mtime_ns, size, inode, samplerate, channels) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(filename) DO UPDATE SET mtime_ns=excluded.mtime_ns, size=excluded.size, "
+    "inode=excluded.inode, samplerate=excluded.samplerate, channels=excluded.channels"
+)
+SQL_DELETE_SCAN_STATE = "DELETE FROM scan_state WHERE filename=?"
+# Datos técnicos calculados (analysis.py); stats_mtime_ns dice de qué versión del archivo son
+SQL_STALE_STATS = (
+    "SELECT r.filename FROM recordings r LEFT JOIN scan_state s ON s.filename = r.filename "
+    "WHERE r.stats_mtime_ns IS NULL OR r.stats_mtime_ns != s.mtime_ns LIMIT ?"
+)
+SQL_UPDATE_STATS = (
+    "UPDATE recordings SET duration=COALESCE(?, duration), samplerate=?, channels=?, format=?, "
+    "subtype=?, file_size=?, peak=?, loudness=?, stats_mtime_ns=? WHERE filename=?"
+)
+SQL_UPSERT_THUMB = (
+    "INSERT INTO waveform_thumbs (filename, data) VALUES (?, ?) "
+    "ON CONFLICT(filename) DO UPDATE SET data=excluded.data"
+)
+SQL_GET_THUMB = "SELECT data FROM waveform_thumbs WHERE filename=?"
+SQL_DELETE_THUMB = "DELETE FROM waveform_thumbs WHERE filename=?"
+# Pistas de una misma sesión multipista (multitrack.py)
+SQL_INSERT_STEM = (
+    "INSERT OR REPLACE INTO recording_stems (filename, session, track, name, device) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+SQL_GET_STEMS = (
+    "SELECT filename, track, name, device FROM recording_stems "
+    "WHERE session = (SELECT session FROM recording_stems WHERE filename=?) ORDER BY track"
+)
+SQL_DELETE_STEM = "DELETE FROM recording_stems WHERE filename=?"
+# Regiones de voz y silencio (regions.py), en segundos
+SQL_INSERT_REGION = "INSERT INTO recording_regions (filename, start, end, kind) VALUES (?, ?, ?, ?)"
+SQL_GET_REGIONS = "SELECT start, end, kind FROM recording_regions WHERE filename=? ORDER BY start"
+SQL_DELETE_REGIONS = "DELETE FROM recording_regions WHERE filename=?"
+# Lista de edición no destructiva (edits.py): clips en frames, en orden
+SQL_INSERT_EDIT = "INSERT INTO recording_edits (filename, position, source, start, stop) VALUES (?, ?, ?, ?, ?)"
+SQL_GET_EDITS = "SELECT source, start, stop FROM recording_edits WHERE filename=? ORDER BY position"
+SQL_DELETE_EDITS = "DELETE FROM recording_edits WHERE filename=?"
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
+SQL_LOUDNESS_ALL = (
+    "SELECT filename, mtime_ns, loudness, true_peak, sample_peak, output, output_mtime_ns, target, ceiling "
+    "FROM loudness_measurements"
+)
+SQL_UPSERT_LOUDNESS = (
+    "INSERT INTO loudness_measurements (filename, mtime_ns, loudness, true_peak, sample_peak) "
+    "VALUES (?, ?, ?, ?, ?) ON CONFLICT(filename) DO UPDATE SET mtime_ns=excluded.mtime_ns, "
+    "loudness=excluded.loudness, true_peak=excluded.true_peak, sample_peak=excluded.sample_peak, "
+    "output=NULL, output_mtime_ns=NULL, target=NULL, ceiling=NULL"
+)
+SQL_UPDATE_NORMALIZED = (
+    "UPDATE loudness_measurements SET output=?, output_mtime_ns=?, target=?, ceiling=? WHERE filename=?"
+)
+SQL_DELETE_LOUDNESS = "DELETE FROM loudness_measurements WHERE filename=?"
+
+
+def _created_at(when):
+    """created_at de una fecha con zona: ISO en UTC sin sufijo, igual en todas las filas.
+
+    El orden de la lista y la paginación comparan created_at como texto.
+    """
+    return when.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class RecordingRepository:
+    """Acceso a la base de datos con una conexión persistente por hilo"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, cached_statements=256)
+            # WAL: los lectores no bloquean al escritor y cada commit no hace fsync
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Cierra la conexión del hilo actual"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def init_schema(self):
+        """Aplica las migraciones pendientes (PRAGMA user_version = las ya aplicadas)"""
+        conn = self.connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migrate in enumerate(MIGRATIONS[version:], start=version + 1):
+            # Cada migración va en su propia transacción junto con el nuevo número
+            conn.execute("BEGIN")
+            try:
+                migrate(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    # ---------- Lecturas ----------
+
+    def list(self):
+        return self.connection().execute(SQL_LIST).fetchall()
+
+    def list_page(self, after=None, limit=200):
+        """Página de la lista ordenada por fecha; after = (created_at, id) de la última fila"""
+        conn = self.connection()
+        if after is None:
+            return conn.execute(SQL_PAGE_FIRST, (limit,)).fetchall()
+        return conn.execute(SQL_PAGE_AFTER, (after[0], after[1], limit)).fetchall()
+
+    def count(self):
+        return self.connection().execute(SQL_COUNT).fetchone()[0]
+
+    def search(self, query, limit=50, offset=0):
+        """Grabaciones que coinciden con el texto, de más a menos relevante"""
+        match = fts_query(query)
+        if match is None:
+            return []
+        return self.connection().execute(SQL_SEARCH, (match, limit, offset)).fetchall()
+
+    def get(self, filename):
+        """Fila con las columnas de RECORD_COLUMNS o None"""
+        return self.connection().execute(SQL_GET, (filename,)).fetchone()
+
+    def scan_states(self):
+        """{filename: (mtime_ns, size, inode)} de todas las grabaciones.
+
+        Las que nunca ha visto el escáner (p.ej. recién grabadas) tienen
+        (None, None, None) y se volverán a examinar.
+        """
+        rows = self.connection().execute(SQL_SCAN_STATES)
+        return {filename: (mtime_ns, size, inode) for filename, mtime_ns, size, inode in rows}
+
+    def stale_stats(self, limit=100):
+        """Grabaciones sin datos técnicos o con datos de una versión anterior del archivo"""
+        return [row[0] for row in self.connection().execute(SQL_STALE_STATS, (limit,))]
+
+    def stems(self, filename):
+        """Pistas de la sesión multipista a la que pertenece filename: (filename, track, name, device)"""
+        return self.connection().execute(SQL_GET_STEMS, (filename,)).fetchall()
+
+    def regions(self, filename):
+        """Regiones (inicio, fin, tipo) de la grabación, en orden; vacía si no se ha analizado"""
+        return self.connection().execute(SQL_GET_REGIONS, (filename,)).fetchall()
+
+    def edits(self, filename):
+        """Clips (source, start, stop) de la edición de la grabación; vacía si no se ha editado"""
+        return self.connection().execute(SQL_GET_EDITS, (filename,)).fetchall()
+
+    def loudness_measurements(self):
+        """{filename: (mtime_ns, loudness, true_peak, sample_peak, output, output_mtime_ns, target, ceiling)}"""
+        rows = self.connection().execute(SQL_LOUDNESS_ALL)
+        return {row[0]: row[1:] for row in rows}
+
+    def thumbnail(self, filename):
+        """Miniatura de la forma de onda (bytes, ver analysis.decode_thumb) o None"""
+        row = self.connection().execute(SQL_GET_THUMB, (filename,)).fetchone()
+        return row[0] if row else None
+
+    # ---------- Escrituras (una transacción por llamada) ----------
+
+    def add(self, filename, title="", description="", duration=None):
+        self.add_many([(filename, title, description, duration)])
+
+    def add_many(self, recordings):
+        """recordings: iterable de (filename, title, description, duration)"""
+        now = _created_at(datetime.now(timezone.utc))
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_INSERT, (
+                (title, filename, description, now, duration)
+                for filename, title, description, duration in recordings
+            ))
+
+    def update_title(self, filename, new_title):
+        conn = self.connection()
+        with conn:
+            conn.execute(SQL_UPDATE_TITLE, (new_title, filename))
+
+    def update_meta(self, filename, new_title, new_description):
+        self.update_meta_many([(filename, new_title, new_description)])
+
+    def update_meta_many(self, changes):
+        """changes: iterable de (filename, title, description)"""
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_UPDATE_META, (
+                (title, description, filename) for filename, title, description in changes
+            ))
+
+    def delete(self, filename):
+        self.delete_many([filename])
+
+    def delete_many(self, filenames):
+        filenames = list(filenames)
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_DELETE, ((f,) for f in filenames))
+            conn.executemany(SQL_DELETE_SCAN_STATE, ((f,) for f in filenames))
+            conn.executemany(SQL_DELETE_THUMB, ((f,) for f in filenames))
+            conn.executemany(SQL_DELETE_STEM, ((f,) for f in filenames))
+            conn.executemany(SQL_DELETE_REGIONS, ((f,) for f in filenames))
+            conn.executemany(SQL_DELETE_EDITS, ((f,) for f in filenames))
+            conn.executemany(SQL_DELETE_LOUDNESS, ((f,) for f in filenames))
+
+    def add_stems(self, session, stems):
+        """Enlaza las pistas de una sesión. stems: iterable de (filename, track, name, device)"""
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_INSERT_STEM, (
+                (filename, session, track, name, device) for filename, track, name, device in stems
+            ))
+
+    def set_edits(self, filename, clips):
+        """Sustituye la edición de filename; sin clips se vuelve al archivo original"""
+        conn = self.connection()
+        with conn:
+            conn.execute(SQL_DELETE_EDITS, (filename,))
+            conn.executemany(SQL_INSERT_EDIT, (
+                (filename, i, source, start, stop) for i, (source, start, stop) in enumerate(clips or [])
+            ))
+
+    def set_loudness_many(self, results):
+        """Guarda medidas de loudness.measure: iterable de (filename, medida).
+
+        Una medida nueva invalida la versión normalizada que hubiera.
+        """
+        results = list(results)
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_UPSERT_LOUDNESS, (
+                (filename, m["mtime_ns"], m["loudness"], m["true_peak"], m["sample_peak"])
+                for filename, m in results
+            ))
+
+    def set_normalized_many(self, results):
+        """Anota las salidas normalizadas: iterable de (filename, salida, mtime_ns salida, objetivo, techo)"""
+        results = list(results)
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_UPDATE_NORMALIZED, (
+                (output, output_mtime_ns, target, ceiling, filename)
+                for filename, output, output_mtime_ns, target, ceiling in results
+            ))
+
+    def update_stats_many(self, results):
+        """Guarda lo calculado por analysis.analyze, en una transacción.
+
+        results: iterable de (filename, mtime_ns, stats). stats = None marca el
+        archivo como ilegible en esa versión (no se reintenta hasta que cambie).
+        """
+        results = list(results)
+        conn = self.connection()
+        with conn:
+            for filename, mtime_ns, stats in results:
+                if stats is None:
+                    conn.execute(SQL_UPDATE_STATS, (None, None, None, None, None, None, None, None,
+                                                    mtime_ns, filename))
+                    continue
+                conn.execute(SQL_UPDATE_STATS, (
+                    stats["duration"], stats["samplerate"], stats["channels"], stats["format"],
+                    stats["subtype"], stats["file_size"], stats["peak"], stats["loudness"],
+                    mtime_ns, filename,
+                ))
+                if stats.get("thumb") is not None:
+                    conn.execute(SQL_UPSERT_THUMB, (filename, stats["thumb"]))
+                if stats.get("regions") is not None:
+                    conn.execute(SQL_DELETE_REGIONS, (filename,))
+                    conn.executemany(SQL_INSERT_REGION, (
+                        (filename, start, end, kind) for start, end, kind in stats["regions"]
+                    ))
+
+    def upsert_scanned(self, files):
+        """Alta o actualización de archivos encontrados por el escáner, en una transacción.
+
+        files: iterable de (filename, mtime_ns, size, inode, samplerate, channels, frames)
+        """
+        files = list(files)
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_UPSERT_SCANNED, (
+                (os.path.basename(filename), filename,
+                 _created_at(datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc)),
+                 frames / samplerate if samplerate else None)
+                for filename, mtime_ns, size, inode, samplerate, channels, frames in files
+            ))
+            conn.executemany(SQL_UPSERT_SCAN_STATE, (
+                (filename, mtime_ns, size, inode, samplerate, channels)
+                for filename, mtime_ns, size, inode, samplerate, channels, frames in files
+            ))
+
+
+# ---------- Migraciones ----------
+# Solo se añaden al final: una base de datos con user_version = n ya tiene
+# aplicadas las n primeras.
+
+def _migration_1(conn):
+    """Esquema inicial: grabaciones, estado del escáner e índice FTS5.
+
+    Las bases de datos anteriores al sistema de migraciones ya tienen parte
+    de esto; todo usa IF NOT EXISTS.
+    """
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS recordings (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         title TEXT,
@@ -18,44 +369,206 @@ def init_db():
         duration REAL
     )
     """)
-    conn.commit()
-    conn.close()
+    # filename ya tiene índice por ser UNIQUE; este sirve al orden de la lista
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_recordings_created "
+        "ON recordings (created_at DESC, id DESC)"
+    )
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS scan_state (
+        filename TEXT PRIMARY KEY,
+        mtime_ns INTEGER,
+        size INTEGER,
+        inode INTEGER,
+        samplerate INTEGER,
+        channels INTEGER
+    )
+    """)
+    _init_fts(conn)
 
 
-def add_recording(filename, title="", description="", duration=None):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        "INSERT OR IGNORE INTO recordings (title, filename, description, created_at, duration) VALUES (?, ?, ?, ?, ?)",
-        (title, filename, description, datetime.utcnow().isoformat(), duration)
+def _init_fts(conn):
+    """Índice FTS5 de título y descripción, mantenido por triggers"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='recordings_fts'"
+    ).fetchone()
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS recordings_fts USING fts5(
+        title, description,
+        content='recordings', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
     )
-    conn.commit()
-    conn.close()
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS recordings_fts_ai AFTER INSERT ON recordings BEGIN
+        INSERT INTO recordings_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS recordings_fts_ad AFTER DELETE ON recordings BEGIN
+        INSERT INTO recordings_fts (recordings_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS recordings_fts_au AFTER UPDATE OF title, description ON recordings BEGIN
+        INSERT INTO recordings_fts (recordings_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO recordings_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """)
+    if not exists:
+        # Base de datos anterior al índice: lo llenamos con lo que ya hay
+        conn.execute("INSERT INTO recordings_fts (recordings_fts) VALUES ('rebuild')")
+
+
+def _migration_2(conn):
+    """Datos técnicos por archivo y miniatura de la forma de onda"""
+    for column, kind in (("samplerate", "INTEGER"), ("channels", "INTEGER"), ("format", "TEXT"),
+                         ("subtype", "TEXT"), ("file_size", "INTEGER"), ("peak", "REAL"),
+                         ("loudness", "REAL"), ("stats_mtime_ns", "INTEGER")):
+        conn.execute(f"ALTER TABLE recordings ADD COLUMN {column} {kind}")
+    # Lo que ya sabía el escáner se aprovecha mientras no se analiza el archivo
+    conn.execute("""
+    UPDATE recordings SET
+        samplerate = (SELECT samplerate FROM scan_state s WHERE s.filename = recordings.filename),
+        channels = (SELECT channels FROM scan_state s WHERE s.filename = recordings.filename)
+    """)
+    # La miniatura va aparte para que las páginas de la lista no carguen los BLOB
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS waveform_thumbs (
+        filename TEXT PRIMARY KEY,
+        data BLOB
+    )
+    """)
+
+
+def _migration_3(conn):
+    """Pistas (stems) de las grabaciones multipista"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS recording_stems (
+        filename TEXT PRIMARY KEY,
+        session TEXT,
+        track INTEGER,
+        name TEXT,
+        device TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stems_session ON recording_stems (session, track)")
+
+
+def _migration_4(conn):
+    """Regiones de voz y silencio; se vuelve a analizar todo para calcularlas"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS recording_regions (
+        filename TEXT NOT NULL,
+        start REAL NOT NULL,
+        end REAL NOT NULL,
+        kind TEXT NOT NULL
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_regions_filename ON recording_regions (filename, start)")
+    conn.execute("UPDATE recordings SET stats_mtime_ns = NULL")
+
+
+def _migration_5(conn):
+    """Listas de edición no destructiva"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS recording_edits (
+        filename TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        start INTEGER NOT NULL,
+        stop INTEGER NOT NULL,
+        PRIMARY KEY (filename, position)
+    )
+    """)
+
+
+def _migration_6(conn):
+    """Medidas de sonoridad y pico real para normalizar (ver loudness.py)"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS loudness_measurements (
+        filename TEXT PRIMARY KEY,
+        mtime_ns INTEGER NOT NULL,
+        loudness REAL,
+        true_peak REAL,
+        sample_peak REAL,
+        output TEXT,
+        output_mtime_ns INTEGER,
+        target REAL,
+        ceiling REAL
+    )
+    """)
+
+
+def _migration_7(conn):
+    """Sonoridad con el filtro K de BS.1770 corregido: se mide todo otra vez"""
+    conn.execute("DELETE FROM loudness_measurements")
+    conn.execute("UPDATE recordings SET stats_mtime_ns = NULL")
+
+
+MIGRATIONS = [_migration_1, _migration_2, _migration_3, _migration_4, _migration_5, _migration_6,
+              _migration_7]
+
+
+def fts_query(text):
+    """Convierte lo que escribe el usuario en una consulta FTS5 segura.
+
+    Cada palabra se busca como prefijo ("entrev" encuentra "entrevista") y
+    todas tienen que aparecer. Las comillas se quitan para que la sintaxis
+    de FTS5 no pueda romper la consulta.
+    """
+    words = text.replace('"', ' ').split()
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository():
+    """Repositorio compartido por toda la aplicación (sobre DB_PATH)"""
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            _repository = RecordingRepository(DB_PATH)
+        return _repository
+
+
+# Funciones de siempre: ahora delegan en el repositorio compartido
+
+def init_db():
+    get_repository().init_schema()
+
+
+def add_recording(filename, title="", description="", duration=None):
+    get_repository().add(filename, title, description, duration)
 
 
 def list_recordings():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, title, filename, description, created_at, duration FROM recordings ORDER BY created_at DESC")
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return get_repository().list()
+
+
+def list_recordings_page(after=None, limit=200):
+    return get_repository().list_page(after, limit)
+
+
+def search_recordings(query, limit=50, offset=0):
+    return get_repository().search(query, limit, offset)
 
 
 def update_recording_title(filename, new_title):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("UPDATE recordings SET title=? WHERE filename=?", (new_title, filename))
-    conn.commit()
-    conn.close()
+    get_repository().update_title(filename, new_title)
 
 
 def update_recording_meta(filename, new_title, new_description):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        "UPDATE recordings SET title=?, description=? WHERE filename=?",
-        (new_title, new_description, filename)
-    )
-    conn.commit()
-    conn.close()
+    get_repository().update_meta(filename, new_title, new_description)
+
+
+def delete_recording(filename):
+    get_repository().delete(filename)
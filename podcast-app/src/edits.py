@@ -0,0 +1,153 @@
+import numpy as np
+from audio_io import AudioReader, open_audio
+
+# Edición no destructiva: una lista de clips (archivo, inicio, fin) en
+# frames que se leen uno detrás de otro. Cortar, recortar o unir otra
+# grabación solo cambia la lista (tabla recording_edits); el audio original
+# no se toca. EditedAudio la lee como un archivo más (reproductor,
+# exportación) y solo lee los tramos que se conservan.
+
+
+class EditList:
+    """Clips en orden; las operaciones trabajan en frames del archivo de origen"""
+
+    def __init__(self, clips):
+        self.clips = [(source, int(start), int(stop)) for source, start, stop in clips if stop > start]
+
+    @classmethod
+    def full(cls, filename):
+        """Lista sin cambios: el archivo entero"""
+        with open_audio(filename) as audio:
+            return cls([(filename, 0, audio.frames)])
+
+    @property
+    def frames(self):
+        return sum(stop - start for _source, start, stop in self.clips)
+
+    def cut(self, source, start, stop):
+        """Quita [start, stop) de source en todos los clips que lo contienen"""
+        clips = []
+        for src, a, b in self.clips:
+            if src != source or stop <= a or start >= b:
+                clips.append((src, a, b))
+                continue
+            if a < start:
+                clips.append((src, a, start))
+            if stop < b:
+                clips.append((src, stop, b))
+        self.clips = clips
+
+    def trim(self, source, start, stop):
+        """Deja de source solo lo que cae en [start, stop); el resto de archivos no cambia"""
+        self.clips = [(src, max(a, start), min(b, stop)) if src == source else (src, a, b)
+                      for src, a, b in self.clips
+                      if src != source or (a < stop and b > start)]
+
+    def join(self, source):
+        """Añade al final otra grabación entera (mismo samplerate y canales)"""
+        with open_audio(source) as audio:
+            self.clips.append((source, 0, audio.frames))
+
+    def kept(self, source):
+        """Tramos (inicio, fin) de source que siguen en la lista, ordenados y sin solapes"""
+        spans = sorted((a, b) for src, a, b in self.clips if src == source)
+        merged = []
+        for a, b in spans:
+            if merged and a <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        return merged
+
+    def removed(self, source, frames):
+        """Tramos (inicio, fin) de source que la edición ha quitado"""
+        removed, pos = [], 0
+        for a, b in self.kept(source):
+            if a > pos:
+                removed.append((pos, a))
+            pos = max(pos, b)
+        if pos < frames:
+            removed.append((pos, frames))
+        return removed
+
+    def to_source(self, position):
+        """Frame de la línea de tiempo editada -> (archivo, frame) o None si se pasa del final"""
+        offset = 0
+        for source, a, b in self.clips:
+            if position < offset + b - a:
+                return source, a + max(0, position - offset)
+            offset += b - a
+        return None
+
+    def to_timeline(self, source, frame):
+        """Frame de source -> posición en la línea de tiempo.
+
+        Si ese frame se ha cortado, la del siguiente que se conserva; None si no queda ninguno.
+        """
+        offset, best = 0, None
+        for src, a, b in self.clips:
+            if src == source:
+                if a <= frame < b:
+                    return offset + frame - a
+                if frame < a and (best is None or a < best[0]):
+                    best = (a, offset)
+            offset += b - a
+        return best[1] if best else None
+
+
+class EditedAudio(AudioReader):
+    """Una lista de edición leída como un único archivo (ver audio_io.AudioReader)"""
+
+    def __init__(self, edits):
+        if not edits.clips:
+            raise ValueError("La edición no conserva nada")
+        self.clips = list(edits.clips)
+        self._readers = {}
+        try:
+            for source, _a, _b in self.clips:
+                if source not in self._readers:
+                    self._readers[source] = open_audio(source)
+        except BaseException:
+            self.close()
+            raise
+        first = self._readers[self.clips[0][0]]
+        for source, reader in self._readers.items():
+            if (reader.samplerate, reader.channels) != (first.samplerate, first.channels):
+                self.close()
+                raise ValueError(f"{source}: formato distinto ({reader.samplerate} Hz, "
+                                 f"{reader.channels} canales) que el primer clip")
+        self.samplerate = first.samplerate
+        self.channels = first.channels
+        self.format = first.format
+        self.subtype = first.subtype
+        self._starts = np.cumsum([0] + [b - a for _s, a, b in self.clips])
+        self.frames = int(self._starts[-1])
+
+    def read(self, start, stop, out=None):
+        start = max(0, start)
+        stop = min(stop, self.frames)
+        n = max(0, stop - start)
+        if out is None:
+            out = np.empty((n, self.channels), dtype=np.float32)
+        else:
+            out = out[:n]
+        first = int(np.searchsorted(self._starts, start, side='right')) - 1
+        pos = start
+        for i in range(max(first, 0), len(self.clips)):
+            if pos >= stop:
+                break
+            source, a, _b = self.clips[i]
+            offset = int(self._starts[i])
+            end = min(stop, int(self._starts[i + 1]))
+            if end > pos:
+                got = len(self._readers[source].read(a + pos - offset, a + end - offset,
+                                                     out=out[pos - start:end - start]))
+                # Origen más corto de lo que dice el clip (p.ej. lo han recortado fuera)
+                out[pos - start + got:end - start] = 0
+                pos = end
+        return out
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+        self._readers = {}
@@ -0,0 +1,55 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+from exporter import ExportService
+
+# Puente entre ExportService (pool de procesos) y la interfaz: revisa los
+# eventos de los trabajos con un QTimer y los reemite como señales de Qt.
+
+
+class ExportManager(QObject):
+    jobQueued = Signal(int, str)        # id, archivo de salida
+    jobProgress = Signal(int, float)    # id, fracción 0..1
+    jobFinished = Signal(int, object)   # id, dict con el resultado
+    jobFailed = Signal(int, str)        # id, mensaje de error
+    jobCancelled = Signal(int)
+    idle = Signal()                     # ya no queda nada en la cola
+
+    def __init__(self, parent=None, max_workers=None):
+        super().__init__(parent)
+        self.service = ExportService(max_workers)
+        self._timer = QTimer(self)
+        self._timer.setInterval(100)
+        self._timer.timeout.connect(self._poll)
+
+    @property
+    def active(self):
+        return self.service.active
+
+    def submit(self, src, fmt, dst=None, clips=None):
+        job_id = self.service.submit(src, fmt, dst, clips)
+        self.jobQueued.emit(job_id, self.service.job(job_id).dst)
+        self._timer.start()
+        return job_id
+
+    def cancel(self, job_id):
+        self.service.cancel(job_id)
+
+    def cancel_all(self):
+        self.service.cancel_all()
+
+    def shutdown(self):
+        self._timer.stop()
+        self.service.shutdown()
+
+    def _poll(self):
+        for job_id, kind, value in self.service.poll():
+            if kind == "progress":
+                self.jobProgress.emit(job_id, value)
+            elif kind == "finished":
+                self.jobFinished.emit(job_id, value)
+            elif kind == "error":
+                self.jobFailed.emit(job_id, value)
+            elif kind == "cancelled":
+                self.jobCancelled.emit(job_id)
+        if not self.service.active:
+            self._timer.stop()
+            self.idle.emit()
@@ -0,0 +1,227 @@
+import os
+import time
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import soundfile as sf
+from audio_io import open_audio, recording_size, is_manifest, MANIFEST_SUFFIX
+from edits import EditList, EditedAudio
+
+# Exportación / transcodificación por bloques en un pool de procesos.
+# Este módulo no depende de Qt: lo usa la interfaz (export_manager.py) y
+# también se puede usar desde scripts.
+
+# clave -> (formato libsndfile, subtipo, sufijo del archivo de salida)
+FORMATS = {
+    "flac": ("FLAC", None, ".flac"),      # subtipo según el origen (16 o 24 bits)
+    "ogg": ("OGG", "VORBIS", ".ogg"),
+    "wav16": ("WAV", "PCM_16", "_16bit.wav"),
+    "wav24": ("WAV", "PCM_24", "_24bit.wav"),
+    "wav32f": ("WAV", "FLOAT", "_float.wav"),
+}
+
+FORMAT_LABELS = {
+    "flac": "FLAC",
+    "ogg": "OGG/Vorbis",
+    "wav16": "WAV 16 bits",
+    "wav24": "WAV 24 bits",
+    "wav32f": "WAV 32 bits float",
+}
+
+BLOCK_FRAMES = 65536
+PROGRESS_INTERVAL = 0.2  # segundos entre avisos de progreso
+# Las salidas van a esta subcarpeta, junto al original: el escáner de la
+# biblioteca no entra en subcarpetas, así que no las cataloga como
+# grabaciones ni 'cli.py normalize/export' las vuelve a procesar
+EXPORTS_DIR = "exportados"
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def output_path(src, fmt, edited=False):
+    """grabaciones/entrevista.wav -> grabaciones/exportados/entrevista.flac"""
+    base = src[:-len(MANIFEST_SUFFIX)] if is_manifest(src) else os.path.splitext(src)[0]
+    directory, name = os.path.split(base)
+    return os.path.join(directory, EXPORTS_DIR, name + ("_editado" if edited else "") + FORMATS[fmt][2])
+
+
+def _flac_subtype(src_subtype):
+    # FLAC solo admite enteros de hasta 24 bits
+    return "PCM_24" if src_subtype in ("PCM_24", "PCM_32", "FLOAT", "DOUBLE") else "PCM_16"
+
+
+def transcode(src, dst, fmt, progress=None, blocksize=BLOCK_FRAMES, clips=None):
+    """Copia src a dst en otro formato leyendo y escribiendo por bloques.
+
+    Con clips (lista de edición, ver edits.py) se escribe la versión editada:
+    una sola pasada que solo lee los tramos que se conservan.
+    progress(hechos, total) se llama cada PROGRESS_INTERVAL segundos; si lanza
+    ExportCancelled se borra el archivo a medias y la excepción sube.
+    """
+    file_format, subtype, _ = FORMATS[fmt]
+    tmp = dst + ".part"
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    # Los WAV se leen mapeados en memoria: sin decodificador ni copias intermedias
+    with (EditedAudio(EditList(clips)) if clips else open_audio(src)) as fin:
+        if subtype is None:
+            subtype = _flac_subtype(fin.subtype)
+        buf = np.empty((blocksize, fin.channels), dtype='float32')
+        done = 0
+        last = time.monotonic()
+        try:
+            with sf.SoundFile(tmp, mode='w', samplerate=fin.samplerate, channels=fin.channels,
+                              format=file_format, subtype=subtype) as fout:
+                while done < fin.frames:
+                    block = fin.read(done, done + blocksize, out=buf)
+                    if len(block) == 0:
+                        break
+                    fout.write(block)
+                    done += len(block)
+                    now = time.monotonic()
+                    if progress is not None and now - last >= PROGRESS_INTERVAL:
+                        last = now
+                        progress(done, fin.frames)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    os.replace(tmp, dst)
+    if progress is not None:
+        progress(done, done)
+    return {
+        "src": src,
+        "dst": dst,
+        "format": fmt,
+        "frames": done,
+        "src_bytes": recording_size(src),
+        "dst_bytes": os.path.getsize(dst),
+    }
+
+
+# ---------- Lado del proceso hijo ----------
+
+def _run_job(job_id, src, dst, fmt, events, cancelled, clips=None):
+    """Se ejecuta en el pool: informa del progreso por la cola compartida"""
+    def progress(done, total):
+        if cancelled.get(job_id):
+            raise ExportCancelled()
+        events.put((job_id, "progress", done / total if total else 1.0))
+
+    return transcode(src, dst, fmt, progress, clips=clips)
+
+
+# ---------- Lado del proceso principal ----------
+
+class ExportJob:
+    def __init__(self, job_id, src, dst, fmt):
+        self.id = job_id
+        self.src = src
+        self.dst = dst
+        self.format = fmt
+        self.progress = 0.0
+        self.future = None
+
+
+class ExportService:
+    """Cola de exportaciones repartidas entre todos los núcleos.
+
+    poll() devuelve los eventos pendientes como tuplas (job_id, tipo, valor):
+    ("progress", fracción), ("finished", dict de resultado),
+    ("cancelled", None) y ("error", mensaje).
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+        self._manager = None
+        self._events = None
+        self._cancelled = None
+        self._jobs = {}
+        self._next_id = 1
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            # El manager da una cola y un dict que se pueden pasar a los hijos
+            self._manager = multiprocessing.Manager()
+            self._events = self._manager.Queue()
+            self._cancelled = self._manager.dict()
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    @property
+    def active(self):
+        return bool(self._jobs)
+
+    def submit(self, src, fmt, dst=None, clips=None):
+        """Encola una exportación y devuelve su id (con clips, la versión editada)"""
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato desconocido: {fmt}")
+        self._ensure_pool()
+        job = ExportJob(self._next_id, src, dst or output_path(src, fmt, edited=bool(clips)), fmt)
+        self._next_id += 1
+        job.future = self._pool.submit(_run_job, job.id, job.src, job.dst, job.format,
+                                       self._events, self._cancelled, clips)
+        self._jobs[job.id] = job
+        return job.id
+
+    def job(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        # Si aún no ha empezado basta con quitarlo de la cola del pool
+        if not job.future.cancel():
+            self._cancelled[job_id] = True
+
+    def cancel_all(self):
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+
+    def poll(self):
+        events = []
+        if self._events is None:
+            return events
+        while True:
+            try:
+                job_id, kind, value = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if job_id in self._jobs:
+                self._jobs[job_id].progress = value
+                events.append((job_id, kind, value))
+        for job_id, job in list(self._jobs.items()):
+            if not job.future.done():
+                continue
+            del self._jobs[job_id]
+            self._cancelled.pop(job_id, None)
+            if job.future.cancelled():
+                events.append((job_id, "cancelled", None))
+                continue
+            error = job.future.exception()
+            if isinstance(error, ExportCancelled):
+                events.append((job_id, "cancelled", None))
+            elif error is not None:
+                events.append((job_id, "error", str(error)))
+            else:
+                events.append((job_id, "finished", job.future.result()))
+        return events
+
+    def wait(self, interval=0.2):
+        """Generador de eventos hasta que terminan todos los trabajos (para scripts)"""
+        while self._jobs:
+            yield from self.poll()
+            time.sleep(interval)
+
+    def shutdown(self):
+        self.cancel_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._manager.shutdown()
+            self._pool = None
+            self._manager = None
+            self._events = None
+            self._cancelled = None
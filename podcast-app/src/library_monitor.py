@@ -0,0 +1,33 @@
+from PySide6.QtCore import QObject, Signal
+from library_scanner import LibraryScanner, LibraryWatcher, RECORDINGS_DIR
+
+# Puente entre LibraryWatcher (hilo que repasa la carpeta) y la interfaz:
+# el resultado de cada repaso con cambios llega como señal al hilo de Qt.
+
+
+class LibraryMonitor(QObject):
+    changed = Signal(object)   # dict con el resultado del repaso
+
+    def __init__(self, repo, directory=RECORDINGS_DIR, parent=None, interval=None):
+        super().__init__(parent)
+        self.scanner = LibraryScanner(repo, directory)
+        kwargs = {} if interval is None else {"interval": interval}
+        # La señal se emite desde el hilo del vigilante; Qt la entrega en cola
+        self.watcher = LibraryWatcher(self.scanner, self.changed.emit, **kwargs)
+
+    def start(self):
+        self.watcher.start()
+
+    def stop(self):
+        self.watcher.stop()
+
+    def rescan(self):
+        self.watcher.rescan()
+
+    def exclude(self, filename):
+        """No tocar este archivo (p.ej. mientras se está grabando)"""
+        self.scanner.exclude.add(filename)
+
+    def include(self, filename):
+        self.scanner.exclude.discard(filename)
+        self.watcher.rescan()
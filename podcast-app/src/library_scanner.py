@@ -0,0 +1,229 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from audio_io import open_audio, is_manifest, load_manifest
+from segments import is_abandoned, recover
+from analysis import analyze
+
+# Sincroniza la carpeta de grabaciones con la base de datos: da de alta los
+# archivos copiados a mano, actualiza los que cambian y borra las filas de
+# los que ya no existen. Solo se abre (open_audio) lo que ha cambiado según
+# mtime/tamaño/inodo, así que repasar 50k archivos sin cambios es un
+# recorrido de os.scandir. Las grabaciones por tramos cuentan por su
+# manifiesto; los tramos están en una subcarpeta y no se listan aparte,
+# igual que las exportaciones y normalizaciones (exporter.EXPORTS_DIR).
+# Los archivos que no se pueden abrir no se vuelven a probar hasta que
+# cambian en disco.
+# Este módulo no depende de Qt.
+
+RECORDINGS_DIR = "grabaciones"
+AUDIO_EXTENSIONS = {".wav", ".flac", ".ogg", ".aiff", ".aif", ".mp3"}
+BATCH_SIZE = 500        # filas por transacción
+POLL_INTERVAL = 2.0     # segundos entre repasos del vigilante
+ANALYSIS_BATCH = 16     # archivos analizados por vuelta del vigilante
+IN_PROGRESS = "in_progress"  # _probe: grabación por tramos que aún se está escribiendo
+
+
+def _analyze(path):
+    """(ruta, mtime_ns, datos); datos = None si no se pudo leer"""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        # No existe: si es de la carpeta lo borrará el próximo repaso; si es de
+        # otra, mtime -1 evita que vuelva a salir como pendiente en cada vuelta
+        return path, -1, None
+    try:
+        return path, mtime_ns, analyze(path)
+    except (RuntimeError, OSError, ValueError):
+        return path, mtime_ns, None
+
+
+def _probe(path):
+    """(samplerate, channels, frames), None si no se puede leer o IN_PROGRESS"""
+    try:
+        if is_manifest(path) and not load_manifest(path).get("complete"):
+            if not is_abandoned(path):
+                # La está grabando este u otro proceso: se mira en el próximo repaso
+                return IN_PROGRESS
+            # Grabación por tramos cortada a medias: el proceso que grababa murió
+            recover(path)
+        with open_audio(path) as audio:
+            return audio.samplerate, audio.channels, audio.frames
+    except (RuntimeError, OSError, ValueError):
+        return None  # Corrupto, a medio copiar o sin permisos: se reintenta cuando cambie
+
+
+class LibraryScanner:
+    """Escaneo incremental de una carpeta contra el repositorio.
+
+    exclude: rutas que no se tocan (p.ej. la grabación en curso).
+    """
+
+    def __init__(self, repo, directory=RECORDINGS_DIR, max_workers=None, batch_size=BATCH_SIZE):
+        self.repo = repo
+        self.directory = directory
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 2)
+        self.batch_size = batch_size
+        self.exclude = set()
+        self._failed = {}  # {ruta: (mtime_ns, tamaño, inodo)} de lo que no se pudo abrir
+
+    def _walk(self):
+        """{ruta: (mtime_ns, tamaño, inodo)} de los archivos de audio de la carpeta"""
+        found = {}
+        try:
+            it = os.scandir(self.directory)
+        except FileNotFoundError:
+            return found
+        with it:
+            for entry in it:
+                if (os.path.splitext(entry.name)[1].lower() not in AUDIO_EXTENSIONS
+                        and not is_manifest(entry.name)):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue  # Se borró mientras recorríamos
+                # Mismo formato de ruta que usa la grabación (os.path.join)
+                found[os.path.join(self.directory, entry.name)] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return found
+
+    def scan(self, cancelled=None):
+        """Un repaso completo.
+
+        Devuelve un dict con las rutas dadas de alta ("added"), actualizadas
+        ("updated") y borradas ("removed"), y los contadores "scanned",
+        "failed" y "elapsed".
+        """
+        started = time.monotonic()
+        known = self.repo.scan_states()
+        found = self._walk()
+        exclude = set(self.exclude)  # la interfaz puede cambiarlo mientras tanto
+        for path in exclude:
+            found.pop(path, None)
+
+        # Lo que falló se olvida al desaparecer y no se prueba otra vez hasta que cambia
+        self._failed = {path: sig for path, sig in self._failed.items() if found.get(path) == sig}
+        changed = [(path, sig) for path, sig in found.items()
+                   if known.get(path) != sig and path not in self._failed]
+        # Solo borramos filas de esta carpeta: puede haber grabaciones en otras
+        directory = os.path.normpath(self.directory)
+        removed = [path for path in known
+                   if path not in found and path not in exclude
+                   and os.path.normpath(os.path.dirname(path)) == directory]
+
+        added = []
+        updated = []
+        failed = 0
+        if changed:
+            with ThreadPoolExecutor(self.max_workers) as pool:
+                batch = []
+                # map conserva el orden y va entregando según terminan
+                for (path, sig), info in zip(changed, pool.map(_probe, (p for p, _ in changed))):
+                    if cancelled is not None and cancelled():
+                        pool.shutdown(cancel_futures=True)
+                        break
+                    if info is IN_PROGRESS:
+                        continue
+                    if info is None:
+                        self._failed[path] = sig
+                        failed += 1
+                        continue
+                    (updated if path in known else added).append(path)
+                    batch.append((path,) + sig + info)
+                    if len(batch) >= self.batch_size:
+                        self.repo.upsert_scanned(batch)
+                        batch = []
+                if batch:
+                    self.repo.upsert_scanned(batch)
+        if removed:
+            self.repo.delete_many(removed)
+
+        return {
+            "scanned": len(found),
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+            "failed": failed,
+            "elapsed": time.monotonic() - started,
+        }
+
+    def analyze_pending(self, limit=ANALYSIS_BATCH, cancelled=None):
+        """Calcula los datos técnicos de hasta 'limit' grabaciones que no los tienen al día.
+
+        Devuelve las rutas actualizadas (lista vacía = no queda nada pendiente).
+        """
+        exclude = set(self.exclude)
+        pending = [path for path in self.repo.stale_stats(limit + len(exclude)) if path not in exclude][:limit]
+        if not pending:
+            return []
+        results = []
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            for result in pool.map(_analyze, pending):
+                if cancelled is not None and cancelled():
+                    pool.shutdown(cancel_futures=True)
+                    break
+                results.append(result)
+        if results:
+            self.repo.update_stats_many(results)
+        return [path for path, _mtime, _stats in results]
+
+
+class LibraryWatcher:
+    """Repasa la carpeta cada 'interval' segundos en un hilo (vigilancia por sondeo).
+
+    Entre repaso y repaso analiza, por tandas, las grabaciones que no tienen
+    los datos técnicos al día. on_change(resultado) se llama desde ese hilo
+    cuando hay altas, cambios, bajas o archivos analizados ("analyzed").
+    """
+
+    def __init__(self, scanner, on_change=None, interval=POLL_INTERVAL):
+        self.scanner = scanner
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch_thread, daemon=True)
+        self._thread.start()
+
+    def rescan(self):
+        """Adelanta el próximo repaso"""
+        self._wake.set()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def _watch_thread(self):
+        last_scan = None
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if last_scan is None or self._wake.is_set() or now - last_scan >= self.interval:
+                    self._wake.clear()
+                    result = self.scanner.scan(cancelled=self._stop.is_set)
+                    last_scan = now
+                else:
+                    result = {"added": [], "updated": [], "removed": []}
+                result["analyzed"] = self.scanner.analyze_pending(cancelled=self._stop.is_set)
+                changed = result["added"] or result["updated"] or result["removed"] or result["analyzed"]
+                if changed and self.on_change is not None and not self._stop.is_set():
+                    self.on_change(result)
+                if not result["analyzed"]:
+                    # Nada pendiente: esperamos al próximo repaso
+                    self._wake.wait(max(0.0, self.interval - (time.monotonic() - last_scan)))
+        finally:
+            # La conexión a SQLite es por hilo: la cerramos al salir
+            self.scanner.repo.close()
@@ -0,0 +1,251 @@
+import os
+import time
+import numpy as np
+import soundfile as sf
+from numpy.lib.stride_tricks import sliding_window_view
+from audio_io import open_audio
+from exporter import FORMATS, output_path, _flac_subtype, ExportCancelled, PROGRESS_INTERVAL
+from meters import k_weighted_power, gated_loudness, to_db, LUFS_BLOCK
+
+# Normalización de sonoridad en dos pasadas, leyendo y escribiendo por bloques:
+#   1. measure(): sonoridad integrada (BS.1770, como analysis.py) y pico
+#      real (true peak, sobremuestreando x4 como pide BS.1770 anexo 2).
+#   2. normalize(): aplica la ganancia que lleva al objetivo y, si con ella
+#      el pico real pasaría del techo, un limitador con anticipación.
+# La memoria no depende de la duración del archivo. Las medidas se guardan
+# en la base de datos (tabla loudness_measurements) y 'cli.py normalize'
+# reparte todo en un pool de procesos.
+
+TARGET_LUFS = -16.0        # objetivo habitual para podcasts
+CEILING_DBTP = -1.0        # techo de pico real tras normalizar
+MAX_GAIN_DB = 20.0         # no se sube más que esto (el ruido de fondo también sube)
+LOOKAHEAD = 0.005          # segundos que el limitador ve por delante
+RELEASE = 0.1              # segundos para recuperar la ganancia desde una reducción total
+BLOCK_FRAMES = 65536
+
+OVERSAMPLE = 4
+PHASE_TAPS = 12            # tomas por fase, como el filtro de 48 coeficientes de BS.1770
+CENTER = PHASE_TAPS // 2 - 1  # muestra de la ventana en la que empieza cada interpolación
+
+
+def _interpolator():
+    """Coeficientes (fase, toma) del filtro polifásico de sobremuestreo x4.
+
+    Filtro de longitud impar centrado en una muestra, así que las fases caen
+    en 0, 1/4, 1/2 y 3/4 de muestra (BS.1770 anexo 2): la fase p de la
+    ventana x[0..PHASE_TAPS-1] reconstruye x en CENTER + p/4.
+    """
+    n = OVERSAMPLE * PHASE_TAPS + 1
+    k = np.arange(n) - OVERSAMPLE * PHASE_TAPS // 2
+    h = np.sinc(k / OVERSAMPLE) * np.kaiser(n, 8.0)
+    # Toma q de la fase p: h en el desfase CENTER - q + p/4 (en muestras)
+    offsets = OVERSAMPLE * (CENTER - np.arange(PHASE_TAPS))[None, :] + np.arange(OVERSAMPLE)[:, None]
+    phases = h[offsets + OVERSAMPLE * PHASE_TAPS // 2]
+    return phases / phases.sum(axis=1, keepdims=True)
+
+
+_PHASES = _interpolator()
+
+
+class TruePeakDetector:
+    """Valor absoluto máximo (todos los canales) de la señal reconstruida junto a cada muestra.
+
+    La detección k (el tramo entre las muestras k y k + 1) llega con 'delay'
+    muestras de retraso respecto a la entrada y depende de las muestras
+    k - CENTER .. k + delay; guarda entre bloques lo que el filtro necesita.
+    """
+
+    delay = PHASE_TAPS - 1 - CENTER
+
+    def __init__(self, channels):
+        self._history = np.zeros((PHASE_TAPS - 1, channels), dtype=np.float32)
+
+    def envelope(self, block):
+        data = np.concatenate([self._history, block])
+        self._history = data[len(data) - (PHASE_TAPS - 1):].copy()
+        windows = sliding_window_view(data, PHASE_TAPS, axis=0)  # (n, canales, tomas)
+        upsampled = np.tensordot(windows, _PHASES, axes=([2], [1]))  # (n, canales, fases)
+        return np.abs(upsampled).max(axis=(1, 2))
+
+
+def _sliding_min(values, width):
+    """Mínimo de cada ventana values[i:i + width] (van Herk / Gil-Werman, vectorizado)"""
+    count = len(values) - width + 1
+    if count <= 0:
+        return np.zeros(0)
+    pad = -len(values) % width
+    padded = np.concatenate([values, np.full(pad, np.inf)]).reshape(-1, width)
+    forward = np.minimum.accumulate(padded, axis=1).ravel()
+    backward = np.minimum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.minimum(backward[:count], forward[width - 1:width - 1 + count])
+
+
+class Limiter:
+    """Limitador de pico real con anticipación, por bloques y sin bucles por muestra.
+
+    La ganancia necesaria en cada muestra (techo / pico real) se reduce con
+    un mínimo deslizante que mira LOOKAHEAD por delante, vuelve hacia 1 como
+    mucho a 1/RELEASE por segundo (mínimo acumulado sobre una rampa) y se
+    suaviza con una media móvil, así que baja del todo justo cuando llega el
+    pico. La salida va retrasada 'latency' frames; flush() entrega el final.
+    """
+
+    def __init__(self, samplerate, channels, ceiling_db=CEILING_DBTP, lookahead=LOOKAHEAD, release=RELEASE):
+        # Un pelo por debajo del techo: la salida en float32 redondea hacia arriba a veces
+        self.ceiling = 10 ** (ceiling_db / 20) * (1 - 1e-6)
+        self.channels = channels
+        self.window = max(1, int(lookahead * samplerate))
+        self.detector = TruePeakDetector(channels)
+        delay = self.detector.delay
+        # La muestra s la usan las detecciones s - delay .. s + CENTER, y la media
+        # móvil mezcla 'window' ganancias: la salida espera a la última de ellas
+        # y el mínimo deslizante cubre desde la primera, así ninguna muestra
+        # sale con más ganancia que la que pide cualquier detección que la toca.
+        self.latency = self.window - 1 + delay + CENTER
+        self._span = self.latency + 1
+        self._step = 1.0 / max(1.0, release * samplerate)
+        self._required = np.ones(self._span - 1)
+        self._smooth = np.ones(self.window - 1)
+        self._audio = np.zeros((self.latency, channels), dtype=np.float32)
+        self._gain = 1.0
+        self._skip = self.latency     # lo primero que sale es el relleno del retraso
+        self.reduced = 0.0            # mayor reducción aplicada (dB, negativa)
+
+    def process(self, block):
+        n = len(block)
+        if not n:
+            return block[:0]
+        peak = self.detector.envelope(block)
+        required = np.minimum(1.0, self.ceiling / np.maximum(peak, 1e-12))
+        data = np.concatenate([self._required, required])
+        self._required = data[len(data) - (self._span - 1):]
+        target = _sliding_min(data, self._span)
+
+        # Recuperación lineal: g[i] = min(target[i], g[i-1] + step), vectorizado
+        ramp = self._step * np.arange(n + 1)
+        gain = np.minimum.accumulate(np.r_[self._gain, target - ramp[1:]]) + ramp
+        gain = np.minimum(gain[1:], 1.0)
+        self._gain = gain[-1]
+
+        data = np.concatenate([self._smooth, gain])
+        self._smooth = data[len(data) - (self.window - 1):]
+        csum = np.r_[0.0, np.cumsum(data)]
+        smooth = (csum[self.window:] - csum[:-self.window]) / self.window
+        self.reduced = min(self.reduced, float(to_db(smooth.min())))
+
+        audio = np.concatenate([self._audio, block])
+        self._audio = audio[n:]
+        out = audio[:n] * smooth[:, None].astype(np.float32)
+        if self._skip:
+            skipped = min(self._skip, n)
+            self._skip -= skipped
+            out = out[skipped:]
+        return out
+
+    def flush(self):
+        """Saca las muestras que siguen en la línea de retraso"""
+        return self.process(np.zeros((self.latency, self.channels), dtype=np.float32))
+
+
+def measure(filename, blocksize=BLOCK_FRAMES, cancelled=None):
+    """Primera pasada: sonoridad integrada (LUFS), pico real (dBTP) y pico de muestra (dBFS)"""
+    mtime_ns = os.stat(filename).st_mtime_ns
+    with open_audio(filename) as audio:
+        samplerate, channels, frames = audio.samplerate, audio.channels, audio.frames
+        lufs_block = max(1, int(LUFS_BLOCK * samplerate))
+        rest = np.zeros((0, channels), dtype=np.float32)
+        powers = []
+        detector = TruePeakDetector(channels)
+        true_peak = sample_peak = 0.0
+        for block in audio.blocks(blocksize):
+            if cancelled is not None and cancelled():
+                raise ExportCancelled()
+            if not len(block):
+                continue
+            sample_peak = max(sample_peak, float(np.abs(block).max()))
+            true_peak = max(true_peak, float(detector.envelope(block).max()))
+
+            data = np.concatenate([rest, block]) if len(rest) else block
+            full = len(data) - len(data) % lufs_block
+            if full:
+                powers.append(k_weighted_power(data[:full].reshape(-1, lufs_block, channels),
+                                               samplerate).sum(axis=1))
+            rest = data[full:].copy()
+        # Las últimas muestras del filtro (la cola tras el último bloque)
+        true_peak = max(true_peak, float(detector.envelope(
+            np.zeros((PHASE_TAPS - 1, channels), dtype=np.float32)).max()))
+    return {
+        "mtime_ns": mtime_ns,
+        "samplerate": samplerate,
+        "channels": channels,
+        "frames": frames,
+        "loudness": gated_loudness(np.concatenate(powers)) if powers else None,
+        "true_peak": float(to_db(true_peak)),
+        "sample_peak": float(to_db(sample_peak)),
+    }
+
+
+def gain_for(loudness, target=TARGET_LUFS, max_gain=MAX_GAIN_DB):
+    """Ganancia (dB) que lleva 'loudness' al objetivo; 0 si es silencio"""
+    if loudness is None:
+        return 0.0
+    return min(target - loudness, max_gain)
+
+
+def normalized_path(src, fmt):
+    """grabacion.wav -> exportados/grabacion_normalizado.flac (ver exporter.output_path)"""
+    suffix = FORMATS[fmt][2]
+    return output_path(src, fmt)[:-len(suffix)] + "_normalizado" + suffix
+
+
+def normalize(src, dst, fmt, gain_db, true_peak, ceiling_db=CEILING_DBTP, progress=None,
+              blocksize=BLOCK_FRAMES):
+    """Segunda pasada: escribe src con gain_db aplicada; limita solo si hace falta.
+
+    true_peak: el medido en la primera pasada (dBTP). progress(hechos, total)
+    como en exporter.transcode; si lanza ExportCancelled se borra lo escrito.
+    """
+    file_format, subtype, _ = FORMATS[fmt]
+    tmp = dst + ".part"
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    gain = np.float32(10 ** (gain_db / 20))
+    with open_audio(src) as fin:
+        if subtype is None:
+            subtype = _flac_subtype(fin.subtype)
+        limiter = None
+        if true_peak + gain_db > ceiling_db:
+            limiter = Limiter(fin.samplerate, fin.channels, ceiling_db)
+        buf = np.empty((blocksize, fin.channels), dtype=np.float32)
+        done = 0
+        last = time.monotonic()
+        try:
+            with sf.SoundFile(tmp, mode='w', samplerate=fin.samplerate, channels=fin.channels,
+                              format=file_format, subtype=subtype) as fout:
+                while done < fin.frames:
+                    block = fin.read(done, done + blocksize, out=buf)
+                    if len(block) == 0:
+                        break
+                    done += len(block)
+                    block = np.multiply(block, gain, out=buf[:len(block)])
+                    fout.write(limiter.process(block) if limiter is not None else block)
+                    now = time.monotonic()
+                    if progress is not None and now - last >= PROGRESS_INTERVAL:
+                        last = now
+                        progress(done, fin.frames)
+                if limiter is not None:
+                    fout.write(limiter.flush())
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    os.replace(tmp, dst)
+    if progress is not None:
+        progress(done, done)
+    return {
+        "dst": dst,
+        "frames": done,
+        "gain": float(gain_db),
+        "limited": limiter is not None,
+        "reduction": limiter.reduced if limiter is not None else 0.0,
+        "dst_mtime_ns": os.stat(dst).st_mtime_ns,
+    }
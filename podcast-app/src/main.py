@@ -1,4 +1,13 @@
+import sys
+
+# Con --profile-startup se escriben en stderr los tiempos de cada import y
+# de cada fase del arranque (ver startup_profile.py)
+if "--profile-startup" in sys.argv:
+    sys.argv.remove("--profile-startup")
+    import startup_profile
+    startup_profile.enable()
+
 from ui_main import run
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
@@ -0,0 +1,252 @@
+import threading
+import time
+import numpy as np
+from ringbuffer import RingBuffer
+
+# Medidores de nivel en un hilo aparte: el callback de grabación solo copia
+# cada bloque a un buffer circular y aquí se calculan pico, RMS, retención
+# de pico y sonoridad (LUFS momentáneo y a corto plazo, ITU-R BS.1770).
+
+SILENCE_DB = -120.0
+LUFS_BLOCK = 0.1           # los LUFS se calculan sobre bloques de 100 ms
+MOMENTARY_BLOCKS = 4       # 400 ms
+SHORT_TERM_BLOCKS = 30     # 3 s
+ABSOLUTE_GATE = -70.0      # LUFS
+RELATIVE_GATE = -10.0      # LU respecto a la media de lo que pasa la puerta absoluta
+
+
+def to_db(value):
+    """Amplitud (o array de amplitudes) lineal a dBFS, con suelo en SILENCE_DB"""
+    value = np.maximum(np.asarray(value, dtype=np.float64), 10 ** (SILENCE_DB / 20))
+    return 20 * np.log10(value)
+
+
+def power_to_lufs(power):
+    """Potencia ponderada K (suma de canales) a LUFS"""
+    return -0.691 + 10 * np.log10(np.maximum(power, 1e-12))
+
+
+def gated_loudness(powers):
+    """Sonoridad integrada (BS.1770) a partir de las potencias de bloques de 100 ms.
+
+    Se agrupan en ventanas de 400 ms que avanzan 100 ms (75 % de solape), se
+    descartan las de menos de -70 LUFS y después las que quedan 10 LU por
+    debajo de la media. Devuelve None si todo es silencio.
+    """
+    powers = np.asarray(powers, dtype=np.float64)
+    if len(powers) < MOMENTARY_BLOCKS:
+        if not len(powers):
+            return None
+        windows = np.array([powers.mean()])
+    else:
+        csum = np.concatenate([[0.0], np.cumsum(powers)])
+        windows = (csum[MOMENTARY_BLOCKS:] - csum[:-MOMENTARY_BLOCKS]) / MOMENTARY_BLOCKS
+    windows = windows[power_to_lufs(windows) > ABSOLUTE_GATE]
+    if not len(windows):
+        return None
+    relative = power_to_lufs(windows.mean()) + RELATIVE_GATE
+    windows = windows[power_to_lufs(windows) > relative]
+    return float(power_to_lufs(windows.mean()))
+
+
+def _biquad_response(b, a, w):
+    """|H|² de un biquad en las frecuencias angulares w"""
+    z1 = np.exp(-1j * w)
+    z2 = z1 * z1
+    h = (b[0] + b[1] * z1 + b[2] * z2) / (a[0] + a[1] * z1 + a[2] * z2)
+    return np.abs(h) ** 2
+
+
+_k_cache = {}
+
+
+def k_weighting(n, samplerate):
+    """|H|² del filtro K (estante + paso alto de BS.1770) en los bins de rfft(n)"""
+    key = (n, samplerate)
+    if key not in _k_cache:
+        w = 2 * np.pi * np.fft.rfftfreq(n) # rad/muestra
+        # Etapa 1: estante alto de +4 dB en ~1682 Hz. Con estos parámetros
+        # (los de libebur128) salen exactamente los coeficientes a 48 kHz de
+        # BS.1770 y los equivalentes para cualquier otro samplerate
+        gain, q, fc = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+        K = np.tan(np.pi * fc / samplerate)
+        vh = 10 ** (gain / 20)
+        vb = vh ** 0.4996667741545416
+        shelf_b = (vh + vb * K / q + K * K, 2 * (K * K - vh), vh - vb * K / q + K * K)
+        shelf_a = (1 + K / q + K * K, 2 * (K * K - 1), 1 - K / q + K * K)
+        # Etapa 2: paso alto (RLB) en ~38 Hz
+        q, fc = 0.5003270373238773, 38.13547087602444
+        K = np.tan(np.pi * fc / samplerate)
+        hp_b = (1.0, -2.0, 1.0)
+        hp_a = (1 + K / q + K * K, 2 * (K * K - 1), 1 - K / q + K * K)
+        # El paso alto de la norma no se normaliza por a0: se mantiene b = (1, -2, 1)
+        hp_a = (1.0, hp_a[1] / hp_a[0], hp_a[2] / hp_a[0])
+        _k_cache[key] = _biquad_response(shelf_b, shelf_a, w) * _biquad_response(hp_b, hp_a, w)
+    return _k_cache[key]
+
+
+def k_weighted_power(blocks, samplerate):
+    """Potencia media ponderada K de cada bloque y canal.
+
+    blocks: array (n_bloques, n_muestras, canales). El filtro se aplica en
+    frecuencia (Parseval sobre la FFT del bloque), así que todo va vectorizado.
+    Devuelve (n_bloques, canales).
+    """
+    n = blocks.shape[1]
+    spectrum = np.fft.rfft(blocks, axis=1)
+    weights = k_weighting(n, samplerate).copy()
+    # Los bins intermedios cuentan doble (espectro real)
+    weights[1:(n + 1) // 2] *= 2
+    weights /= n * n
+    return np.einsum('bkc,k->bc', np.abs(spectrum) ** 2, weights)
+
+
+class LevelMeter:
+    """Mide lo que le llega por feed() y publica niveles e historial.
+
+    El historial guarda, cada hop_seconds, el mínimo y el máximo de la señal
+    (todos los canales juntos) para que la gráfica pinte la envolvente.
+    """
+
+    def __init__(self, samplerate, channels, dtype='float32', hop_seconds=0.01,
+                 history_seconds=600.0, hold_seconds=1.5, buffer_seconds=2.0):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.scale = 1 / 32768.0 if dtype == 'int16' else 1.0
+        self._ring = RingBuffer(int(buffer_seconds * samplerate), channels, dtype)
+        self._work = np.zeros((int(buffer_seconds * samplerate), channels), dtype=dtype)
+        self.dropped = 0  # frames que no cupieron (el hilo iba atrasado)
+
+        self.hop = max(1, int(hop_seconds * samplerate))
+        self.hop_seconds = self.hop / samplerate
+        self._history = np.zeros((max(1, int(history_seconds / self.hop_seconds)), 2), dtype=np.float32)
+        self._history_count = 0
+        self._hop_rest = np.zeros((0, channels), dtype=np.float32)
+
+        self.lufs_block = int(LUFS_BLOCK * samplerate)
+        self._lufs_rest = np.zeros((0, channels), dtype=np.float32)
+        self._powers = np.zeros(SHORT_TERM_BLOCKS)  # últimas potencias de 100 ms
+        self._powers_count = 0
+
+        self.hold_seconds = hold_seconds
+        self._lock = threading.Lock()
+        self.peak = np.zeros(channels)
+        self.rms = np.zeros(channels)
+        self.peak_hold = np.zeros(channels)
+        self._hold_time = np.zeros(channels)
+        self.momentary = SILENCE_DB
+        self.short_term = SILENCE_DB
+
+        self._running = False
+        self._thread = None
+
+    # ---------- Lado del callback de audio ----------
+
+    def feed(self, block):
+        """Copia el bloque al buffer (sin reservar memoria). Llamar desde el callback"""
+        written = self._ring.write(block)
+        if written < len(block):
+            self.dropped += len(block) - written
+
+    # ---------- Hilo de medida ----------
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._meter_thread, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._thread.join()
+
+    def _meter_thread(self):
+        last = time.monotonic()
+        while self._running:
+            time.sleep(0.02)
+            n = self._ring.read_into(self._work)
+            now = time.monotonic()
+            if n:
+                self.process(self._work[:n].astype(np.float32) * self.scale, now - last)
+            last = now
+
+    def process(self, block, elapsed):
+        """Actualiza todos los medidores con un bloque float32 (frames x canales)"""
+        peak = np.abs(block).max(axis=0)
+        rms = np.sqrt(np.mean(np.square(block), axis=0))
+
+        # Historial de min/max por hop (se arrastra lo que no llena un hop)
+        data = np.concatenate([self._hop_rest, block]) if len(self._hop_rest) else block
+        full = len(data) - len(data) % self.hop
+        hops = data[:full].reshape(-1, self.hop * self.channels)
+        self._hop_rest = data[full:].copy()
+
+        # Sonoridad sobre bloques de 100 ms
+        data = np.concatenate([self._lufs_rest, block]) if len(self._lufs_rest) else block
+        full_lufs = len(data) - len(data) % self.lufs_block
+        powers = None
+        if full_lufs:
+            blocks = data[:full_lufs].reshape(-1, self.lufs_block, self.channels)
+            powers = k_weighted_power(blocks, self.samplerate).sum(axis=1)
+        self._lufs_rest = data[full_lufs:].copy()
+
+        with self._lock:
+            if len(hops):
+                self._push_history(np.column_stack((hops.min(axis=1), hops.max(axis=1))))
+            if powers is not None:
+                for p in powers[-SHORT_TERM_BLOCKS:]:
+                    self._powers[self._powers_count % SHORT_TERM_BLOCKS] = p
+                    self._powers_count += 1
+                self.momentary = self._loudness(MOMENTARY_BLOCKS)
+                self.short_term = self._loudness(SHORT_TERM_BLOCKS)
+
+            self.peak = peak
+            self.rms = rms
+            # Retención de pico: se mantiene hold_seconds y luego sigue al pico actual
+            self._hold_time += elapsed
+            expired = (peak >= self.peak_hold) | (self._hold_time >= self.hold_seconds)
+            self.peak_hold = np.where(expired, peak, self.peak_hold)
+            self._hold_time[expired] = 0.0
+
+    def _loudness(self, blocks):
+        count = min(blocks, self._powers_count)
+        if count == 0:
+            return SILENCE_DB
+        idx = (self._powers_count - 1 - np.arange(count)) % SHORT_TERM_BLOCKS
+        return float(power_to_lufs(self._powers[idx].mean()))
+
+    def _push_history(self, pairs):
+        size = len(self._history)
+        pairs = pairs[-size:]
+        start = self._history_count % size
+        first = min(len(pairs), size - start)
+        self._history[start:start + first] = pairs[:first]
+        self._history[:len(pairs) - first] = pairs[first:]
+        self._history_count += len(pairs)
+
+    # ---------- Lectura desde la interfaz ----------
+
+    def history_since(self, count):
+        """Pares (min, max) nuevos desde 'count'. Devuelve (nuevo_count, array)"""
+        with self._lock:
+            total = self._history_count
+            size = len(self._history)
+            n = min(total - count, size)
+            if n <= 0:
+                return total, np.zeros((0, 2), dtype=np.float32)
+            idx = (total - n + np.arange(n)) % size
+            return total, self._history[idx]
+
+    def levels(self):
+        """Foto de los niveles actuales: pico, RMS y retención en dBFS por canal, LUFS"""
+        with self._lock:
+            return {
+                "peak": to_db(self.peak),
+                "rms": to_db(self.rms),
+                "peak_hold": to_db(self.peak_hold),
+                "momentary": self.momentary,
+                "short_term": self.short_term,
+            }
@@ -0,0 +1,303 @@
+import os
+import time
+import threading
+import numpy as np
+import sounddevice as sd
+from ringbuffer import RingBuffer
+from audio_io import open_audio
+from segments import open_writer, manifest_for, delete_audio
+from recorder import RECORD_FORMATS
+
+# Grabación simultánea desde varias interfaces (una pista por dispositivo).
+# Cada pista tiene su stream, su buffer circular y su hilo de escritura, así
+# que un disco lento o una interfaz ocupada no afecta a las demás.
+# Los relojes de las tarjetas nunca van exactamente a la misma velocidad:
+# con time.monotonic() como reloj común se mide el ritmo real de cada una y
+# las pistas se remuestrean por bloques contra la primera (la referencia).
+
+MAX_DRIFT = 0.01           # corrección máxima (1 %): más que eso es un error, no deriva
+DRIFT_WARMUP_SECONDS = 2.0  # antes de esto la medida del ritmo es poco fiable
+
+
+class TrackSpec:
+    """Qué grabar: dispositivo de sounddevice, canales y nombre de la pista"""
+
+    def __init__(self, device=None, channels=1, name=None):
+        self.device = device
+        self.channels = channels
+        self.name = name or (f"dev{device}" if device is not None else "default")
+
+
+class DriftResampler:
+    """Remuestreo lineal por bloques con fase continua entre bloques.
+
+    ratio = frames de salida por frame de entrada (1.0 = sin cambios).
+    """
+
+    def __init__(self, channels):
+        self._last = np.zeros((1, channels), dtype=np.float32)
+        self._phase = 1.0  # posición de la próxima salida; x[0] es la última muestra anterior
+
+    def process(self, block, ratio):
+        if len(block) == 0:
+            return block
+        x = np.concatenate([self._last, block])
+        end = len(x) - 1
+        step = 1.0 / ratio
+        count = int(np.floor((end - self._phase) / step)) + 1 if self._phase <= end else 0
+        pos = self._phase + np.arange(count) * step
+        out = np.empty((count, x.shape[1]), dtype=np.float32)
+        idx = np.arange(len(x))
+        for ch in range(x.shape[1]):
+            out[:, ch] = np.interp(pos, idx, x[:, ch])
+        self._phase = self._phase + count * step - end
+        self._last = x[-1:].copy()
+        return out
+
+
+class _Track:
+    def __init__(self, spec, filename, samplerate, buffer_seconds, batch_seconds):
+        self.spec = spec
+        self.filename = filename
+        self.samplerate = samplerate
+        self.channels = spec.channels
+        self.ring = RingBuffer(int(buffer_seconds * samplerate), spec.channels)
+        self.batch = np.zeros((int(batch_seconds * samplerate), spec.channels), dtype=np.float32)
+        self.data_ready = threading.Event()
+        self.resampler = DriftResampler(spec.channels)
+        self.stream = None
+        self.thread = None
+        self.output = None       # lo que escribe el writer (en modo por tramos, el manifiesto)
+        # Reloj: los escribe el callback, los lee el hilo de escritura
+        self.first_time = None   # time.monotonic() del primer bloque
+        self.last_time = None
+        self.frames_in = 0
+        self.frames_out = 0
+        self.ratio = 1.0
+        self.current_amplitude = 0.0
+        self.overflows = 0
+        self.xruns = 0
+
+    def callback(self, indata, frames, time_info, status):
+        # Hilo de audio: solo copiar y apuntar contadores
+        now = time.monotonic()
+        if status.input_overflow:
+            self.xruns += 1
+        written = self.ring.write(indata)
+        if written < frames:
+            self.overflows += frames - written
+        if self.first_time is None:
+            # Hora aproximada del primer frame del bloque
+            self.first_time = now - frames / self.samplerate
+        self.frames_in += frames
+        self.last_time = now
+        if frames > 0:
+            self.current_amplitude = max(float(indata.max()), -float(indata.min()))
+        if self.ring.readable() >= len(self.batch):
+            self.data_ready.set()
+
+    def rate(self):
+        """Frames por segundo del reloj común que entrega de verdad la tarjeta"""
+        if self.first_time is None or self.last_time is None:
+            return None
+        elapsed = self.last_time - self.first_time
+        if elapsed < DRIFT_WARMUP_SECONDS:
+            return None
+        return self.frames_in / elapsed
+
+
+class MultiTrackRecorder:
+    """Graba varias entradas a la vez en archivos alineados (stems).
+
+    filename es la base: cada pista va a "<base>_<nombre>.<ext>", con la
+    extensión de file_format (como en Recorder). Con merge=True, al parar se
+    unen en un solo archivo multicanal (filename) y se borran los stems.
+    """
+
+    def __init__(self, filename, tracks, samplerate=48000, buffer_seconds=30.0,
+                 batch_seconds=0.25, merge=False, segment_seconds=None, file_format="wav"):
+        if not tracks:
+            raise ValueError("Hace falta al menos una pista")
+        if file_format not in RECORD_FORMATS:
+            raise ValueError(f"Formato de grabación no soportado: {file_format}")
+        self.file_format = file_format
+        base = os.path.splitext(filename)[0]
+        ext = RECORD_FORMATS[file_format]
+        self.filename = base + ext
+        self.samplerate = samplerate
+        self.merge = merge
+        self.segment_seconds = segment_seconds
+        self.tracks = [
+            _Track(spec, f"{base}_{spec.name}{ext}", samplerate, buffer_seconds, batch_seconds)
+            for spec in tracks
+        ]
+        self._recording = False
+        self.stems = []   # archivos escritos, en el orden de las pistas
+
+    @property
+    def filenames(self):
+        """Archivos que se están escribiendo (para que el escáner no los toque)"""
+        if self.segment_seconds:
+            stems = [manifest_for(track.filename) for track in self.tracks]
+        else:
+            stems = [track.filename for track in self.tracks]
+        return stems + [self.filename]
+
+    @property
+    def overflows(self):
+        return sum(track.overflows for track in self.tracks)
+
+    @property
+    def xruns(self):
+        return sum(track.xruns for track in self.tracks)
+
+    def start(self):
+        if self._recording:
+            return
+        self._recording = True
+        try:
+            # Primero se abren todos los streams y luego se arrancan seguidos:
+            # así el desfase inicial entre tarjetas es mínimo
+            for track in self.tracks:
+                track.stream = sd.InputStream(device=track.spec.device, channels=track.channels,
+                                              samplerate=self.samplerate, dtype='float32',
+                                              callback=track.callback)
+            for track in self.tracks:
+                track.thread = threading.Thread(target=self._writer_thread, args=(track,), daemon=True)
+                track.thread.start()
+            for track in self.tracks:
+                track.stream.start()
+        except BaseException:
+            # Una tarjeta ocupada o desconectada: no dejar abiertas las demás
+            self._abort_start()
+            raise
+
+    def _abort_start(self):
+        """Deshace un start() a medias: cierra los streams, para los hilos y borra los stems vacíos"""
+        self._recording = False
+        for track in self.tracks:
+            if track.stream is not None:
+                try:
+                    track.stream.close()
+                except sd.PortAudioError:
+                    pass
+                track.stream = None
+        for track in self.tracks:
+            if track.thread is not None:
+                track.data_ready.set()
+                track.thread.join()
+                track.thread = None
+            if track.output:
+                delete_audio(track.output)
+                track.output = None
+
+    def _align_padding(self, track):
+        """Silencio a añadir al principio para que todas las pistas empiecen a la vez"""
+        starts = [t.first_time for t in self.tracks]
+        if any(s is None for s in starts):
+            return None  # Alguna tarjeta aún no ha entregado nada
+        return int(round((track.first_time - min(starts)) * self.samplerate))
+
+    def _drift_ratio(self, track):
+        reference = self.tracks[0]
+        if track is reference:
+            return 1.0
+        ref_rate, rate = reference.rate(), track.rate()
+        if not ref_rate or not rate:
+            return track.ratio
+        return float(np.clip(ref_rate / rate, 1 - MAX_DRIFT, 1 + MAX_DRIFT))
+
+    def _writer_thread(self, track):
+        with open_writer(track.filename, self.samplerate, track.channels,
+                         segment_seconds=self.segment_seconds) as f:
+            track.output = f.filename
+            pad = None
+            while True:
+                running = self._recording
+                track.data_ready.wait(0.25)
+                track.data_ready.clear()
+                if pad is None:
+                    pad = self._align_padding(track)
+                    if pad is None:
+                        if not running:
+                            break  # Se paró antes de que llegara nada
+                        continue
+                    if pad:
+                        f.write(np.zeros((pad, track.channels), dtype=np.float32))
+                        track.frames_out += pad
+                # La medida del ritmo es acumulada: cada vez más estable
+                track.ratio = self._drift_ratio(track)
+                while True:
+                    n = track.ring.read_into(track.batch)
+                    if n == 0:
+                        break
+                    block = track.batch[:n]
+                    if track.ratio != 1.0:
+                        block = track.resampler.process(block, track.ratio)
+                    f.write(block)
+                    track.frames_out += len(block)
+                if not running:
+                    break
+
+    def stop(self):
+        if not self._recording:
+            return
+        for track in self.tracks:
+            track.stream.stop()
+            track.stream.close()
+        self._recording = False
+        for track in self.tracks:
+            track.data_ready.set()
+            track.thread.join()
+        # En el orden de las pistas, no en el que terminan los hilos: merge_tracks
+        # y save_to_catalog emparejan cada stem con su pista por posición
+        self.stems = [track.output for track in self.tracks if track.output]
+        if self.merge:
+            merge_tracks(self.stems, self.filename)
+            for path in self.stems:
+                delete_audio(path)  # En modo por tramos, también la carpeta .parts
+            self.stems = []
+
+
+def merge_tracks(stems, dst, subtype=None, blocksize=65536):
+    """Une varios archivos en uno multicanal (las pistas más cortas se rellenan con silencio)"""
+    readers = [open_audio(path) for path in stems]
+    try:
+        samplerate = readers[0].samplerate
+        channels = sum(r.channels for r in readers)
+        frames = max(r.frames for r in readers)
+        buf = np.zeros((blocksize, channels), dtype=np.float32)
+        with open_writer(dst, samplerate, channels, subtype) as out:
+            for start in range(0, frames, blocksize):
+                n = min(blocksize, frames - start)
+                block = buf[:n]
+                block[:] = 0
+                col = 0
+                for r in readers:
+                    data = r.read(start, start + n)
+                    block[:len(data), col:col + r.channels] = data
+                    col += r.channels
+                out.write(block)
+    finally:
+        for r in readers:
+            r.close()
+    return dst
+
+
+def save_to_catalog(repo, recorder, title=None):
+    """Da de alta lo grabado: el archivo unido o cada stem enlazado a la sesión"""
+    def duration(path):
+        with open_audio(path) as audio:
+            return audio.frames / audio.samplerate if audio.samplerate else None
+
+    if not recorder.stems:
+        repo.add(recorder.filename, title=title or recorder.filename,
+                 duration=duration(recorder.filename))
+        return [recorder.filename]
+    repo.add_many((path, f"{title or recorder.filename} [{track.spec.name}]", "", duration(path))
+                  for path, track in zip(recorder.stems, recorder.tracks))
+    repo.add_stems(recorder.filename, [
+        (path, i, track.spec.name, str(track.spec.device))
+        for i, (path, track) in enumerate(zip(recorder.stems, recorder.tracks))
+    ])
+    return list(recorder.stems)
@@ -0,0 +1,228 @@
+import os
+import numpy as np
+from audio_io import open_audio
+
+# Pirámide de picos (min/max) para pintar formas de onda largas.
+# Se calcula una sola vez por archivo leyendo por bloques y se guarda en un
+# fichero ".peaks.npz" al lado de la grabación.
+
+PEAKS_VERSION = 1
+BASE_BLOCK = 256        # muestras por cubeta en el nivel 0
+LEVEL_FACTOR = 4        # cada nivel agrupa 4 cubetas del anterior
+MIN_BUCKETS = 512       # por debajo de esto ya no merece la pena otro nivel
+READ_BLOCK = BASE_BLOCK * 256  # tamaño de lectura (múltiplo de BASE_BLOCK)
+
+
+class PeaksCancelled(Exception):
+    """La construcción se abandonó porque ya no hace falta (p.ej. cambió la selección)"""
+
+
+def sidecar_path(filename):
+    return filename + ".peaks.npz"
+
+
+def _file_signature(filename):
+    st = os.stat(filename)
+    return st.st_mtime_ns, st.st_size
+
+
+def _reduce(values, factor, func):
+    """Agrupa 'factor' cubetas en una aplicando func (min o max)"""
+    pad = (-len(values)) % factor
+    if pad:
+        values = np.concatenate([values, np.full(pad, values[-1], dtype=values.dtype)])
+    return func(values.reshape(-1, factor), axis=1)
+
+
+class PeakPyramid:
+    """Niveles de min/max de la mezcla mono; el nivel 0 es el más detallado"""
+
+    def __init__(self, samplerate, frames, levels, base_block=BASE_BLOCK):
+        self.samplerate = samplerate
+        self.frames = frames
+        self.levels = levels  # lista de (mins, maxs) en float32
+        self.base_block = base_block
+
+    @property
+    def duration(self):
+        return self.frames / self.samplerate if self.samplerate else 0.0
+
+    def block_size(self, level):
+        """Muestras de audio que representa cada cubeta del nivel"""
+        return self.base_block * LEVEL_FACTOR ** level
+
+    def level_for_width(self, width, frames=None):
+        """Nivel más grueso que aún tiene al menos una cubeta por píxel.
+
+        frames: muestras que ocupa el ancho (por defecto el archivo entero).
+        """
+        for level in range(len(self.levels) - 1, -1, -1):
+            if frames is None:
+                buckets = len(self.levels[level][0])
+            else:
+                buckets = frames / self.block_size(level)
+            if buckets >= width:
+                return level
+        return 0
+
+    def envelope(self, width, start=None, stop=None):
+        """Devuelve (x, y) listos para pintar: min y max intercalados por cubeta.
+
+        Con start/stop (segundos) solo se devuelven las cubetas de esa ventana,
+        del nivel que da al menos una por píxel: lo pintado no depende de la
+        duración del archivo sino del ancho.
+        """
+        if self.samplerate == 0:
+            return np.zeros(0), np.zeros(0)
+        first = 0 if start is None else max(0, int(start * self.samplerate))
+        last = self.frames if stop is None else min(self.frames, int(np.ceil(stop * self.samplerate)))
+        frames = None if start is None and stop is None else max(last - first, 1)
+        level = self.level_for_width(max(int(width), 1), frames)
+        mins, maxs = self.levels[level]
+        block = self.block_size(level)
+        # Una cubeta de margen a cada lado para que la curva llegue a los bordes
+        i0 = max(0, first // block - 1)
+        i1 = min(len(mins), -(-last // block) + 1)
+        if i1 <= i0:
+            return np.zeros(0), np.zeros(0)
+        t = np.arange(i0, i1) * (block / self.samplerate)
+        x = np.repeat(t, 2)
+        y = np.column_stack((mins[i0:i1], maxs[i0:i1])).ravel()
+        return x, y
+
+    def save(self, path, signature):
+        arrays = {"meta": np.array([PEAKS_VERSION, self.samplerate, self.frames,
+                                    signature[0], signature[1]], dtype=np.int64)}
+        for i, (mins, maxs) in enumerate(self.levels):
+            arrays[f"min{i}"] = mins
+            arrays[f"max{i}"] = maxs
+        # Escribimos a un temporal y renombramos para no dejar cachés a medias
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, signature=None):
+        """Carga la caché; devuelve None si no existe o no corresponde al archivo"""
+        try:
+            with np.load(path) as npz:
+                version, samplerate, frames, mtime_ns, size = (int(v) for v in npz["meta"])
+                if version != PEAKS_VERSION:
+                    return None
+                if signature is not None and (mtime_ns, size) != tuple(signature):
+                    return None
+                levels = []
+                i = 0
+                while f"min{i}" in npz.files:
+                    levels.append((npz[f"min{i}"], npz[f"max{i}"]))
+                    i += 1
+        except (OSError, KeyError, ValueError):
+            return None
+        return cls(samplerate, frames, levels)
+
+
+def peaks_from_blocks(blocks, samplerate, cancelled=None):
+    """Construye la pirámide a partir de bloques (frames x canales) consecutivos.
+
+    Todos los bloques salvo el último deben tener un múltiplo de BASE_BLOCK
+    frames. cancelled: función opcional; si devuelve True se lanza PeaksCancelled.
+    """
+    mins_parts = []
+    maxs_parts = []
+    frames = 0
+    for block in blocks:
+        if cancelled is not None and cancelled():
+            raise PeaksCancelled()
+        mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+        frames += len(mono)
+        full = len(mono) - len(mono) % BASE_BLOCK
+        if full:
+            buckets = mono[:full].reshape(-1, BASE_BLOCK)
+            mins_parts.append(buckets.min(axis=1))
+            maxs_parts.append(buckets.max(axis=1))
+        if full < len(mono):
+            # Solo el último bloque puede dejar una cubeta incompleta
+            rest = mono[full:]
+            mins_parts.append(np.array([rest.min()], dtype=np.float32))
+            maxs_parts.append(np.array([rest.max()], dtype=np.float32))
+
+    if mins_parts:
+        mins = np.concatenate(mins_parts)
+        maxs = np.concatenate(maxs_parts)
+    else:
+        mins = np.zeros(0, dtype=np.float32)
+        maxs = np.zeros(0, dtype=np.float32)
+
+    levels = [(mins, maxs)]
+    while len(mins) > MIN_BUCKETS:
+        mins = _reduce(mins, LEVEL_FACTOR, np.min)
+        maxs = _reduce(maxs, LEVEL_FACTOR, np.max)
+        levels.append((mins, maxs))
+    return PeakPyramid(samplerate, frames, levels)
+
+
+def build_peaks(filename, cancelled=None):
+    """Recorre el archivo por bloques y construye la pirámide completa"""
+    with open_audio(filename) as audio:
+        return peaks_from_blocks(audio.blocks(READ_BLOCK), audio.samplerate, cancelled)
+
+
+def peaks_from_array(data, samplerate, cancelled=None):
+    """Igual que build_peaks pero con el audio ya decodificado (frames x canales)"""
+    blocks = (data[i:i + READ_BLOCK] for i in range(0, len(data), READ_BLOCK))
+    return peaks_from_blocks(blocks, samplerate, cancelled)
+
+
+def save_peaks(filename, peaks):
+    """Guarda la pirámide junto al archivo (si se puede escribir ahí)"""
+    try:
+        peaks.save(sidecar_path(filename), _file_signature(filename))
+    except OSError:
+        pass  # Sin permisos de escritura: seguimos sin caché
+
+
+def preview_peaks(filename, buckets=1024, window=BASE_BLOCK * 4):
+    """Vista previa rápida: lee solo una ventana corta en 'buckets' puntos del archivo.
+
+    No es exacta (se pueden escapar picos entre ventanas) pero cuesta lo mismo
+    sea cual sea la duración, así que sirve para pintar algo al instante.
+    """
+    with open_audio(filename) as audio:
+        frames = audio.frames
+        buckets = max(1, min(buckets, frames // window))
+        step = max(1, frames // buckets)
+        mins = np.zeros(buckets, dtype=np.float32)
+        maxs = np.zeros(buckets, dtype=np.float32)
+        buf = np.zeros((window, audio.channels), dtype=np.float32)
+        for i in range(buckets):
+            block = audio.read(i * step, i * step + window, out=buf)
+            if len(block) == 0:
+                break
+            mono = block.mean(axis=1)
+            mins[i] = mono.min()
+            maxs[i] = mono.max()
+        return PeakPyramid(audio.samplerate, frames, [(mins, maxs)], base_block=step)
+
+
+def cached_peaks(filename):
+    """Pirámide guardada en disco si existe y está al día; si no, None"""
+    return PeakPyramid.load(sidecar_path(filename), _file_signature(filename))
+
+
+def load_peaks(filename, cancelled=None):
+    """Pirámide de un archivo: de la caché en disco si está al día, si no se construye"""
+    peaks = cached_peaks(filename)
+    if peaks is not None:
+        return peaks
+    peaks = build_peaks(filename, cancelled)
+    save_peaks(filename, peaks)
+    return peaks
+
+
+def delete_peaks(filename):
+    """Borra la caché de picos de una grabación (si la hay)"""
+    try:
+        os.remove(sidecar_path(filename))
+    except FileNotFoundError:
+        pass
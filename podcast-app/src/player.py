@@ -1,61 +1,201 @@
 import sounddevice as sd
-import soundfile as sf
-import time
+from audio_stream import FileSource, PrefetchReader, ArraySource
+from audio_cache import get_cache
+from edits import EditList, EditedAudio
 
 class Player:
-    def __init__(self):
-        self.data = None      # numpy array (frames x channels)
+    def __init__(self, blocksize=2048):
+        self.filename = None  # archivo cargado
         self.sr = 0           # samplerate
-        self.pos = 0          # posición actual estimada (frames)
+        self.channels = 0
+        self.frames = 0       # duración total en frames
+        self.pos = 0          # posición en pausa / tras un seek (frames)
         self.is_playing = False
-        self._start_time = None  # instante de inicio en time.time()
+        self.blocksize = blocksize
+        self._stream = None   # sd.OutputStream; se reutiliza entre play/pause/seek
+        self._reader = None   # PrefetchReader o ArraySource que alimenta el callback
+        # Reloj de reproducción: lo actualiza el callback con los frames que
+        # realmente ha entregado a la tarjeta y la hora DAC de ese buffer
+        self._clock = None     # (primer frame del último buffer, outputBufferDacTime)
+        self._delivered = 0    # frames entregados hasta ahora (posición en el archivo)
+        self._seek_frame = 0   # el cursor nunca se muestra antes del último seek
+        self.segments = []     # inicios (s) de las regiones de voz, para saltar entre ellas
+        self.edits = None      # EditList aplicada al vuelo (None = archivo tal cual)
 
-    def load(self, filename):
-        sd.stop()
+    @property
+    def duration(self):
+        return self.frames / self.sr if self.sr else 0.0
+
+    @property
+    def finished(self):
+        """True cuando el archivo se ha reproducido hasta el final"""
+        return self._reader is not None and self._reader.finished
+
+    def load(self, filename, segments=None, clips=None):
+        """Abre filename; segments: inicios (s) de sus regiones (ver regions.segment_starts).
+
+        clips: lista de edición (edits.py). Se reproduce la versión editada
+        leyendo del original solo lo que se conserva; posiciones, duración y
+        seek pasan a ser los de la versión editada.
+        """
+        self._close_stream()
         self.is_playing = False
-        self._start_time = None
-        data, sr = sf.read(filename, always_2d=True)
-        self.data = data
-        self.sr = sr
-        self.pos = 0
-
-    def play(self, start_sec=0.0):
-        if self.data is None or self.sr == 0:
+        self.edits = EditList(clips) if clips else None
+        if self.edits is not None:
+            source = FileSource(filename, EditedAudio(self.edits))
+            data = None
+        else:
+            source = FileSource(filename)
+            data = get_cache().lookup_pcm(filename)
+        if data is not None:
+            # Ya decodificado (p.ej. al pintar la forma de onda): no se vuelve a leer
+            source.close()
+            source = ArraySource(data, source.samplerate)
+            self._reader = source
+        else:
+            # Abrimos el archivo ya: el hilo de prefetch empieza a llenar el buffer
+            # y el primer play no tiene que esperar al disco
+            self._reader = PrefetchReader(source)
+        self.filename = filename
+        self.sr = source.samplerate
+        self.channels = source.channels
+        self.frames = source.frames
+        self._reset_clock(0)
+        self.set_segments(segments)
+
+    def set_segments(self, segments):
+        """Inicios de región (s del archivo) -> self.segments, en la versión que suena"""
+        starts = (self.to_timeline_seconds(s) for s in (segments or []))
+        self.segments = sorted({s for s in starts if s is not None})
+
+    def to_source_seconds(self, seconds):
+        """Posición de la versión editada -> segundo del archivo cargado (None si cae en otro)"""
+        if self.edits is None or not self.sr:
+            return seconds
+        found = self.edits.to_source(int(seconds * self.sr))
+        if found is None or found[0] != self.filename:
+            return None
+        return found[1] / self.sr
+
+    def to_timeline_seconds(self, seconds):
+        """Segundo del archivo cargado -> posición en la versión editada (None si no queda nada después)"""
+        if self.edits is None or not self.sr:
+            return seconds
+        frame = self.edits.to_timeline(self.filename, int(seconds * self.sr))
+        return frame / self.sr if frame is not None else None
+
+    def _reset_clock(self, frame):
+        self.pos = frame
+        self._clock = None
+        self._delivered = frame
+        self._seek_frame = frame
+
+    def _callback(self, outdata, frames, time_info, status):
+        start = self._reader.position
+        self._reader.read_into(outdata)
+        self._clock = (start, time_info.outputBufferDacTime)
+        self._delivered = self._reader.position
+
+    def _close_stream(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def tell(self):
+        """Frame que está sonando ahora, compensando la latencia de salida"""
+        if not self.is_playing or self._clock is None:
+            return self.pos
+        start, dac_time = self._clock
+        now = self._stream.time
+        if dac_time and now:
+            frame = start + int((now - dac_time) * self.sr)
+        else:
+            # El backend no da tiempos DAC: usamos la latencia nominal
+            frame = start - int(self._stream.latency * self.sr)
+        return max(self._seek_frame, min(frame, self._delivered, self.frames))
+
+    @property
+    def position(self):
+        """Posición actual en segundos"""
+        return self.tell() / self.sr if self.sr else 0.0
+
+    def seek(self, seconds):
+        """Mueve el puntero de lectura; si está sonando, el stream sigue abierto"""
+        if self._reader is None:
+            return
+        frame = max(0, min(int(seconds * self.sr), self.frames))
+        self._reader.seek(frame)
+        self._reset_clock(frame)
+
+    def next_segment(self):
+        """Salta al inicio de la siguiente región; devuelve la nueva posición o None"""
+        position = self.position
+        for start in self.segments:
+            if start > position + 0.05:
+                self.seek(start)
+                return start
+        return None
+
+    def previous_segment(self, restart_seconds=1.0):
+        """Vuelve al inicio de la región actual o, si acaba de empezar, al de la anterior"""
+        position = self.position
+        for start in reversed(self.segments):
+            if start < position - restart_seconds:
+                self.seek(start)
+                return start
+        if self._reader is not None:
+            self.seek(0.0)
+            return 0.0
+        return None
+
+    def play(self, start_sec=None):
+        if self._reader is None or self.sr == 0:
             return
-            
-        # 1. Calcular posición en frames
-        self.pos = int(start_sec * self.sr)
-        
-        # 2. Protección: si estamos al final, no reproducir o ir al inicio
-        if self.pos >= len(self.data):
-            self.pos = 0
-            start_sec = 0.0
-
-        # 3. Guardar referencia de tiempo para calcular cursor visual
-        self._start_time = time.time() - start_sec
-        self.is_playing = True
 
-        sd.stop()
-        
-        # CORRECCIÓN 2: Slicing del array. 
-        # Reproducimos SOLO desde self.pos hasta el final.
-        # Si no hacemos [self.pos:], siempre reproduce desde el segundo 0.
-        sd.play(self.data[self.pos:], self.sr)
+        if start_sec is not None:
+            self.seek(start_sec)
+
+        # Protección: si estamos al final, volvemos al inicio
+        if self.pos >= self.frames or self.finished:
+            self.seek(0.0)
+
+        if self._stream is None:
+            self._stream = sd.OutputStream(
+                samplerate=self.sr, channels=self.channels, dtype='float32',
+                blocksize=self.blocksize, callback=self._callback)
+        self.is_playing = True
+        if not self._stream.active:
+            self._stream.start()
 
     def pause(self):
         if not self.is_playing:
             return
-        sd.stop()
+        # Guardamos lo que se ha oído de verdad y descartamos lo ya leído por delante
+        frame = self.tell()
+        self._stream.stop()
         self.is_playing = False
-        if self._start_time is not None:
-            # Calcular dónde nos hemos quedado realmente
-            elapsed = time.time() - self._start_time
-            self.pos = int(elapsed * self.sr)
+        self._reader.seek(frame)
+        self._reset_clock(frame)
 
     def stop(self):
-        if self.data is None:
+        if self._reader is None:
             return
-        sd.stop()
+        if self._stream is not None:
+            self._stream.stop()
+        self.is_playing = False
+        self._reader.seek(0)
+        self._reset_clock(0)
+
+    def close(self):
+        """Libera el dispositivo y el archivo (p.ej. antes de borrarlo)"""
+        self._close_stream()
         self.is_playing = False
-        self.pos = 0
-        self._start_time = None
\ No newline at end of file
+        self.filename = None
+        self.segments = []
+        self.edits = None
+        self.sr = 0
+        self.frames = 0
+        self._reset_clock(0)
@@ -1,52 +1,145 @@
+import os
 import sounddevice as sd
-import soundfile as sf
-import queue
 import threading
+import time
 import numpy as np  # Necesitamos numpy para calcular el volumen
+from ringbuffer import RingBuffer
+from meters import LevelMeter
+from segments import open_writer, manifest_for, FLUSH_SECONDS
+
+# Escala para pasar el pico de cada tipo de muestra a 0.0 - 1.0
+_FULL_SCALE = {'float32': 1.0, 'int16': 32768.0}
+
+# Formatos de grabación: clave -> extensión. FLAC y OGG se codifican mientras
+# se graba en el hilo de escritura, sin un segundo paso de exportación.
+RECORD_FORMATS = {"wav": ".wav", "flac": ".flac", "ogg": ".ogg"}
+RECORD_FORMAT_LABELS = {"wav": "WAV", "flac": "FLAC", "ogg": "OGG/Vorbis"}
 
 class Recorder:
-    def __init__(self, filename, samplerate=44100, channels=1):
-        self.filename = filename
+    def __init__(self, filename, samplerate=44100, channels=1, dtype='float32',
+                 buffer_seconds=30.0, batch_seconds=0.5, segment_seconds=None,
+                 flush_seconds=FLUSH_SECONDS, file_format="wav", device=None):
+        if dtype not in _FULL_SCALE:
+            raise ValueError(f"Tipo de muestra no soportado: {dtype}")
+        if file_format not in RECORD_FORMATS:
+            raise ValueError(f"Formato de grabación no soportado: {file_format}")
+        self.file_format = file_format
+        self.device = device  # dispositivo de entrada de sounddevice (None = el predeterminado)
+        filename = os.path.splitext(filename)[0] + RECORD_FORMATS[file_format]
+        # Con segment_seconds se graba por tramos y filename pasa a ser el
+        # manifiesto que los une (ver segments.py)
+        self.segment_seconds = segment_seconds
+        self.filename = manifest_for(filename) if segment_seconds else filename
+        self._target = filename
+        self.flush_seconds = flush_seconds
         self.samplerate = samplerate
         self.channels = channels
-        self._q = queue.Queue()
+        self.dtype = dtype
+        # Buffer circular preasignado: el callback copia ahí sin reservar memoria.
+        # Si el disco se atasca más de buffer_seconds se pierden frames (overflows)
+        # pero la memoria nunca crece.
+        self._ring = RingBuffer(int(buffer_seconds * samplerate), channels, dtype)
+        self._batch = np.zeros((int(batch_seconds * samplerate), channels), dtype=dtype)
+        self._data_ready = threading.Event()
         self._recording = False
         self._thread = None
         # Variable para almacenar el volumen actual (0.0 a 1.0)
         self.current_amplitude = 0.0
+        # Contadores de problemas
+        self.overflows = 0   # frames descartados porque el buffer estaba lleno
+        self.xruns = 0       # avisos de desbordamiento de PortAudio
+        self.max_fill = 0.0  # ocupación máxima que ha tenido el buffer (0..1)
+        # Contrapresión del codificador: cuánto tarda en escribir lo que llega
+        self.encode_seconds = 0.0  # tiempo total dentro de write()
+        self.encoded_frames = 0
+        self.max_write_seconds = 0.0  # la escritura más lenta
+        # Medidores (pico, RMS, LUFS...) calculados en su propio hilo
+        self.meter = LevelMeter(samplerate, channels, dtype)
 
     def _callback(self, indata, frames, time_info, status):
-        if status:
-            print("Recorder status:", status)
-        
+        # Nada de print ni reservas de memoria aquí: es el hilo de audio
+        if status.input_overflow:
+            self.xruns += 1
+
         # 1. Guardamos datos para el archivo
-        self._q.put(indata.copy())
-        
+        written = self._ring.write(indata)
+        if written < frames:
+            self.overflows += frames - written
+        fill = self._ring.readable() / self._ring.capacity
+        if fill > self.max_fill:
+            self.max_fill = fill
+        if self._ring.readable() >= len(self._batch):
+            self._data_ready.set()
+        self.meter.feed(indata)
+
         # 2. Calculamos la amplitud máxima del fragmento actual (volumen)
-        # Esto es lo que leerá la interfaz gráfica
-        if len(indata) > 0:
-            self.current_amplitude = np.max(np.abs(indata))
+        # max/min devuelven escalares, así que no se crea ningún array temporal
+        if frames > 0:
+            peak = max(int(indata.max()), -int(indata.min())) if self.dtype == 'int16' \
+                else max(float(indata.max()), -float(indata.min()))
+            self.current_amplitude = peak / _FULL_SCALE[self.dtype]
 
     def start(self):
         if self._recording:
             return
         self._recording = True
         self.current_amplitude = 0.0
+        self.meter.start()
         self._thread = threading.Thread(target=self._record_thread, daemon=True)
         self._thread.start()
 
+    @property
+    def fill(self):
+        """Ocupación actual del buffer (0..1): si sube, el codificador no da abasto"""
+        return self._ring.readable() / self._ring.capacity
+
+    @property
+    def encoder_load(self):
+        """Tiempo de codificación / duración del audio codificado (>= 1: se queda atrás)"""
+        if self.encoded_frames == 0:
+            return 0.0
+        return self.encode_seconds / (self.encoded_frames / self.samplerate)
+
+    def _drain(self, f):
+        """Vacía el buffer en escrituras grandes (y codifica, si es FLAC/OGG)"""
+        while True:
+            n = self._ring.read_into(self._batch)
+            if n == 0:
+                return
+            started = time.perf_counter()
+            f.write(self._batch[:n])
+            spent = time.perf_counter() - started
+            self.encode_seconds += spent
+            self.encoded_frames += n
+            if spent > self.max_write_seconds:
+                self.max_write_seconds = spent
+
     def _record_thread(self):
-        with sf.SoundFile(self.filename, mode='w', samplerate=self.samplerate, channels=self.channels) as f:
-            with sd.InputStream(samplerate=self.samplerate, channels=self.channels, callback=self._callback):
+        # El escritor es el único que toca el codificador: el callback solo
+        # copia al buffer, así que un FLAC lento nunca lo bloquea
+        with open_writer(self._target, self.samplerate, self.channels,
+                         segment_seconds=self.segment_seconds) as f:
+            with sd.InputStream(device=self.device, samplerate=self.samplerate,
+                                channels=self.channels, dtype=self.dtype, callback=self._callback):
+                last_flush = time.monotonic()
                 while self._recording:
-                    try:
-                        data = self._q.get(timeout=0.1)
-                    except queue.Empty:
-                        continue
-                    f.write(data)
+                    # Esperamos a tener un lote completo (o como mucho 0.25 s)
+                    self._data_ready.wait(0.25)
+                    self._data_ready.clear()
+                    self._drain(f)
+                    # Cabecera al día cada pocos segundos: si el proceso muere
+                    # el archivo sigue siendo legible hasta ese punto
+                    now = time.monotonic()
+                    if now - last_flush >= self.flush_seconds:
+                        f.flush()
+                        last_flush = now
+            # El stream ya está cerrado: escribimos lo que quedara
+            self._drain(f)
 
     def stop(self):
         if not self._recording:
             return
         self._recording = False
-        self._thread.join()
\ No newline at end of file
+        self._data_ready.set()
+        self._thread.join()
+        self.meter.stop()
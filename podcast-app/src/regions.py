@@ -0,0 +1,74 @@
+import numpy as np
+
+# Regiones de voz y silencio de una grabación.
+# analysis.analyze mide el RMS de cada bloque de REGION_BLOCK segundos en la
+# misma pasada que el resto de datos técnicos; aquí se convierten en
+# regiones con histéresis (se entra en voz por encima de SPEECH_DB y solo
+# se sale por debajo de SILENCE_DB) y duraciones mínimas, todo vectorizado.
+# Las regiones se guardan en la base de datos (tabla recording_regions).
+
+REGION_BLOCK = 0.05          # segundos por medida de RMS
+SPEECH_DB = -35.0            # dBFS para empezar una región de voz
+SILENCE_DB = -45.0           # dBFS para terminarla
+MIN_SILENCE_SECONDS = 0.4    # silencios más cortos no cortan la voz (respiraciones)
+MIN_SPEECH_SECONDS = 0.2     # voz más corta se descarta (clics, golpes)
+LONG_PAUSE_SECONDS = 2.0     # a partir de aquí un silencio es una pausa larga
+
+SPEECH = "speech"
+SILENCE = "silence"
+
+
+def block_rms(block, size):
+    """RMS de la mezcla de canales por tramos de 'size' frames (lo que sobra se ignora)"""
+    full = len(block) - len(block) % size
+    if not full:
+        return np.zeros(0)
+    frames = block[:full].reshape(-1, size, block.shape[1])
+    return np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=(1, 2)))
+
+
+def _runs(active):
+    """(inicios, longitudes, valores) de los tramos consecutivos iguales"""
+    change = np.flatnonzero(active[1:] != active[:-1]) + 1
+    starts = np.r_[0, change]
+    lengths = np.diff(np.r_[starts, len(active)])
+    return starts, lengths, active[starts]
+
+
+def _drop_short(active, value, min_blocks):
+    """Invierte los tramos interiores de 'value' más cortos que min_blocks"""
+    starts, lengths, values = _runs(active)
+    short = (values == value) & (lengths < min_blocks)
+    short[0] = short[-1] = False  # los extremos no tienen con qué unirse
+    return np.repeat(np.where(short, ~values, values), lengths)
+
+
+def find_regions(levels_db, block_seconds=REGION_BLOCK, speech_db=SPEECH_DB, silence_db=SILENCE_DB,
+                 min_silence=MIN_SILENCE_SECONDS, min_speech=MIN_SPEECH_SECONDS):
+    """Niveles por bloque (dBFS) -> lista de (inicio, fin, tipo) en segundos, sin huecos"""
+    levels_db = np.asarray(levels_db, dtype=np.float64)
+    if not len(levels_db):
+        return []
+    # Histéresis: cada bloque fuera de la banda decide el estado y los de
+    # dentro heredan el del último que decidió (relleno hacia delante)
+    event = np.where(levels_db > speech_db, 1, np.where(levels_db < silence_db, -1, 0))
+    last = np.maximum.accumulate(np.where(event != 0, np.arange(len(event)), -1))
+    active = (last >= 0) & (event[np.maximum(last, 0)] == 1)
+
+    if len(active) > 1:
+        active = _drop_short(active, False, int(round(min_silence / block_seconds)))
+        active = _drop_short(active, True, int(round(min_speech / block_seconds)))
+    starts, lengths, values = _runs(active)
+    ends = (starts + lengths) * block_seconds
+    return [(float(s * block_seconds), float(e), SPEECH if v else SILENCE)
+            for s, e, v in zip(starts, ends, values)]
+
+
+def long_pauses(regions, min_seconds=LONG_PAUSE_SECONDS):
+    """Silencios de al menos min_seconds"""
+    return [r for r in regions if r[2] == SILENCE and r[1] - r[0] >= min_seconds]
+
+
+def segment_starts(regions):
+    """Inicio de cada región de voz (los puntos a los que salta el reproductor)"""
+    return [start for start, _end, kind in regions if kind == SPEECH]
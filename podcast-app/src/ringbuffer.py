@@ -0,0 +1,58 @@
+import numpy as np
+
+# Buffer circular de frames de audio, preasignado.
+# Pensado para un solo productor y un solo consumidor (p.ej. un hilo que lee
+# de disco y el callback de audio): cada lado solo modifica su propio
+# contador, así que no hace falta bloquear para leer o escribir.
+
+
+class RingBuffer:
+    def __init__(self, capacity, channels, dtype='float32'):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self._buf = np.zeros((self.capacity, channels), dtype=dtype)
+        # Contadores absolutos (siempre crecen); la posición real es % capacity
+        self._write = 0
+        self._read = 0
+
+    @property
+    def dtype(self):
+        return self._buf.dtype
+
+    def readable(self):
+        """Frames disponibles para leer"""
+        return self._write - self._read
+
+    def writable(self):
+        """Hueco libre para escribir"""
+        return self.capacity - (self._write - self._read)
+
+    def write(self, data):
+        """Copia hasta len(data) frames; devuelve cuántos cupieron"""
+        n = min(len(data), self.writable())
+        if n <= 0:
+            return 0
+        start = self._write % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = data[:first]
+        if first < n:
+            self._buf[:n - first] = data[first:n]
+        self._write += n
+        return n
+
+    def read_into(self, out):
+        """Copia hasta len(out) frames en out; devuelve cuántos había"""
+        n = min(len(out), self.readable())
+        if n <= 0:
+            return 0
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._buf[start:start + first]
+        if first < n:
+            out[first:n] = self._buf[:n - first]
+        self._read += n
+        return n
+
+    def clear(self):
+        """Descarta lo pendiente. Solo es seguro si el productor está parado"""
+        self._read = self._write
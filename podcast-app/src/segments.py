@@ -0,0 +1,220 @@
+import os
+import json
+import shutil
+import time
+import soundfile as sf
+from audio_io import (MANIFEST_SUFFIX, is_manifest, load_manifest, segment_files,
+                      repair_wav_header, NotMappable)
+
+# Escritura de grabaciones a prueba de cortes.
+# En modo por tramos la grabación se reparte en archivos de segment_seconds
+# dentro de una carpeta "<nombre>.parts" y un manifiesto JSON
+# ("<nombre>.segments.json") los une en una grabación lógica: es la ruta que
+# se guarda en la base de datos y la que abre audio_io.open_audio.
+# En los dos modos la cabecera WAV se actualiza cada pocos segundos, así que
+# si el proceso muere solo se pierde lo último que no llegó a disco. El
+# formato sale de la extensión (.wav, .flac, .ogg): FLAC y Vorbis se
+# codifican sobre la marcha en el mismo hilo que escribe.
+
+MANIFEST_VERSION = 1
+FLUSH_SECONDS = 5.0
+ABANDONED_FLUSHES = 6  # volcados sin cambios para dar por muerta una grabación a medias
+
+
+def manifest_for(filename):
+    """Ruta del manifiesto para una grabación (rec_1.wav -> rec_1.segments.json)"""
+    return os.path.splitext(filename)[0] + MANIFEST_SUFFIX
+
+
+def parts_dir(manifest):
+    return manifest[:-len(MANIFEST_SUFFIX)] + ".parts"
+
+
+SFC_UPDATE_HEADER_NOW = 0x1060
+HEADER_FORMATS = ("WAV", "WAVEX", "RF64")  # cabecera con el número de frames, reescribible
+
+
+def sync_soundfile(f):
+    """Vuelca a disco y, en WAV/RF64, reescribe la cabecera con los frames escritos hasta ahora.
+
+    FLAC y Ogg solo se vuelcan: no tienen una cabecera que reescribir y a
+    Vorbis el comando de libsndfile le corta el archivo en ese punto.
+    """
+    f.flush()
+    if f.format not in HEADER_FORMATS:
+        return
+    snd, ffi, handle = getattr(sf, "_snd", None), getattr(sf, "_ffi", None), getattr(f, "_file", None)
+    if snd is None or ffi is None or handle is None:
+        return  # Otra versión de soundfile: queda el flush (repair_wav_header lo arregla)
+    # soundfile no expone SFC_UPDATE_HEADER_NOW: vamos directos a libsndfile
+    snd.sf_command(handle, SFC_UPDATE_HEADER_NOW, ffi.NULL, 0)
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class FileWriter:
+    """Un único archivo; flush() actualiza la cabecera"""
+
+    def __init__(self, filename, samplerate, channels, subtype=None):
+        self.filename = filename
+        self._f = sf.SoundFile(filename, mode='w', samplerate=samplerate, channels=channels,
+                               subtype=subtype)
+
+    def write(self, block):
+        self._f.write(block)
+
+    def flush(self):
+        sync_soundfile(self._f)
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SegmentWriter:
+    """Escribe tramos de segment_seconds y mantiene el manifiesto al día"""
+
+    def __init__(self, manifest, samplerate, channels, subtype=None, segment_seconds=600.0,
+                 extension=".wav"):
+        self.filename = manifest
+        self.extension = extension  # formato de los tramos (.wav, .flac, .ogg)
+        self.samplerate = samplerate
+        self.channels = channels
+        self.subtype = subtype
+        self.segment_frames = max(1, int(segment_seconds * samplerate))
+        self._dir = parts_dir(manifest)
+        os.makedirs(self._dir, exist_ok=True)
+        self._f = None
+        self._frames = 0  # frames del tramo actual
+        self._manifest = {
+            "version": MANIFEST_VERSION,
+            "samplerate": samplerate,
+            "channels": channels,
+            "segment_seconds": segment_seconds,
+            "created": time.time(),
+            "complete": False,
+            "segments": [],
+        }
+        self._rotate()
+
+    def _rotate(self):
+        if self._f is not None:
+            self._f.close()
+            self._manifest["segments"][-1]["frames"] = self._frames
+        index = len(self._manifest["segments"])
+        name = f"{index:04d}{self.extension}"
+        self._f = sf.SoundFile(os.path.join(self._dir, name), mode='w', samplerate=self.samplerate,
+                               channels=self.channels, subtype=self.subtype)
+        self._frames = 0
+        rel = os.path.relpath(os.path.join(self._dir, name), os.path.dirname(self.filename) or ".")
+        self._manifest["segments"].append({"file": rel.replace(os.sep, "/"), "frames": 0})
+        _write_json(self.filename, self._manifest)
+
+    def write(self, block):
+        while len(block):
+            room = self.segment_frames - self._frames
+            if room == 0:
+                self._rotate()
+                continue
+            chunk = block[:room]
+            self._f.write(chunk)
+            self._frames += len(chunk)
+            block = block[len(chunk):]
+
+    def flush(self):
+        sync_soundfile(self._f)
+        self._manifest["segments"][-1]["frames"] = self._frames
+        _write_json(self.filename, self._manifest)
+
+    def close(self):
+        if self._f is None:
+            return
+        self._f.close()
+        self._f = None
+        self._manifest["segments"][-1]["frames"] = self._frames
+        self._manifest["complete"] = True
+        _write_json(self.filename, self._manifest)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(filename, samplerate, channels, subtype=None, segment_seconds=None):
+    """FileWriter o, si se piden tramos, SegmentWriter sobre el manifiesto de filename"""
+    if segment_seconds:
+        extension = os.path.splitext(filename)[1] or ".wav"
+        return SegmentWriter(manifest_for(filename), samplerate, channels, subtype, segment_seconds,
+                             extension)
+    return FileWriter(filename, samplerate, channels, subtype)
+
+
+def is_abandoned(manifest, idle_seconds=FLUSH_SECONDS * ABANDONED_FLUSHES):
+    """True si el manifiesto y su último tramo llevan idle_seconds sin cambiar.
+
+    SegmentWriter los reescribe en cada volcado (cada FLUSH_SECONDS), así
+    que una grabación a medias que lleva tanto tiempo quieta no la está
+    escribiendo nadie.
+    """
+    newest = os.stat(manifest).st_mtime
+    for path in segment_files(manifest)[-1:]:
+        try:
+            newest = max(newest, os.stat(path).st_mtime)
+        except FileNotFoundError:
+            pass
+    return time.time() - newest > idle_seconds
+
+
+def recover(manifest):
+    """Cierra una grabación por tramos que quedó a medias (el proceso murió).
+
+    Arregla la cabecera del último tramo, apunta los frames reales y marca el
+    manifiesto como completo. Devuelve True si había algo que recuperar.
+    """
+    data = load_manifest(manifest)
+    if data.get("complete"):
+        return False
+    base = os.path.dirname(manifest)
+    segments = []
+    for seg in data["segments"]:
+        path = os.path.join(base, seg["file"])
+        if not os.path.exists(path):
+            continue
+        try:
+            if path.lower().endswith(".wav"):
+                repair_wav_header(path)
+            seg["frames"] = sf.info(path).frames
+        except (NotMappable, RuntimeError):
+            continue  # Tramo vacío o ilegible: se descarta
+        segments.append(seg)
+    data["segments"] = segments
+    data["complete"] = True
+    _write_json(manifest, data)
+    return True
+
+
+def delete_audio(filename):
+    """Borra una grabación del disco: el archivo o el manifiesto y todos sus tramos"""
+    if is_manifest(filename):
+        if os.path.exists(filename):
+            for path in segment_files(filename):
+                if os.path.exists(path):
+                    os.remove(path)
+            os.remove(filename)
+        shutil.rmtree(parts_dir(filename), ignore_errors=True)
+    elif os.path.exists(filename):
+        os.remove(filename)
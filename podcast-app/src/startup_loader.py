@@ -0,0 +1,56 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+import startup_profile
+
+# Trabajo del arranque que no tiene por qué retrasar la ventana: preparar la
+# base de datos (migraciones) y leer la primera página del catálogo, y
+# cargar PortAudio y consultar el dispositivo de entrada. Cada cosa va en
+# un hilo del pool y avisa con una señal cuando termina.
+
+
+class _Task(QRunnable):
+    def __init__(self, func):
+        super().__init__()
+        self.func = func
+
+    def run(self):
+        self.func()
+
+
+class StartupLoader(QObject):
+    catalogReady = Signal(object)    # primera página de filas del catálogo
+    catalogFailed = Signal(str)
+    deviceReady = Signal(object)     # dict de sounddevice.query_devices(kind="input")
+    deviceFailed = Signal(str)
+
+    def __init__(self, repo, page_size, parent=None):
+        super().__init__(parent)
+        self.repo = repo
+        self.page_size = page_size
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+
+    def start(self):
+        self.pool.start(_Task(self._load_catalog))
+        self.pool.start(_Task(self._probe_device))
+
+    def _load_catalog(self):
+        try:
+            self.repo.init_schema()
+            page = self.repo.list_page(None, self.page_size)
+        except Exception as e:
+            self.catalogFailed.emit(str(e))
+            return
+        startup_profile.mark("catálogo leído")
+        self.catalogReady.emit(page)
+
+    def _probe_device(self):
+        try:
+            # Importar sounddevice inicializa PortAudio y recorre los dispositivos:
+            # después, Recorder y Player lo encuentran ya cargado
+            import sounddevice as sd
+            info = sd.query_devices(kind="input")
+        except Exception as e:  # Sin PortAudio (OSError) o sin entrada (PortAudioError)
+            self.deviceFailed.emit(str(e))
+            return
+        startup_profile.mark("dispositivo de entrada consultado")
+        self.deviceReady.emit(info)
@@ -0,0 +1,74 @@
+import sys
+import time
+import builtins
+import threading
+
+# Tiempos del arranque (python main.py --profile-startup).
+# Apunta cuánto tarda cada import que de verdad carga un módulo (solo en el
+# hilo principal, anidados hasta MAX_DEPTH) y los hitos que marca la
+# aplicación con mark(): ventana creada, primer pintado, catálogo listo...
+# Al final report() lo escribe en stderr. Sin enable() no hace nada.
+
+MAX_DEPTH = 3          # niveles de imports anidados que se muestran
+MIN_IMPORT_MS = 1.0    # los imports más rápidos no se listan
+
+_t0 = time.perf_counter()
+_enabled = False
+_imports = []   # (orden, profundidad, nombre, ms)
+_marks = []     # (nombre, ms desde el arranque, hilo)
+_depth = 0
+_original_import = builtins.__import__
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    """Empieza a medir: llamar antes de importar nada pesado"""
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    builtins.__import__ = _timed_import
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    if (level or name in sys.modules or _depth >= MAX_DEPTH
+            or threading.current_thread() is not threading.main_thread()):
+        return _original_import(name, globals, locals, fromlist, level)
+    entry = [len(_imports), _depth, name, 0.0]
+    _imports.append(entry)
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        entry[3] = (time.perf_counter() - start) * 1000
+
+
+def mark(name):
+    """Apunta un hito con el tiempo transcurrido desde el arranque del proceso"""
+    if _enabled:
+        _marks.append((name, (time.perf_counter() - _t0) * 1000, threading.current_thread().name))
+
+
+def report(file=None):
+    """Escribe imports e hitos y deja de medir"""
+    global _enabled
+    if not _enabled:
+        return
+    _enabled = False
+    builtins.__import__ = _original_import
+    file = file or sys.stderr
+    print("--- imports (ms) ---", file=file)
+    for _, depth, name, ms in _imports:
+        if ms >= MIN_IMPORT_MS:
+            print(f"{ms:8.1f}  {'  ' * depth}{name}", file=file)
+    print("--- arranque (ms desde el inicio) ---", file=file)
+    for name, ms, thread in _marks:
+        where = "" if thread == threading.main_thread().name else f"  [{thread}]"
+        print(f"{ms:8.1f}  {name}{where}", file=file)
+    file.flush()
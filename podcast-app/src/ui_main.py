@@ -1,10 +1,9 @@
-import sys, time, os, sqlite3
+import sys, time, os
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
     QPushButton,
-    QListWidget,
-    QListWidgetItem,
+    QListView,
     QVBoxLayout,
     QWidget,
     QHBoxLayout,
@@ -12,39 +11,82 @@ from PySide6.QtWidgets import (
     QLineEdit,
     QTextEdit,
     QMessageBox,
+    QComboBox,
+    QProgressBar,
+    QCheckBox,
+    QInputDialog,
 )
 from PySide6.QtCore import QTimer, Qt
-from recorder import Recorder
-from player import Player
-from db import init_db, add_recording, list_recordings, update_recording_meta, DB_PATH
-from waveform_widget import WaveformWidget
-import soundfile as sf 
+from db import get_repository
+from catalog_model import (RecordingListModel, record_details, PAGE_SIZE, COL_TITLE, COL_FILENAME,
+                           COL_DESCRIPTION, COL_DURATION)
+from startup_loader import StartupLoader
+import startup_profile
+
+# Para que la ventana salga cuanto antes, aquí solo se importa Qt y lo
+# ligero. pyqtgraph, numpy/soundfile (forma de onda, exportación, escáner)
+# y sounddevice (grabación y reproducción) se importan después del primer
+# pintado (finish_startup) o dentro del método que los usa; la base de
+# datos y el dispositivo de audio se preparan en segundo plano.
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Podcast App Pro") # ¡Nuevo nombre!
         self.rec = None
-        self.player = Player()
+        self._player = None # Se crea al reproducir por primera vez (importa sounddevice)
         self.current_filename = None
         self.loaded_filename = None 
         self.record_start_time = None # Para contar segundos al grabar
+        self._meter_count = 0 # Último punto del historial del medidor ya pintado
+        self.realtime_history_seconds = 60.0 # Historial visible mientras se graba
+        self.segment_minutes = 10 # Duración de cada tramo al grabar por tramos
         
-        init_db()
+        # El esquema y la primera página del catálogo se leen en segundo plano
+        self.repo = get_repository()
 
         # Widgets
         self.btn_rec = QPushButton("Grabar")
+        self.chk_segments = QCheckBox(f"Grabar en tramos de {self.segment_minutes} min")
+        self.chk_segments.setToolTip("Archivos pequeños y a salvo de cortes en sesiones largas")
+        self.cmb_record_format = QComboBox()
+        self.cmb_record_format.setToolTip("Formato en el que se guarda la grabación")
         self.btn_stop = QPushButton("Parar")
         self.btn_play = QPushButton("Reproducir")
         self.btn_pause = QPushButton("Pausar")
+        self.btn_prev_segment = QPushButton("⏮ Segmento")
+        self.btn_next_segment = QPushButton("Segmento ⏭")
+        self.btn_prev_segment.setToolTip("Inicio de la región de voz actual o de la anterior")
+        self.btn_next_segment.setToolTip("Inicio de la siguiente región de voz")
         self.btn_delete = QPushButton("Eliminar")
-        self.btn_export = QPushButton("Exportar a FLAC")
-        self.lst = QListWidget()
-        self.wave = WaveformWidget()
+        self.btn_export = QPushButton("Exportar")
+        self.cmb_export = QComboBox()
+        self.btn_cancel_export = QPushButton("Cancelar exportaciones")
+        self.btn_cancel_export.setVisible(False)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Buscar por título o descripción...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.lst = QListView()
+        self.lst.setUniformItemSizes(True)
+        self.list_model = RecordingListModel(self.repo, self)
+        self.wave = None # WaveformWidget (pyqtgraph) se crea en finish_startup
         self.title_edit = QLineEdit()
         self.desc_edit = QTextEdit()
         self.btn_save_meta = QPushButton("Guardar cambios")
         self.lbl_duration = QLabel("Duración / Tiempo: 0.0 s") # Etiqueta multiuso
+        self.lbl_details = QLabel("") # Datos técnicos guardados en la base de datos
+        # Edición no destructiva (edits.py): solo cambia la lista guardada en la base de datos
+        self.btn_mark_in = QPushButton("Marcar entrada")
+        self.btn_mark_out = QPushButton("Marcar salida")
+        self.btn_cut = QPushButton("Cortar")
+        self.btn_trim = QPushButton("Recortar")
+        self.btn_join = QPushButton("Unir...")
+        self.btn_reset_edits = QPushButton("Deshacer edición")
+        self.btn_cut.setToolTip("Quita la selección")
+        self.btn_trim.setToolTip("Deja solo la selección")
+        self.btn_join.setToolTip("Añade otra grabación al final")
+        self.edit_buttons = [self.btn_mark_in, self.btn_mark_out, self.btn_cut, self.btn_trim,
+                             self.btn_join, self.btn_reset_edits]
 
         # Estilos
         self.btn_rec.setStyleSheet("QPushButton { background-color: #d9534f; color: white; } QPushButton:disabled { background-color: #f2b7b4; color: #aaaaaa; }")
@@ -54,13 +96,26 @@ class MainWindow(QMainWindow):
 
         # Layouts
         left_layout = QVBoxLayout()
-        left_layout.addWidget(self.btn_rec)
+        record_layout = QHBoxLayout()
+        record_layout.addWidget(self.btn_rec, 2)
+        record_layout.addWidget(self.cmb_record_format, 1)
+        left_layout.addLayout(record_layout)
+        left_layout.addWidget(self.chk_segments)
         left_layout.addWidget(self.btn_stop)
         left_layout.addWidget(self.btn_play)
         left_layout.addWidget(self.btn_pause)
+        segment_layout = QHBoxLayout()
+        segment_layout.addWidget(self.btn_prev_segment)
+        segment_layout.addWidget(self.btn_next_segment)
+        left_layout.addLayout(segment_layout)
         left_layout.addWidget(self.btn_delete)
-        left_layout.addWidget(self.btn_export)
+        export_layout = QHBoxLayout()
+        export_layout.addWidget(self.btn_export, 2)
+        export_layout.addWidget(self.cmb_export, 1)
+        left_layout.addLayout(export_layout)
+        left_layout.addWidget(self.btn_cancel_export)
         left_layout.addWidget(QLabel("Lista de grabaciones:"))
+        left_layout.addWidget(self.search_edit)
         left_layout.addWidget(self.lst)
 
         right_layout = QVBoxLayout()
@@ -71,8 +126,15 @@ class MainWindow(QMainWindow):
         right_layout.addWidget(self.desc_edit)
         right_layout.addWidget(self.btn_save_meta)
         right_layout.addWidget(self.lbl_duration)
+        right_layout.addWidget(self.lbl_details)
         right_layout.addWidget(QLabel("Visualización:"))
-        right_layout.addWidget(self.wave)
+        self.wave_placeholder = QWidget()
+        right_layout.addWidget(self.wave_placeholder, 1)
+        self.right_layout = right_layout
+        edit_layout = QHBoxLayout()
+        for button in self.edit_buttons:
+            edit_layout.addWidget(button)
+        right_layout.addLayout(edit_layout)
 
         main_layout = QHBoxLayout()
         main_layout.addLayout(left_layout, 1)
@@ -83,18 +145,47 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(container)
 
         self.status_bar = self.statusBar()
-        self.status_bar.showMessage("Listo")
+        self.status_bar.showMessage("Cargando...")
+        self.export_progress = QProgressBar()
+        self.export_progress.setMaximumWidth(200)
+        self.export_progress.setVisible(False)
+        self.status_bar.addPermanentWidget(self.export_progress)
+
+        self.exports = None  # ExportManager
+        self._export_jobs = {}  # id -> progreso (0..1) de los trabajos en curso
+        self.wave_loader = None  # WaveformLoader
+        self.library = None  # LibraryMonitor: arranca cuando el catálogo está listo
 
         # Conexiones
         self.btn_rec.clicked.connect(self.start_record)
         self.btn_stop.clicked.connect(self.stop_record_or_playback)
         self.btn_play.clicked.connect(self.play_selected)
         self.btn_pause.clicked.connect(self.pause_playback)
+        self.btn_prev_segment.clicked.connect(self.previous_segment)
+        self.btn_next_segment.clicked.connect(self.next_segment)
         self.btn_delete.clicked.connect(self.delete_selected)
         self.btn_export.clicked.connect(self.export_compressed)
         self.btn_save_meta.clicked.connect(self.save_meta)
-        self.lst.itemSelectionChanged.connect(self.on_selection_changed)
-        self.wave.positionChanged.connect(self.on_wave_position_changed)
+        self.btn_mark_in.clicked.connect(self.mark_in)
+        self.btn_mark_out.clicked.connect(self.mark_out)
+        self.btn_cut.clicked.connect(self.cut_selection)
+        self.btn_trim.clicked.connect(self.trim_selection)
+        self.btn_join.clicked.connect(self.join_recording)
+        self.btn_reset_edits.clicked.connect(self.reset_edits)
+
+        # Base de datos y dispositivo de audio en segundo plano
+        self.startup = StartupLoader(self.repo, PAGE_SIZE, self)
+        self.startup.catalogReady.connect(self.on_catalog_ready)
+        self.startup.catalogFailed.connect(self.on_catalog_failed)
+        self.startup.deviceReady.connect(self.on_device_ready)
+        self.startup.deviceFailed.connect(self.on_device_failed)
+
+        # Búsqueda mientras se escribe, esperando una pausa corta entre teclas
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.search_edit.textChanged.connect(self.search_timer.start)
 
         # Timer (ahora más rápido para animaciones suaves: 50ms)
         self.timer = QTimer()
@@ -102,32 +193,145 @@ class MainWindow(QMainWindow):
         self.timer.timeout.connect(self.update_ui_timer)
         self.timer.start()
 
-        # Estado inicial
+        # Estado inicial (grabar y buscar esperan a que el arranque termine)
+        self.btn_rec.setEnabled(False)
         self.btn_stop.setEnabled(False)
         self.btn_play.setEnabled(False)
         self.btn_pause.setEnabled(False)
+        self.btn_prev_segment.setEnabled(False)
+        self.btn_next_segment.setEnabled(False)
         self.btn_delete.setEnabled(False)
         self.btn_export.setEnabled(False)
+        self.search_edit.setEnabled(False)
+        for button in self.edit_buttons:
+            button.setEnabled(False)
+        self._pending_startup = {"catalog", "device"}
+        self._startup_scheduled = False
+        self.input_available = False # Se sabe al consultar el dispositivo de entrada
+        startup_profile.mark("ventana construida")
+
+    @property
+    def player(self):
+        if self._player is None:
+            from player import Player
+            self._player = Player()
+        return self._player
+
+    # ---------- Arranque diferido ----------
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._startup_scheduled:
+            self._startup_scheduled = True
+            # Se ejecuta en cuanto el bucle de eventos ha pintado la ventana
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        startup_profile.mark("primer pintado")
+        # Lo que va en hilos arranca ya, mientras aquí se cargan los módulos de Qt
+        self.startup.start()
+
+        from recorder import RECORD_FORMAT_LABELS
+        from exporter import FORMAT_LABELS
+        from export_manager import ExportManager
+        from waveform_widget import WaveformWidget
+        from waveform_loader import WaveformLoader
+
+        for key, label in RECORD_FORMAT_LABELS.items():
+            self.cmb_record_format.addItem(label, key)
+        for key, label in FORMAT_LABELS.items():
+            self.cmb_export.addItem(label, key)
+
+        self.wave = WaveformWidget()
+        self.right_layout.replaceWidget(self.wave_placeholder, self.wave)
+        self.wave_placeholder.deleteLater()
+        self.wave.positionChanged.connect(self.on_wave_position_changed)
 
-        self.load_list()
+        # Exportaciones en segundo plano (pool de procesos)
+        self.exports = ExportManager(self)
+        self.exports.jobProgress.connect(self.on_export_progress)
+        self.exports.jobFinished.connect(self.on_export_finished)
+        self.exports.jobFailed.connect(self.on_export_failed)
+        self.exports.jobCancelled.connect(self.on_export_cancelled)
+        self.exports.idle.connect(self.on_exports_idle)
+        self.btn_cancel_export.clicked.connect(self.exports.cancel_all)
+
+        # Formas de onda calculadas en segundo plano (QThreadPool)
+        self.wave_loader = WaveformLoader(self, repo=self.repo)
+        self.wave_loader.ready.connect(self.on_waveform_ready)
+        self.wave_loader.details.connect(self.on_waveform_details)
+        self.wave_loader.missing.connect(self.on_waveform_missing)
+        self.wave_loader.failed.connect(self.on_waveform_failed)
+        startup_profile.mark("interfaz completa")
+
+    def on_catalog_ready(self, first_page):
+        from library_monitor import LibraryMonitor
+        from library_scanner import RECORDINGS_DIR
+        self.list_model.reload(first_page)
+        self.lst.setModel(self.list_model)
+        self.lst.selectionModel().selectionChanged.connect(self.on_selection_changed)
+        self.search_edit.setEnabled(True)
+        # Carpeta de grabaciones vigilada en segundo plano (archivos copiados o borrados a mano)
+        self.library = LibraryMonitor(self.repo, RECORDINGS_DIR, self)
+        self.library.changed.connect(self.on_library_changed)
+        self.library.start()
+        startup_profile.mark(f"catálogo en pantalla ({len(first_page)} filas)")
+        self._startup_done("catalog", "Listo")
+
+    def on_catalog_failed(self, error):
+        QMessageBox.critical(self, "Base de datos", f"No se pudo abrir el catálogo: {error}")
+        self._startup_done("catalog", "Sin catálogo")
+
+    def on_device_ready(self, info):
+        self.input_available = True
+        playing = self._player is not None and self.player.is_playing
+        self.btn_rec.setEnabled(self.rec is None and not playing)
+        self.btn_rec.setToolTip(f"Entrada: {info['name']}")
+        self._startup_done("device", None)
+
+    def on_device_failed(self, error):
+        self.btn_rec.setToolTip(f"Sin dispositivo de entrada: {error}")
+        self._startup_done("device", f"Sin dispositivo de entrada: {error}")
+
+    def _startup_done(self, part, message):
+        self._pending_startup.discard(part)
+        if message:
+            self.status_bar.showMessage(message)
+        if not self._pending_startup:
+            startup_profile.mark("arranque completo")
+            startup_profile.report()
 
     # ---------- Grabación ----------
 
     def start_record(self):
-        os.makedirs("grabaciones", exist_ok=True)
+        from recorder import Recorder
+        from library_scanner import RECORDINGS_DIR
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
         filename = f"rec_{int(time.time())}.wav"
-        filepath = os.path.join("grabaciones", filename)
-
-        self.rec = Recorder(filepath)
+        filepath = os.path.join(RECORDINGS_DIR, filename)
+
+        segment_seconds = self.segment_minutes * 60 if self.chk_segments.isChecked() else None
+        self.rec = Recorder(filepath, segment_seconds=segment_seconds,
+                            file_format=self.cmb_record_format.currentData())
+        # El escáner no debe dar de alta el archivo mientras se escribe
+        filepath = self.rec.filename
+        if self.library is not None:
+            self.library.exclude(filepath)
         self.rec.start()
         self.record_start_time = time.time() # Guardamos la hora de inicio
         self.current_filename = filepath
         self.status_bar.showMessage(f"GRABANDO EN VIVO... {filepath}")
         
         # Configurar la gráfica en modo grabación
-        self.wave.start_recording_mode()
+        self.wave.start_recording_mode(
+            history_seconds=self.realtime_history_seconds,
+            points_per_second=1 / self.rec.meter.hop_seconds,
+        )
+        self._meter_count = 0
 
         self.btn_rec.setEnabled(False)
+        self.chk_segments.setEnabled(False)
+        self.cmb_record_format.setEnabled(False)
         self.btn_stop.setEnabled(True)
         self.btn_play.setEnabled(False)
         self.btn_pause.setEnabled(False)
@@ -136,51 +340,67 @@ class MainWindow(QMainWindow):
         self.desc_edit.setEnabled(False)
         self.btn_save_meta.setEnabled(False)
         self.lst.setEnabled(False)
+        self._update_segment_buttons()
+        self._update_edit_buttons()
 
     def stop_record(self):
         if self.rec:
+            from audio_io import open_audio
             self.rec.stop()
-            info = sf.info(self.rec.filename)
-            duration = info.frames / info.samplerate
-            add_recording(self.rec.filename, title=self.rec.filename, description="", duration=duration)
-            self.status_bar.showMessage(f"Grabación finalizada: {self.rec.filename}")
+            filename = self.rec.filename
+            with open_audio(filename) as audio:
+                duration = audio.frames / audio.samplerate
+            self.repo.add(filename, title=filename, description="", duration=duration)
+            if self.library is not None:
+                self.library.include(filename)
+            if self.rec.overflows or self.rec.xruns:
+                self.status_bar.showMessage(
+                    f"Grabación finalizada con cortes: {filename} "
+                    f"({self.rec.overflows} frames perdidos, {self.rec.xruns} xruns, "
+                    f"buffer máx. {self.rec.max_fill:.0%}, escritura {self.rec.encoder_load:.0%})"
+                )
+            else:
+                self.status_bar.showMessage(f"Grabación finalizada: {filename}")
             self.rec = None
             self.record_start_time = None
             
-            self.btn_rec.setEnabled(True)
+            self.btn_rec.setEnabled(self.input_available)
+            self.chk_segments.setEnabled(True)
+            self.cmb_record_format.setEnabled(True)
             self.btn_stop.setEnabled(False)
             self.title_edit.setEnabled(True)
             self.desc_edit.setEnabled(True)
             self.btn_save_meta.setEnabled(True)
             self.lst.setEnabled(True)
-            self.load_list()
-            if self.lst.count() > 0:
-                self.lst.setCurrentRow(0)
+            # Solo insertamos la fila nueva arriba, sin recargar la lista
+            self.list_model.prepend(filename)
+            self.select_filename(filename)
 
     # ---------- Reproducción ----------
 
     def play_selected(self):
-        items = self.lst.selectedItems()
-        if not items: return
-        filename = items[0].data(Qt.UserRole)
-        title_text = items[0].text()
+        selected = self.selected_recording()
+        if not selected: return
+        filename, title_text = selected
         
         if not filename or not os.path.exists(filename):
             self.status_bar.showMessage("Error: Archivo no encontrado")
             return
 
         if self.loaded_filename != filename:
-            self.player.load(filename)
+            from regions import segment_starts
+            self.player.load(filename, segment_starts(self.repo.regions(filename)),
+                             self.repo.edits(filename) or None)
             self.loaded_filename = filename
-            start_sec = 0.0
-        else:
-            start_sec = self.player.pos / self.player.sr if self.player.sr else 0.0
 
-        self.player.play(start_sec=start_sec)
+        # Si ya estaba cargado, sigue desde donde se quedó (pausa o seek)
+        self.player.play()
         
-        dur = len(self.player.data) / self.player.sr if self.player.sr else 0
+        dur = self.player.duration
         self.lbl_duration.setText(f"Duración Total: {round(dur, 2)} s")
         self.status_bar.showMessage(f"Reproduciendo: {title_text}")
+        self._update_segment_buttons()
+        self._update_edit_buttons()
 
         self.btn_rec.setEnabled(False)
         self.btn_play.setEnabled(False)
@@ -190,17 +410,16 @@ class MainWindow(QMainWindow):
         self.lst.setEnabled(False)
 
     def pause_playback(self):
-        if self.player.data is None: return
+        if self._player is None or self.player.filename is None: return
         if self.player.is_playing:
             self.player.pause()
-            self.btn_rec.setEnabled(True)
+            self.btn_rec.setEnabled(self.input_available)
             self.btn_play.setEnabled(True)
             self.btn_pause.setEnabled(True)
             self.btn_stop.setEnabled(True)
             self.status_bar.showMessage("Pausado")
         else:
-            start_sec = self.player.pos / self.player.sr if self.player.sr else 0.0
-            self.player.play(start_sec=start_sec)
+            self.player.play()
             self.btn_rec.setEnabled(False)
             self.btn_play.setEnabled(False)
             self.btn_pause.setEnabled(True)
@@ -208,16 +427,34 @@ class MainWindow(QMainWindow):
             self.status_bar.showMessage("Reproduciendo")
 
     def stop_playback(self):
-        if self.player.data is None: return
+        if self._player is None or self.player.filename is None: return
         self.player.stop()
-        self.btn_rec.setEnabled(True)
+        self.btn_rec.setEnabled(self.input_available)
         self.btn_play.setEnabled(True if self.current_filename else False)
         self.btn_pause.setEnabled(False)
         self.btn_stop.setEnabled(False)
         self.btn_delete.setEnabled(True if self.current_filename else False)
         self.lst.setEnabled(True)
         self.status_bar.showMessage("Listo")
-        self.wave.set_cursor(0)
+        self._show_position(0.0)
+
+    def next_segment(self):
+        self._jump(self.player.next_segment())
+
+    def previous_segment(self):
+        self._jump(self.player.previous_segment())
+
+    def _jump(self, seconds):
+        if seconds is None: return
+        self._show_position(seconds)
+        self.status_bar.showMessage(f"Segmento: {round(seconds, 2)} s")
+
+    def _update_segment_buttons(self):
+        # Solo si el archivo seleccionado es el cargado en el reproductor y tiene regiones
+        enabled = (self.rec is None and self._player is not None and self.player.segments != []
+                   and self.player.filename is not None and self.player.filename == self.current_filename)
+        self.btn_prev_segment.setEnabled(enabled)
+        self.btn_next_segment.setEnabled(enabled)
 
     def stop_record_or_playback(self):
         if self.rec is not None:
@@ -225,16 +462,28 @@ class MainWindow(QMainWindow):
         else:
             self.stop_playback()
 
+    def _show_position(self, seconds):
+        """Cursor de la onda (tiempo del archivo) para una posición del reproductor.
+
+        Con edición, el reproductor va por la versión editada: lo que suena de
+        otra grabación unida al final se muestra al final de la onda.
+        """
+        shown = self.player.to_source_seconds(seconds)
+        self.wave.set_cursor(shown if shown is not None else float("inf"))
+
     def on_wave_position_changed(self, seconds: float):
-        if self.player.data is None: return
-        if self.player.sr:
-            self.player.pos = int(seconds * self.player.sr)
+        if self._player is None or self.player.filename is None: return
+        if self.player.filename != self.current_filename: return
+        # Con edición, un clic en un tramo cortado salta al siguiente que se conserva
+        position = self.player.to_timeline_seconds(seconds)
+        if position is None: return
+        # El seek solo mueve el puntero de lectura; el stream sigue abierto
+        self.player.seek(position)
+        seconds = position
         if self.player.is_playing:
-            self.player.pause()
-            self.player.play(start_sec=seconds)
             self.status_bar.showMessage(f"Seek: {round(seconds, 2)} s")
         else:
-            self.wave.set_cursor(seconds)
+            self._show_position(seconds)
             self.status_bar.showMessage(f"Posición: {round(seconds, 2)} s")
 
     # ---------- Timer Centralizado (UI Loop) ----------
@@ -246,57 +495,66 @@ class MainWindow(QMainWindow):
             elapsed = time.time() - self.record_start_time
             # Formato MM:SS
             mins, secs = divmod(int(elapsed), 60)
-            self.lbl_duration.setText(f"GRABANDO: {mins:02d}:{secs:02d}")
-            
-            # B. Actualizar onda en tiempo real
-            amp = self.rec.current_amplitude
-            self.wave.update_realtime(amp)
+            levels = self.rec.meter.levels()
+            self.lbl_duration.setText(
+                f"GRABANDO: {mins:02d}:{secs:02d}  |  "
+                f"{levels['momentary']:.1f} LUFS (M)  {levels['short_term']:.1f} LUFS (S)  "
+                f"pico {levels['peak_hold'].max():.1f} dBFS  |  "
+                f"buffer {self.rec.fill:.0%}  escritura {self.rec.encoder_load:.0%}"
+            )
+
+            # B. Actualizar onda en tiempo real con todo lo medido desde el último tick
+            self._meter_count, pairs = self.rec.meter.history_since(self._meter_count)
+            if len(pairs):
+                self.wave.update_realtime(pairs)
             return
 
         # CASO 2: ESTAMOS REPRODUCIENDO
-        if self.player.data is not None and self.player.is_playing:
-            if self.player.sr == 0 or self.player._start_time is None: return
-            
-            total_sec = len(self.player.data) / self.player.sr
-            elapsed = time.time() - self.player._start_time
-            seconds = min(elapsed, total_sec)
+        if self._player is not None and self.player.filename is not None and self.player.is_playing:
+            if self.player.sr == 0: return
+
+            total_sec = self.player.duration
+            # Posición según los frames que ha consumido la tarjeta de sonido
+            seconds = self.player.position
             
-            self.wave.set_cursor(seconds)
+            self._show_position(seconds)
             # Actualizamos también el label de tiempo mientras reproduce
             self.lbl_duration.setText(f"Reproduciendo: {round(seconds, 1)} / {round(total_sec, 1)} s")
 
-            if seconds >= total_sec:
-                self.player.stop()
-                self.wave.set_cursor(total_sec)
+            if self.player.finished and seconds >= total_sec:
+                self._show_position(total_sec)
                 self.stop_playback()
 
     # ---------- Gestión ----------
 
     def delete_selected(self):
-        items = self.lst.selectedItems()
-        if not items: return
-        filename = items[0].data(Qt.UserRole)
-        title_text = items[0].text()
+        selected = self.selected_recording()
+        if not selected: return
+        filename, title_text = selected
 
         reply = QMessageBox.question(self, "Eliminar", f"¿Eliminar '{title_text}'?", QMessageBox.Yes | QMessageBox.No)
         if reply != QMessageBox.Yes: return
+        from audio_cache import get_cache
+        from peaks import delete_peaks
+        from segments import delete_audio
 
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("DELETE FROM recordings WHERE filename=?", (filename,))
-        conn.commit()
-        conn.close()
-
-        if os.path.exists(filename):
-            os.remove(filename)
+        self.repo.delete(filename)
 
+        # Cerramos el archivo en el reproductor antes de borrarlo
         if self.loaded_filename == filename:
-            self.player.stop()
+            self.player.close()
             self.loaded_filename = None
+        # La caché puede tener el WAV mapeado en memoria: también hay que soltarlo
+        get_cache().invalidate(filename)
+
+        delete_audio(filename)
+        delete_peaks(filename)
 
         self.status_bar.showMessage(f"Eliminado: {title_text}")
         self.current_filename = None
-        self.load_list()
+        self.wave_loader.cancel()
+        self.list_model.remove(filename)
+        self.lst.clearSelection()
         self.btn_play.setEnabled(False)
         self.btn_pause.setEnabled(False)
         self.btn_delete.setEnabled(False)
@@ -305,12 +563,16 @@ class MainWindow(QMainWindow):
         self.title_edit.clear()
         self.desc_edit.clear()
         self.lbl_duration.setText("Duración: 0.0 s")
+        self.lbl_details.clear()
         self.wave.clear()
+        self._update_segment_buttons()
+        self._update_edit_buttons()
 
     def on_selection_changed(self):
-        items = self.lst.selectedItems()
-        if not items:
+        indexes = self.lst.selectionModel().selectedIndexes()
+        if not indexes:
             self.current_filename = None
+            self.wave_loader.cancel()
             self.btn_play.setEnabled(False)
             self.btn_delete.setEnabled(False)
             self.btn_pause.setEnabled(False)
@@ -318,72 +580,290 @@ class MainWindow(QMainWindow):
             self.title_edit.clear()
             self.desc_edit.clear()
             self.lbl_duration.setText("Duración: 0.0 s")
+            self.lbl_details.clear()
+            self._update_segment_buttons()
+            self._update_edit_buttons()
             return
 
-        filename = items[0].data(Qt.UserRole)
+        # La fila ya viene del modelo: no hace falta consultar la base de datos
+        row = indexes[0].data(RecordingListModel.RecordRole)
+        filename = row[COL_FILENAME]
+        title, desc, dur = row[COL_TITLE], row[COL_DESCRIPTION], row[COL_DURATION]
         self.current_filename = filename
 
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT title, description, duration FROM recordings WHERE filename=?", (filename,))
-        row = c.fetchone()
-        conn.close()
-
         if row:
-            title, desc, dur = row
             self.title_edit.setText(title if title else filename)
             self.desc_edit.setPlainText(desc)
             self.lbl_duration.setText(f"Duración: {round(dur if dur else 0, 2)} s")
+            self.lbl_details.setText(record_details(row))
         
-        if os.path.exists(filename):
-            self.wave.plot_file(filename)
-            if self.rec is None:
-                self.btn_play.setEnabled(True)
-                self.btn_delete.setEnabled(True)
-                self.btn_export.setEnabled(True)
-                self.btn_pause.setEnabled(False)
-                self.btn_stop.setEnabled(False)
+        # Regiones, edición, miniatura y forma de onda llegan del hilo del
+        # cargador (si el archivo no existe, on_waveform_missing deshabilita
+        # lo que se acaba de habilitar)
+        self.wave.clear()
+        self.wave_loader.request(filename)
+        if self.rec is None:
+            self.btn_play.setEnabled(True)
+            self.btn_delete.setEnabled(True)
+            self.btn_export.setEnabled(True)
+            self.btn_pause.setEnabled(False)
+            self.btn_stop.setEnabled(False)
+        self._update_segment_buttons()
+        self._update_edit_buttons()
+
+    def on_waveform_ready(self, filename, peaks, preview):
+        if filename != self.current_filename: return
+        self.wave.show_peaks(peaks, filename)
+        if self.loaded_filename == filename and self._player is not None and self.player.filename is not None:
+            self._show_position(self.player.position)
+
+    def on_waveform_details(self, filename, details):
+        if filename != self.current_filename: return
+        self.wave.set_regions(details["regions"])
+        self._show_edits(filename, details["edits"], details["samplerate"], details["frames"])
+
+    def on_waveform_missing(self, filename):
+        if filename != self.current_filename: return
+        self.status_bar.showMessage(f"Error: Archivo no encontrado ({filename})")
+        self.btn_play.setEnabled(False)
+        self.btn_export.setEnabled(False)
+
+    def on_waveform_failed(self, filename, error):
+        if filename != self.current_filename: return
+        self.status_bar.showMessage(f"No se pudo leer la forma de onda: {error}")
+
+    def on_library_changed(self, result):
+        from audio_cache import get_cache
+        from peaks import delete_peaks
+        for filename in result["analyzed"]:
+            self.list_model.refresh(filename)
+            row = self.list_model.row_of(filename)
+            if filename == self.current_filename and row >= 0:
+                self.lbl_details.setText(record_details(self.list_model.record(row)))
+                self.wave_loader.request(filename) # Regiones nuevas (la onda sale de la caché)
+            if filename == self.loaded_filename and self._player is not None:
+                from regions import segment_starts
+                self.player.set_segments(segment_starts(self.repo.regions(filename)))
+                self._update_segment_buttons()
+                self._update_edit_buttons()
+        if not (result["added"] or result["updated"] or result["removed"]):
+            return
+        for filename in result["removed"]:
+            get_cache().invalidate(filename)
+            delete_peaks(filename)
+            self.list_model.remove(filename)
+        for filename in result["updated"]:
+            get_cache().invalidate(filename)
+            self.list_model.refresh(filename)
+        if result["added"]:
+            # Las altas pueden ir en cualquier punto del orden por fecha
+            self.load_list()
+        self.status_bar.showMessage(
+            f"Biblioteca actualizada: {len(result['added'])} nuevas, "
+            f"{len(result['updated'])} modificadas, {len(result['removed'])} eliminadas"
+        )
 
     def save_meta(self):
         if not self.current_filename: return
         title = self.title_edit.text()
         desc = self.desc_edit.toPlainText()
-        update_recording_meta(self.current_filename, title, desc)
+        self.repo.update_meta(self.current_filename, title, desc)
         self.status_bar.showMessage("Metadatos guardados")
-        self.load_list() 
+        self.list_model.refresh(self.current_filename)
+
+    def apply_search(self):
+        self.list_model.set_search(self.search_edit.text())
+        if self.current_filename:
+            self.select_filename(self.current_filename)
 
     def load_list(self):
-        self.lst.clear()
-        rows = list_recordings()
-        for r in rows:
-            _id, title, filename, desc, created_at, duration = r
-            text = title if title else filename
-            item = QListWidgetItem(text)
-            item.setData(Qt.UserRole, filename) 
-            self.lst.addItem(item)
-            if self.current_filename == filename:
-                self.lst.setCurrentItem(item)
+        # El modelo pide las páginas a medida que la vista las necesita
+        self.list_model.reload()
+        if self.current_filename:
+            self.select_filename(self.current_filename)
+
+    def selected_recording(self):
+        """(filename, texto) de la grabación seleccionada o None"""
+        indexes = self.lst.selectionModel().selectedIndexes()
+        if not indexes: return None
+        row = indexes[0].data(RecordingListModel.RecordRole)
+        return row[COL_FILENAME], row[COL_TITLE] or row[COL_FILENAME]
+
+    def select_filename(self, filename):
+        row = self.list_model.row_of(filename)
+        if row >= 0:
+            self.lst.setCurrentIndex(self.list_model.index(row))
+
+    # ---------- Edición (no destructiva) ----------
+
+    def _update_edit_buttons(self):
+        enabled = self.rec is None and self.current_filename is not None and self.wave is not None
+        for button in self.edit_buttons:
+            button.setEnabled(enabled)
+
+    def mark_in(self):
+        start = self.wave.cursor_position()
+        current = self.wave.selection()
+        self.wave.set_selection(start, current[1] if current and current[1] > start else float("inf"))
+
+    def mark_out(self):
+        end = self.wave.cursor_position()
+        current = self.wave.selection()
+        self.wave.set_selection(current[0] if current and current[0] < end else 0.0, end)
+
+    def _load_edits(self, filename):
+        """(EditList, samplerate, frames del original): la edición guardada o el archivo entero"""
+        from audio_io import open_audio
+        from edits import EditList
+        with open_audio(filename) as audio:
+            sr, frames = audio.samplerate, audio.frames
+        clips = self.repo.edits(filename)
+        return EditList(clips or [(filename, 0, frames)]), sr, frames
+
+    def _edit_selection(self, operation):
+        filename = self.current_filename
+        selection = self.wave.selection()
+        if not filename or selection is None or selection[1] <= selection[0]:
+            self.status_bar.showMessage("Marca primero la entrada y la salida")
+            return
+        edits, sr, frames = self._load_edits(filename)
+        start, end = (int(round(t * sr)) for t in selection)
+        getattr(edits, operation)(filename, start, end)
+        if not edits.clips:
+            self.status_bar.showMessage("La edición no puede dejar la grabación vacía")
+            return
+        self._save_edits(filename, edits, frames)
+
+    def cut_selection(self):
+        self._edit_selection("cut")
+
+    def trim_selection(self):
+        self._edit_selection("trim")
+
+    def join_recording(self):
+        from edits import EditedAudio
+        filename = self.current_filename
+        if not filename: return
+        others = [row for row in self.repo.list() if row[COL_FILENAME] != filename]
+        if not others: return
+        labels = [f"{row[COL_TITLE] or row[COL_FILENAME]}  ({row[COL_FILENAME]})" for row in others]
+        label, ok = QInputDialog.getItem(self, "Unir grabación", "Añadir al final:", labels, 0, False)
+        if not ok: return
+        other = others[labels.index(label)][COL_FILENAME]
+        edits, sr, frames = self._load_edits(filename)
+        try:
+            edits.join(other)
+            EditedAudio(edits).close() # Comprueba que samplerate y canales coinciden
+        except (ValueError, RuntimeError, OSError) as e:
+            QMessageBox.warning(self, "Unir grabación", str(e))
+            return
+        self._save_edits(filename, edits, frames)
+
+    def reset_edits(self):
+        if not self.current_filename: return
+        self.repo.set_edits(self.current_filename, [])
+        self._after_edit(self.current_filename)
+
+    def _save_edits(self, filename, edits, frames):
+        # Si la lista vuelve a ser el archivo entero no se guarda nada
+        unchanged = edits.clips == [(filename, 0, frames)]
+        self.repo.set_edits(filename, [] if unchanged else edits.clips)
+        self.wave.clear_selection()
+        self._after_edit(filename)
+
+    def _after_edit(self, filename):
+        # El reproductor vuelve a abrir el archivo con la edición nueva en el próximo play
+        if self.loaded_filename == filename:
+            self.stop_playback()
+            self.player.close()
+            self.loaded_filename = None
+        if filename == self.current_filename:
+            self.wave_loader.request(filename) # Vuelve a leer la edición y oscurece lo quitado
+        self._update_segment_buttons()
+        self.status_bar.showMessage("Edición guardada (el archivo original no cambia)")
+
+    def _show_edits(self, filename, clips, sr, frames):
+        """Oscurece en la onda lo que quita la edición y muestra la duración editada"""
+        from edits import EditList
+        if not clips:
+            self.wave.set_cuts([])
+            if frames:
+                self.lbl_duration.setText(f"Duración: {round(frames / sr, 2)} s")
+            return
+        if not frames:
+            return # No se pudo abrir: on_waveform_missing/failed avisan
+        edits = EditList(clips)
+        self.wave.set_cuts([(a / sr, b / sr) for a, b in edits.removed(filename, frames)])
+        self.lbl_duration.setText(
+            f"Duración: {round(frames / sr, 2)} s  (editada: {round(edits.frames / sr, 2)} s)"
+        )
+
+    # ---------- Exportación ----------
 
     def export_compressed(self):
+        from exporter import FORMAT_LABELS
         if not self.current_filename or not os.path.exists(self.current_filename): return
-        out_filename = self.current_filename.replace(".wav", ".flac")
-        try:
-            self.status_bar.showMessage("Comprimiendo audio (FLAC)...")
-            QApplication.processEvents()
-            data, sr = sf.read(self.current_filename)
-            sf.write(out_filename, data, sr)
-            size_wav = os.path.getsize(self.current_filename)
-            size_flac = os.path.getsize(out_filename)
-            reduction = (1 - (size_flac / size_wav)) * 100
-            msg = f"Exportado: {os.path.basename(out_filename)}\nAhorro: {reduction:.1f}%"
-            QMessageBox.information(self, "Exportación FLAC", msg)
-            self.status_bar.showMessage(f"Guardado: {os.path.basename(out_filename)}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
-
-def run():
-    app = QApplication(sys.argv)
+        fmt = self.cmb_export.currentData()
+        # Se encola y sigue en otro proceso: la interfaz no se bloquea
+        # Con edición se exporta la versión editada (una pasada por los tramos que se conservan)
+        clips = self.repo.edits(self.current_filename) or None
+        job_id = self.exports.submit(self.current_filename, fmt, clips=clips)
+        self._export_jobs[job_id] = 0.0
+        self.btn_cancel_export.setVisible(True)
+        self.export_progress.setVisible(True)
+        self._update_export_progress()
+        self.status_bar.showMessage(
+            f"Exportando a {FORMAT_LABELS[fmt]}: {os.path.basename(self.current_filename)}"
+        )
+
+    def _update_export_progress(self):
+        if not self._export_jobs: return
+        total = sum(self._export_jobs.values()) / len(self._export_jobs)
+        self.export_progress.setValue(int(total * 100))
+        self.export_progress.setFormat(f"{len(self._export_jobs)} export. %p%")
+
+    def on_export_progress(self, job_id, fraction):
+        if job_id in self._export_jobs:
+            self._export_jobs[job_id] = fraction
+            self._update_export_progress()
+
+    def on_export_finished(self, job_id, result):
+        self._export_jobs.pop(job_id, None)
+        self._update_export_progress()
+        reduction = (1 - (result["dst_bytes"] / result["src_bytes"])) * 100 if result["src_bytes"] else 0.0
+        self.status_bar.showMessage(
+            f"Exportado: {os.path.basename(result['dst'])} (ahorro: {reduction:.1f}%)"
+        )
+
+    def on_export_failed(self, job_id, error):
+        self._export_jobs.pop(job_id, None)
+        self._update_export_progress()
+        QMessageBox.critical(self, "Error al exportar", error)
+
+    def on_export_cancelled(self, job_id):
+        self._export_jobs.pop(job_id, None)
+        self._update_export_progress()
+        self.status_bar.showMessage("Exportación cancelada")
+
+    def on_exports_idle(self):
+        self._export_jobs.clear()
+        self.btn_cancel_export.setVisible(False)
+        self.export_progress.setVisible(False)
+
+    def closeEvent(self, event):
+        if self.library is not None:
+            self.library.stop()
+        if self.exports is not None:
+            self.exports.shutdown()
+        self.startup.pool.waitForDone()
+        super().closeEvent(event)
+
+def run(argv=None):
+    argv = sys.argv if argv is None else argv
+    app = QApplication(argv)
+    startup_profile.mark("QApplication")
     w = MainWindow()
     w.resize(1000, 600)
     w.show()
+    startup_profile.mark("show()")
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,145 @@
+import os
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+from peaks import preview_peaks, PeaksCancelled
+from audio_cache import get_cache
+from audio_io import open_audio
+from analysis import decode_thumb
+
+# Carga de formas de onda fuera del hilo de la interfaz.
+# Cada petición lleva un número de generación: si la selección cambia, las
+# peticiones anteriores quedan obsoletas, se dejan de calcular y sus
+# resultados se descartan. Primero se entrega una vista previa aproximada y
+# después la pirámide completa.
+# Con un repositorio, la misma tarea lee también lo que va encima de la onda
+# (regiones y edición) y la miniatura guardada, que es la primera vista
+# previa: al cambiar de selección el hilo de la interfaz no toca ni la base
+# de datos ni el archivo.
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, loader, generation, filename):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.filename = filename
+
+    def _stale(self):
+        return self.loader.is_stale(self.generation)
+
+    def run(self):
+        if self._stale():
+            return
+        loader = self.loader
+        try:
+            if not os.path.exists(self.filename):
+                loader._missing.emit(self.generation, self.filename)
+                return
+            details = self._details() if loader.repo is not None else None
+            if details is not None:
+                loader._details.emit(self.generation, self.filename, details)
+            cache = get_cache()
+            peaks = cache.lookup_peaks(self.filename)
+            if peaks is None:
+                # Sin caché: la miniatura, algo aproximado ya y la pirámide completa después
+                thumb = details and details["thumbnail"]
+                if thumb and details["frames"]:
+                    loader._loaded.emit(self.generation, self.filename,
+                                        decode_thumb(thumb, details["samplerate"], details["frames"]), True)
+                if self._stale():
+                    return
+                loader._loaded.emit(self.generation, self.filename, preview_peaks(self.filename), True)
+                peaks = cache.get_peaks(self.filename, cancelled=self._stale)
+            loader._loaded.emit(self.generation, self.filename, peaks, False)
+        except PeaksCancelled:
+            pass
+        except Exception as e:
+            loader._failed.emit(self.generation, self.filename, str(e))
+
+    def _details(self):
+        """Regiones, edición y miniatura guardadas, con el formato del archivo (None si no se abre)"""
+        repo = self.loader.repo
+        details = {
+            "regions": repo.regions(self.filename),
+            "edits": repo.edits(self.filename),
+            "thumbnail": repo.thumbnail(self.filename),
+            "samplerate": None,
+            "frames": None,
+        }
+        try:
+            with open_audio(self.filename) as audio:
+                details["samplerate"], details["frames"] = audio.samplerate, audio.frames
+        except (RuntimeError, OSError, ValueError):
+            pass
+        return details
+
+
+class WaveformLoader(QObject):
+    """repo: si se da, también se entrega 'details' (ver _LoadTask._details) antes que la onda"""
+
+    ready = Signal(str, object, bool)   # filename, PeakPyramid, es_vista_previa
+    details = Signal(str, object)       # filename, dict con regions, edits, thumbnail, samplerate, frames
+    missing = Signal(str)               # el archivo ya no existe
+    failed = Signal(str, str)           # filename, error
+
+    # Señales internas (se emiten desde los hilos del pool)
+    _loaded = Signal(int, str, object, bool)
+    _details = Signal(int, str, object)
+    _missing = Signal(int, str)
+    _failed = Signal(int, str, str)
+
+    def __init__(self, parent=None, max_threads=2, delay_ms=30, repo=None):
+        super().__init__(parent)
+        self.repo = repo
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        # La conexión a SQLite es por hilo: hilos que no caducan, conexiones que duran
+        self.pool.setExpiryTimeout(-1)
+        self._generation = 0
+        self._pending = None
+        # Agrupa peticiones seguidas (p.ej. bajar por la lista con el teclado)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._dispatch)
+        self._loaded.connect(self._on_loaded)
+        self._details.connect(self._on_details)
+        self._missing.connect(self._on_missing)
+        self._failed.connect(self._on_failed)
+
+    def is_stale(self, generation):
+        return generation != self._generation
+
+    def request(self, filename):
+        """Pide la forma de onda de filename; anula cualquier petición anterior"""
+        self._generation += 1
+        self._pending = filename
+        self.pool.clear() # Lo que aún no había empezado ya no sirve
+        self._timer.start()
+
+    def cancel(self):
+        self._generation += 1
+        self._pending = None
+        self.pool.clear()
+        self._timer.stop()
+
+    def _dispatch(self):
+        if self._pending is None:
+            return
+        self.pool.start(_LoadTask(self, self._generation, self._pending))
+        self._pending = None
+
+    def _on_loaded(self, generation, filename, peaks, preview):
+        if not self.is_stale(generation):
+            self.ready.emit(filename, peaks, preview)
+
+    def _on_details(self, generation, filename, details):
+        if not self.is_stale(generation):
+            self.details.emit(filename, details)
+
+    def _on_missing(self, generation, filename):
+        if not self.is_stale(generation):
+            self.missing.emit(filename)
+
+    def _on_failed(self, generation, filename, error):
+        if not self.is_stale(generation):
+            self.failed.emit(filename, error)
@@ -1,7 +1,134 @@
-from PySide6.QtCore import Signal, Qt
-from pyqtgraph import PlotWidget, mkPen, InfiniteLine
-import soundfile as sf
+from PySide6.QtCore import Signal, Qt, QTimer, QObject, QRunnable, QThreadPool
+from pyqtgraph import PlotWidget, mkPen, mkBrush, InfiniteLine, BarGraphItem, LinearRegionItem
 import numpy as np
+from audio_cache import get_cache
+from audio_io import open_audio
+from peaks import BASE_BLOCK
+from regions import SPEECH, LONG_PAUSE_SECONDS
+
+# Zoom y desplazamiento: rueda o arrastre con el botón derecho para el zoom,
+# botón central para desplazarse (el izquierdo sigue moviendo el cursor).
+# Cada cambio de la vista vuelve a pedir solo la ventana visible con una
+# resolución de un punto por píxel: de la pirámide de picos mientras haya
+# nivel suficiente y, con mucho zoom, de las muestras reales del archivo.
+# Las muestras se leen en otro hilo y se guarda la última ventana leída
+# (tres veces lo visible): acercarse o desplazarse dentro de ella no lee
+# nada del disco.
+
+MIN_VIEW_SAMPLES = 32   # zoom máximo: esta cantidad de muestras a lo ancho
+
+class ScopeHistory:
+    """Historial circular de pares (min, max) para el modo grabación.
+
+    Los puntos que llegan se agrupan de 'group' en 'group' (uno por píxel) y
+    cada cubeta completa se escribe dos veces, en i y en i + size. Así los
+    últimos 'size' valores son siempre un trozo contiguo del array: se
+    pintan sin copiar ni desplazar nada y cada punto nuevo cuesta O(1).
+    """
+
+    def __init__(self, points, group=1):
+        self.group = group
+        self.size = max(2, -(-points // group))
+        self.mins = np.zeros(2 * self.size, dtype=np.float32)
+        self.maxs = np.zeros(2 * self.size, dtype=np.float32)
+        self.count = 0
+        self._pending = np.zeros((0, 2), dtype=np.float32) # cubeta a medio llenar
+
+    def push(self, pairs):
+        """Añade pares (min, max); devuelve cuántas cubetas se han completado"""
+        if len(self._pending):
+            pairs = np.concatenate([self._pending, pairs])
+        full = len(pairs) - len(pairs) % self.group
+        self._pending = pairs[full:].copy()
+        if full == 0:
+            return 0
+        groups = pairs[:full].reshape(-1, self.group, 2)[-self.size:]
+        n = len(groups)
+        idx = (self.count + np.arange(n)) % self.size
+        mins = groups[:, :, 0].min(axis=1)
+        maxs = groups[:, :, 1].max(axis=1)
+        self.mins[idx] = mins
+        self.mins[idx + self.size] = mins
+        self.maxs[idx] = maxs
+        self.maxs[idx + self.size] = maxs
+        self.count += n
+        return n
+
+    def window(self):
+        """Vistas (sin copia) con los últimos 'size' mínimos y máximos, del más viejo al más nuevo"""
+        start = self.count % self.size
+        return self.mins[start:start + self.size], self.maxs[start:start + self.size]
+
+
+class _SampleTask(QRunnable):
+    def __init__(self, loader, generation, filename, first, last):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.filename = filename
+        self.first = first
+        self.last = last
+
+    def run(self):
+        self.loader._fetch(self.generation, self.filename, self.first, self.last)
+
+
+class _SampleLoader(QObject):
+    """Lee ventanas de muestras (mezcla mono) fuera del hilo de la interfaz.
+
+    Un solo hilo: el archivo queda abierto entre lecturas y solo ese hilo lo
+    toca, así un FLAC no se vuelve a abrir en cada zoom. Como en
+    WaveformLoader, cada petición deja obsoletas las anteriores.
+    """
+
+    loaded = Signal(str, int, int, object)  # filename, primera, última muestra pedida, mono float32
+
+    _loaded = Signal(int, str, int, int, object)  # se emite desde el hilo del pool
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._generation = 0
+        self._audio = None # Lector abierto, solo lo usa el hilo del pool
+        self._audio_name = None
+        self._loaded.connect(self._on_loaded)
+
+    def request(self, filename, first, last):
+        self._generation += 1
+        self.pool.clear()
+        self.pool.start(_SampleTask(self, self._generation, filename, first, last))
+
+    def cancel(self):
+        """Anula lo pedido y cierra el archivo (en el hilo del pool, tras la lectura en curso)"""
+        self.request(None, 0, 0)
+
+    def _close(self):
+        if self._audio is not None:
+            self._audio.close()
+        self._audio = None
+        self._audio_name = None
+
+    def _fetch(self, generation, filename, first, last):
+        if filename != self._audio_name:
+            self._close()
+        if filename is None or generation != self._generation:
+            return
+        try:
+            if self._audio is None:
+                self._audio = open_audio(filename)
+                self._audio_name = filename
+            block = self._audio.read(first, last)
+        except (OSError, RuntimeError, ValueError):
+            self._close()
+            return # El archivo ya no está o no se puede leer: queda la pirámide
+        mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+        self._loaded.emit(generation, filename, first, last, mono)
+
+    def _on_loaded(self, generation, filename, first, last, mono):
+        if generation == self._generation:
+            self.loaded.emit(filename, first, last, mono)
+
 
 class WaveformWidget(PlotWidget):
     positionChanged = Signal(float)
@@ -13,54 +140,264 @@ class WaveformWidget(PlotWidget):
         self._curve = None
         self._line = None
         self._duration = 0.0
+        self._peaks = None # Pirámide del archivo mostrado
+        self._filename = None # Archivo del que leer muestras con zoom cercano
+        self._samples = None # (primera, última, mono) de la última ventana de muestras leída
+        self._samples_wanted = None # (primera, última) pedida y aún sin llegar
+        self._sample_loader = _SampleLoader(self)
+        self._sample_loader.loaded.connect(self._on_samples)
+        self._regions = [] # (inicio, fin, tipo) del archivo mostrado
+        self._region_items = []
+        self._cuts = [] # (inicio, fin) en segundos que la edición ha quitado
+        self._selection = None # LinearRegionItem con la selección para editar
 
-        # Buffers para tiempo real
-        self._realtime_data = np.zeros(200) # Guardamos los últimos 200 puntos
-        self._ptr = 0
+        # Tiempo real (ver start_recording_mode)
+        self._scope = None
+        self._rt_x = None
+        self._rt_bottom = None
 
         # Configuración ratón
         self.setMouseEnabled(x=False, y=False)
         self._dragging = False
 
-    def plot_file(self, filename, downsample=10):
-        """Modo estático: Pinta el archivo completo"""
+        # Los cambios de vista se agrupan: un solo redibujado por vuelta del bucle de eventos
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.setInterval(0)
+        self._redraw_timer.timeout.connect(self._draw_peaks)
+        self.getViewBox().sigXRangeChanged.connect(self._on_range_changed)
+
+    def plot_file(self, filename):
+        """Modo estático: Pinta el archivo completo a partir de su pirámide de picos"""
+        self.show_peaks(get_cache().get_peaks(filename), filename)
+
+    def show_peaks(self, peaks, filename=None):
+        """Pinta una pirámide. Si es del mismo archivo que ya se ve (p.ej. la
+        completa tras la vista previa) se conserva el zoom; si no, se ve entero.
+        """
         # Habilitar eje inferior normal
         self.getPlotItem().setLabel('bottom', text='Tiempo (s)')
-        
-        data, sr = sf.read(filename, always_2d=True)
-        mono = data.mean(axis=1)
-        if downsample > 1:
-            mono = mono[::downsample]
-            sr = sr / downsample
-        x = np.linspace(0, len(mono) / sr, num=len(mono))
-        self._duration = float(len(mono) / sr)
+        self.getPlotItem().showAxis('bottom')
+        same_file = filename is not None and filename == self._filename and self._peaks is not None
+        selection = self.selection() if same_file else None
+        if not same_file:
+            self._forget_samples()
+        self._peaks = peaks
+        self._filename = filename
+        self._duration = float(peaks.duration)
 
-        self.clear()
-        self._curve = self.plot(x, mono, pen=mkPen('#00bcd4', width=1)) # Cian
-        
+        self.plotItem.clear()
+        self._curve = self.plot(pen=mkPen('#00bcd4', width=1)) # Cian
         self._line = InfiniteLine(pos=0.0, angle=90, movable=False, pen=mkPen('r', width=1))
         self.addItem(self._line)
+        self._add_regions()
+        self._selection = None
+        if selection is not None:
+            self.set_selection(*selection)
 
-    def start_recording_mode(self):
-        """Prepara la gráfica para recibir datos en vivo"""
+        self.setMouseEnabled(x=True, y=False)
+        if not same_file:
+            duration = max(self._duration, 1e-3)
+            min_range = MIN_VIEW_SAMPLES / peaks.samplerate if peaks.samplerate else None
+            self.setLimits(xMin=0, xMax=duration, minXRange=min_range, maxXRange=duration)
+            self.setYRange(-1, 1)
+            self.setXRange(0, duration, padding=0)
+        self._draw_peaks()
+
+    def clear(self):
+        """Quita todo lo pintado y olvida el archivo"""
+        self.plotItem.clear()
+        self._peaks = None
+        self._filename = None
+        self._forget_samples()
+        self._regions = []
+        self._region_items = []
+        self._cuts = []
+        self._selection = None
+        self._curve = None
+        self._line = None
+
+    def set_regions(self, regions):
+        """Regiones de voz y silencio (regions.find_regions) a sombrear bajo la onda"""
+        for item in self._region_items:
+            self.removeItem(item)
+        self._regions = list(regions)
+        if self._peaks is not None:
+            self._add_regions()
+
+    def set_cuts(self, cuts):
+        """Tramos (inicio, fin) en segundos quitados por la edición: se oscurecen sobre la onda"""
+        for item in self._region_items:
+            self.removeItem(item)
+        self._cuts = list(cuts)
+        if self._peaks is not None:
+            self._add_regions()
+
+    def _add_regions(self):
+        # Un solo BarGraphItem por tipo: miles de regiones siguen siendo pocos objetos
+        self._region_items = []
+        speech = [(start, end) for start, end, kind in self._regions if kind == SPEECH]
+        pauses = [(start, end) for start, end, kind in self._regions
+                  if kind != SPEECH and end - start >= LONG_PAUSE_SECONDS]
+        for spans, color, z in ((speech, '#00bcd41c', -10), (pauses, '#f0ad4e30', -10),
+                                (self._cuts, '#000000b0', 5)):
+            if not spans:
+                continue
+            x0, x1 = np.array(spans).T
+            item = BarGraphItem(x0=x0, x1=x1, y0=-1, y1=1, pen=mkPen(None), brush=mkBrush(color))
+            item.setZValue(z)
+            self.addItem(item)
+            self._region_items.append(item)
+
+    # ---------- Selección para editar ----------
+
+    def set_selection(self, start, end):
+        start, end = sorted((max(0.0, start), min(end, self._duration)))
+        if self._selection is None:
+            self._selection = LinearRegionItem(values=(start, end), brush=mkBrush('#ffffff30'))
+            self._selection.setZValue(10)
+            self.addItem(self._selection)
+        else:
+            self._selection.setRegion((start, end))
+
+    def selection(self):
+        """(inicio, fin) en segundos o None si no hay selección"""
+        if self._selection is None:
+            return None
+        start, end = self._selection.getRegion()
+        return max(0.0, start), min(end, self._duration)
+
+    def clear_selection(self):
+        if self._selection is not None:
+            self.removeItem(self._selection)
+            self._selection = None
+
+    def cursor_position(self):
+        return float(self._line.value()) if self._line is not None else 0.0
+
+    def _on_range_changed(self, *args):
+        if self._peaks is not None:
+            self._redraw_timer.start()
+
+    def _view_frames(self):
+        """(primera, última) muestra visibles"""
+        t0, t1 = self.getViewBox().viewRange()[0]
+        sr = self._peaks.samplerate
+        first = int(np.clip(np.floor(t0 * sr), 0, self._peaks.frames))
+        last = int(np.clip(np.ceil(t1 * sr), first, self._peaks.frames))
+        return first, last
+
+    def _draw_peaks(self):
+        if self._peaks is None or self._curve is None:
+            return
+        # Un punto (o un par min/max) por píxel de la ventana visible
+        width = max(int(self.getViewBox().width()), 200)
+        first, last = self._view_frames()
+        sr = self._peaks.samplerate
+        if not sr:
+            return
+        data = None
+        # Con más zoom del que da la pirámide, muestras reales (como mucho
+        # width * BASE_BLOCK frames: la memoria no depende del archivo).
+        # Mientras llegan del hilo lector se pinta el nivel más fino.
+        if self._filename is not None and last - first < width * min(self._peaks.base_block, BASE_BLOCK):
+            data = self._samples_xy(first, last, width)
+            if data is None:
+                self._request_samples(first, last)
+        if data is None:
+            data = self._peaks.envelope(width, first / sr, last / sr)
+        self._curve.setData(*data)
+
+    def _samples_xy(self, first, last, width):
+        """(x, y) de [first, last) con la última ventana leída: tal cual o min/max por píxel.
+
+        None si la ventana no cubre lo pedido.
+        """
+        if self._samples is None:
+            return None
+        start, stop, mono = self._samples
+        if first < start or last > stop:
+            return None
+        sr = self._peaks.samplerate
+        margin = max(1, (last - first) // width)
+        i0 = max(0, first - margin - start)
+        mono = mono[i0:max(i0, last + margin - start)]
+        first = start + i0
+        n = len(mono)
+        if n <= 2 * width:
+            return (first + np.arange(n)) / sr, mono
+        step = -(-n // width)
+        pad = (-n) % step
+        if pad:
+            mono = np.concatenate([mono, np.full(pad, mono[-1], dtype=mono.dtype)])
+        groups = mono.reshape(-1, step)
+        x = np.repeat((first + np.arange(len(groups)) * step) / sr, 2)
+        y = np.column_stack((groups.min(axis=1), groups.max(axis=1))).ravel()
+        return x, y
+
+    def _request_samples(self, first, last):
+        """Pide al hilo lector lo visible y una vista más a cada lado"""
+        wanted = self._samples_wanted
+        if wanted is not None and wanted[0] <= first and last <= wanted[1]:
+            return # Ya está pedida
+        span = last - first
+        wanted = (max(0, first - span), min(self._peaks.frames, last + span))
+        self._samples_wanted = wanted
+        self._sample_loader.request(self._filename, *wanted)
+
+    def _on_samples(self, filename, first, last, mono):
+        if filename != self._filename:
+            return
+        self._samples = (first, last, mono)
+        self._samples_wanted = None
+        self._draw_peaks()
+
+    def _forget_samples(self):
+        self._samples = None
+        self._samples_wanted = None
+        self._sample_loader.cancel()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # pyqtgraph llama a resizeEvent desde su __init__, antes que el nuestro
+        if getattr(self, '_peaks', None) is not None and self._curve is not None:
+            self._redraw_timer.start()
+
+    def start_recording_mode(self, history_seconds=30.0, points_per_second=100):
+        """Prepara la gráfica para recibir datos en vivo (modo osciloscopio)"""
         self.clear()
-        self._realtime_data = np.zeros(200) 
-        # Creamos una curva que actualizaremos constantemente
-        self._curve = self.plot(self._realtime_data, pen=mkPen('#d9534f', width=2)) # Rojo para grabar
+        self.setMouseEnabled(x=False, y=False)
+        self.setLimits(xMin=None, xMax=None, minXRange=None, maxXRange=None)
+        points = max(2, int(history_seconds * points_per_second))
+        # Agrupamos los puntos que caen en el mismo píxel: lo pintado no crece con el historial
+        group = max(1, int(np.ceil(points / max(self.width(), 200))))
+        self._scope = ScopeHistory(points, group)
+        # Eje x en segundos relativos a "ahora" (de -history_seconds a 0)
+        size = self._scope.size
+        self._rt_x = (np.arange(size, dtype=np.float64) - (size - 1)) * (group / points_per_second)
+
+        # Envolvente simétrica: máximos y mínimos rellenos hasta el cero
+        pen = mkPen('#d9534f', width=1) # Rojo para grabar
+        brush = mkBrush('#d9534f80')
+        mins, maxs = self._scope.window()
+        self._curve = self.plot(self._rt_x, maxs, pen=pen, fillLevel=0, brush=brush)
+        self._rt_bottom = self.plot(self._rt_x, mins, pen=pen, fillLevel=0, brush=brush)
+
         self.setYRange(-1, 1) # La amplitud de audio va de -1 a 1
-        self.getPlotItem().hideAxis('bottom') # Ocultamos tiempo exacto porque es rolling
-
-    def update_realtime(self, amplitude):
-        """Añade un nuevo punto de amplitud y desplaza la gráfica"""
-        # Desplazamos los datos hacia la izquierda (efecto scroll)
-        self._realtime_data[:-1] = self._realtime_data[1:]
-        # Ponemos el nuevo dato al final (usamos valor negativo y positivo para simular onda)
-        self._realtime_data[-1] = amplitude 
-        
-        # Truco visual: pintamos simétrico para que parezca audio
-        # (Esto es opcional, pero queda mejor ver la onda arriba y abajo)
-        # Para simplificar, pintamos solo amplitud positiva en este ejemplo simple
-        self._curve.setData(self._realtime_data)
+        self.setXRange(self._rt_x[0], 0, padding=0)
+        self.getPlotItem().showAxis('bottom')
+        self.getPlotItem().setLabel('bottom', text='Segundos atrás')
+
+    def update_realtime(self, values):
+        """Añade puntos nuevos: pares (min, max) o amplitudes sueltas (se pintan simétricas)"""
+        values = np.asarray(values, dtype=np.float32)
+        if values.ndim == 1:
+            values = np.column_stack((-np.abs(values), np.abs(values)))
+        if not self._scope.push(values):
+            return # Aún no se ha completado ningún píxel nuevo
+        mins, maxs = self._scope.window()
+        self._curve.setData(self._rt_x, maxs)
+        self._rt_bottom.setData(self._rt_x, mins)
 
     def set_cursor(self, seconds):
         if self._line is None: return
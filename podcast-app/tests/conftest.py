@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+# Los módulos de la aplicación están en src/ y se importan por su nombre
+# (from recorder import Recorder), como hace main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+import fake_sounddevice
+
+# Sin tarjeta de sonido: el sounddevice de mentira en vez del de verdad
+fake_sounddevice.install()
+
+
+@pytest.fixture
+def fast_input(monkeypatch):
+    """La entrada de mentira va 50 veces más rápido que el tiempo real"""
+    monkeypatch.setattr(fake_sounddevice.FakeStream, "speed", 50.0)
+    monkeypatch.setattr(fake_sounddevice.FakeStream, "input_frames", None)
+    return fake_sounddevice.FakeStream
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """QApplication sin pantalla para lo que necesita el bucle de eventos de Qt"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def wait_for(qapp):
+    """wait_for(condición, timeout): procesa eventos de Qt hasta que se cumpla"""
+    def wait(condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "tiempo de espera agotado"
+            qapp.processEvents()
+            time.sleep(0.005)
+    return wait
@@ -0,0 +1,131 @@
+import sys
+import time
+import types
+import threading
+import numpy as np
+
+# sounddevice de mentira, sin PortAudio ni tarjeta de sonido: lo usan las
+# pruebas (conftest.py) y el banco de pruebas (src/bench.py). Un hilo llama
+# al callback de cada stream con bloques de 'blocksize' frames a 'speed'
+# veces el tiempo real; la entrada es ruido tipo voz y la salida se tira.
+
+SAMPLERATE = 44100
+
+
+def speech_like(rng, frames, samplerate):
+    """Ráfagas de ruido de 0.5-3 s separadas por silencios cortos con ruido de fondo"""
+    out = rng.standard_normal(frames).astype(np.float32) * 0.002
+    pos = 0
+    while pos < frames:
+        burst = int(rng.uniform(0.5, 3.0) * samplerate)
+        level = rng.uniform(0.05, 0.3)
+        end = min(frames, pos + burst)
+        out[pos:end] += rng.standard_normal(end - pos).astype(np.float32) * level
+        pos = end + int(rng.uniform(0.2, 1.5) * samplerate)
+    return out
+
+
+class Flags:
+    input_overflow = False
+    output_underflow = False
+
+
+class FakeStream:
+    """Lo que usan Recorder y Player de sd.InputStream / sd.OutputStream.
+
+    'speed' y 'input_frames' son de la clase: la entrada se calla tras
+    'input_frames' frames (None = sin límite).
+    """
+
+    speed = 1.0
+    input_frames = None
+
+    def __init__(self, samplerate=SAMPLERATE, channels=1, dtype='float32', blocksize=0,
+                 callback=None, device=None, **kwargs):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = dtype
+        self.blocksize = blocksize or 1024
+        self.callback = callback
+        self.device = device
+        self.latency = 0.0
+        self.active = False
+        self.frames = 0
+        self._thread = None
+        noise = speech_like(np.random.default_rng(0), self.blocksize * 64, samplerate)
+        noise = np.repeat(noise[:, None], channels, axis=1)
+        self._noise = (noise * 32767).astype(np.int16) if dtype == 'int16' else noise.astype(dtype)
+
+    @property
+    def time(self):
+        return self.frames / self.samplerate
+
+    def start(self):
+        self.active = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.active = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    abort = stop
+
+    def close(self):
+        self.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        started = time.perf_counter()
+        while self.active:
+            ahead = self.frames / self.samplerate / self.speed - (time.perf_counter() - started)
+            if ahead > 0:
+                time.sleep(min(ahead, 0.01))
+                continue
+            if not self._block():
+                time.sleep(0.01)
+                continue
+            self.frames += self.blocksize
+
+
+class FakeInputStream(FakeStream):
+    def _block(self):
+        if self.input_frames is not None and self.frames >= self.input_frames:
+            return False
+        start = self.frames % (len(self._noise) - self.blocksize)
+        now = self.time
+        info = types.SimpleNamespace(inputBufferAdcTime=now, currentTime=now)
+        self.callback(self._noise[start:start + self.blocksize], self.blocksize, info, Flags())
+        return True
+
+
+class FakeOutputStream(FakeStream):
+    def _block(self):
+        out = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+        now = self.time
+        info = types.SimpleNamespace(outputBufferDacTime=now, currentTime=now)
+        self.callback(out, self.blocksize, info, Flags())
+        return True
+
+
+def install():
+    """Pone el sounddevice de mentira en sys.modules (antes de importar player/recorder)"""
+    module = types.ModuleType("sounddevice")
+    module.InputStream = FakeInputStream
+    module.OutputStream = FakeOutputStream
+    module.PortAudioError = type("PortAudioError", (Exception,), {})
+    module.CallbackStop = type("CallbackStop", (Exception,), {})
+    module.default = types.SimpleNamespace(device=(0, 0), samplerate=None)
+    module.query_devices = lambda device=None, kind=None: {
+        "name": "fake", "max_input_channels": 2, "max_output_channels": 2,
+        "default_samplerate": float(SAMPLERATE),
+    }
+    sys.modules["sounddevice"] = module
+    return module
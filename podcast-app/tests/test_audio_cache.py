@@ -0,0 +1,34 @@
+import os
+import numpy as np
+import pytest
+import soundfile as sf
+from audio_cache import AudioCache
+from peaks import PeaksCancelled
+
+
+@pytest.fixture
+def flac(tmp_path):
+    path = str(tmp_path / "rec.flac")
+    sf.write(path, np.random.default_rng(0).uniform(-0.5, 0.5, (200000, 1)).astype(np.float32), 44100)
+    return path
+
+
+def test_mmap_decode(tmp_path, flac):
+    cache = AudioCache(mmap_dir=str(tmp_path / "pcm"))
+    data = cache.get_pcm(flac)
+    assert isinstance(data, np.memmap)
+    assert data.shape == (200000, 1)
+    assert [f for f in os.listdir(tmp_path / "pcm") if f.endswith(".tmp")] == []
+
+
+def test_cancelled_mmap_decode_leaves_no_temp_file(tmp_path, flac):
+    cache = AudioCache(mmap_dir=str(tmp_path / "pcm"))
+    calls = []
+
+    def cancelled():
+        calls.append(1)
+        return len(calls) > 1
+
+    with pytest.raises(PeaksCancelled):
+        cache.get_pcm(flac, cancelled)
+    assert os.listdir(tmp_path / "pcm") == []
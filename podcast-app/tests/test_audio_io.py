@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from audio_io import AudioReader, BlockAudio, MappedWav, open_audio, repair_wav_header
+
+SAMPLERATE = 8000
+FRAMES = 5000
+
+
+def write(path, subtype, file_format='WAV'):
+    rng = np.random.default_rng(0)
+    sf.write(str(path), rng.uniform(-0.9, 0.9, (FRAMES, 2)), SAMPLERATE,
+             subtype=subtype, format=file_format)
+    expected, _ = sf.read(str(path), dtype='float32')
+    return str(path), expected
+
+
+def unfinished(path):
+    """Deja la cabecera como si la grabación se hubiera cortado: tamaños RIFF y data a 0"""
+    with open(path, 'r+b') as f:
+        raw = f.read()
+        f.seek(4)
+        f.write(b'\0\0\0\0')
+        f.seek(raw.index(b'data') + 4)
+        f.write(b'\0\0\0\0')
+
+
+@pytest.mark.parametrize("subtype", ["PCM_U8", "PCM_16", "PCM_24", "PCM_32", "FLOAT"])
+def test_mapped_wav_reads_like_soundfile(tmp_path, subtype):
+    path, expected = write(tmp_path / "a.wav", subtype)
+    with open_audio(path) as audio:
+        assert isinstance(audio, MappedWav)
+        assert (audio.samplerate, audio.channels, audio.frames) == (SAMPLERATE, 2, FRAMES)
+        assert audio.subtype == subtype
+        np.testing.assert_allclose(audio.read(0, FRAMES), expected, atol=1e-6)
+        # Ventanas recortadas a los límites del archivo
+        np.testing.assert_allclose(audio.read(4000, 6000), expected[4000:], atol=1e-6)
+        np.testing.assert_allclose(audio.read(-10, 10), expected[:10], atol=1e-6)
+        # Con out se escribe en el buffer del que llama, sin reservar otro
+        buf = np.zeros((256, 2), dtype=np.float32)
+        block = audio.read(100, 200, out=buf)
+        assert len(block) == 100 and np.shares_memory(block, buf)
+        np.testing.assert_allclose(buf[:100], expected[100:200], atol=1e-6)
+
+
+def test_extensible_wav_is_mapped(tmp_path):
+    path, expected = write(tmp_path / "a.wav", "PCM_16", file_format='WAVEX')
+    with open_audio(path) as audio:
+        assert isinstance(audio, MappedWav)
+        np.testing.assert_allclose(audio.read(0, FRAMES), expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("name, subtype", [("a.flac", "PCM_16"), ("a.wav", "DOUBLE")])
+def test_other_formats_are_decoded_in_blocks(tmp_path, name, subtype):
+    path, expected = write(tmp_path / name, subtype, file_format=None)
+    with open_audio(path) as audio:
+        assert isinstance(audio, BlockAudio)
+        assert audio.frames == FRAMES
+        np.testing.assert_allclose(audio.read(1234, 2345), expected[1234:2345], atol=1e-6)
+        np.testing.assert_allclose(np.concatenate(list(audio.blocks(1000))), expected, atol=1e-6)
+
+
+def test_unfinished_header_reads_what_is_on_disk(tmp_path):
+    path, expected = write(tmp_path / "a.wav", "PCM_16")
+    unfinished(path)
+    with MappedWav(path) as audio:
+        assert audio.frames == FRAMES
+        np.testing.assert_allclose(audio.read(0, FRAMES), expected, atol=1e-6)
+
+
+def test_repair_wav_header(tmp_path):
+    path, expected = write(tmp_path / "a.wav", "PCM_24")
+    unfinished(path)
+    repair_wav_header(path)
+    assert sf.info(path).frames == FRAMES
+    np.testing.assert_allclose(sf.read(path, dtype='float32')[0], expected, atol=1e-6)
+
+
+def test_readers_must_implement_read():
+    class NoRead(AudioReader):
+        samplerate, channels, frames = 8000, 1, 0
+    with pytest.raises(TypeError):
+        NoRead()
@@ -0,0 +1,102 @@
+import time
+import threading
+import numpy as np
+import soundfile as sf
+from audio_stream import PrefetchReader, FileSource
+
+
+def read_all(reader, frames, timeout=5.0):
+    """Lee como el callback de audio, bloque a bloque, hasta juntar 'frames'"""
+    chunks = []
+    got = 0
+    deadline = time.monotonic() + timeout
+    while got < frames and time.monotonic() < deadline:
+        out = np.zeros((256, reader.channels), dtype='float32')
+        n = reader.read_into(out)
+        chunks.append(out[:n])
+        got += n
+        if not n:
+            time.sleep(0.001)
+    return np.concatenate(chunks)[:frames]
+
+
+def test_prefetch_delivers_the_whole_file(tmp_path):
+    path = str(tmp_path / "ramp.wav")
+    data = np.linspace(-1, 1, 50000, dtype='float32').reshape(-1, 2)
+    sf.write(path, data, 8000, subtype='FLOAT')
+    reader = PrefetchReader(FileSource(path), blocksize=1000, buffer_seconds=0.5)
+    try:
+        assert np.array_equal(read_all(reader, len(data)), data)
+        # El hilo lector marca el final cuando una lectura vuelve corta
+        deadline = time.monotonic() + 5
+        while not reader.finished and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert reader.finished
+        # Después del final: silencio, sin contar underruns
+        underruns = reader.underruns
+        out = np.ones((100, 2), dtype='float32')
+        assert reader.read_into(out) == 0
+        assert not out.any()
+        assert reader.underruns == underruns
+        assert reader.position == len(data)
+    finally:
+        reader.close()
+
+
+class GatedSource:
+    """Fuente en memoria (frame i vale i) cuya lectura se puede dejar colgada"""
+
+    samplerate = 1000
+    channels = 1
+
+    def __init__(self, frames):
+        self.frames = frames
+        self._pos = 0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.reading = threading.Event()
+
+    def read_into(self, out):
+        self.reading.set()
+        self.gate.wait()
+        n = max(0, min(len(out), self.frames - self._pos))
+        out[:n, 0] = np.arange(self._pos, self._pos + n)
+        self._pos += n
+        return n
+
+    def seek(self, frame):
+        self._pos = frame
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self.gate.set()
+
+
+def test_seek_discards_block_read_before_it():
+    source = GatedSource(5000)
+    source.gate.clear()
+    reader = PrefetchReader(source, blocksize=100, buffer_seconds=1.0)
+    try:
+        # El hilo lector está dentro de read_into leyendo 0..99 cuando llega el seek
+        assert source.reading.wait(5)
+        reader.seek(2000)
+        assert reader.position == 2000
+        source.gate.set()
+        assert read_all(reader, 300)[:, 0].tolist() == list(range(2000, 2300))
+    finally:
+        reader.close()
+
+
+def test_seek_past_the_end_is_clamped():
+    reader = PrefetchReader(GatedSource(500), blocksize=100)
+    try:
+        reader.seek(10**6)
+        assert reader.position == 500
+        deadline = time.monotonic() + 5
+        while not reader.finished and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert reader.finished
+    finally:
+        reader.close()
@@ -0,0 +1,30 @@
+import bench
+from bench import compare, report
+
+
+def result(seconds, alloc_mb=10.0):
+    return {"seconds": seconds, "alloc_mb": alloc_mb, "rss_mb": None}
+
+
+def test_compare_flags_time_and_memory_regressions():
+    baseline = {"lento": result(1.0), "gordo": result(1.0, 100.0), "igual": result(1.0)}
+    results = {"lento": result(1.3), "gordo": result(1.0, 130.0), "igual": result(1.2),
+               "nuevo": result(5.0)}
+    assert compare(results, baseline, tolerance=0.25) == [
+        ("lento", "seconds", 1.0, 1.3), ("gordo", "alloc_mb", 100.0, 130.0)]
+
+
+def test_compare_ignores_tiny_absolute_changes():
+    # +100 % pero de 1 ms a 2 ms, y de 0.1 MB a 0.5 MB: ruido
+    baseline = {"rapido": result(0.001, 0.1)}
+    assert compare({"rapido": result(0.002, 0.5)}, baseline) == []
+    assert compare({"rapido": result(0.001 + 2 * bench.MIN_SECONDS_DELTA, 0.1)}, baseline)
+
+
+def test_report_shows_the_change_against_the_baseline(capsys):
+    report({"player": dict(result(0.5), seeks=20), "export": result(2.0)},
+           {"player": result(0.25)})
+    lines = capsys.readouterr().out.splitlines()
+    assert "+100%" in lines[1] and "seeks=20" in lines[1]
+    # Sin referencia para el caso: un guion en vez del porcentaje
+    assert "%" not in lines[2]
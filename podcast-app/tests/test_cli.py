@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+import cli
+import exporter
+
+SRC = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+
+
+def test_parser_does_not_load_audio_modules():
+    # Construir el parser (p.ej. para --help) no debe cargar numpy ni soundfile
+    code = ("import sys, cli; cli.build_parser().parse_args(['export', 'flac']); "
+            "print(sorted({'numpy', 'soundfile', 'exporter', 'loudness', 'library_scanner'} & set(sys.modules)))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_export_formats_match_exporter():
+    assert set(cli.EXPORT_FORMATS) == set(exporter.FORMATS)
+
+
+def test_normalize_defaults_come_from_loudness():
+    args = cli.build_parser().parse_args(["normalize"])
+    assert args.target is None and args.ceiling is None and args.format == "flac"
+
+
+def test_record_passes_the_format_to_every_track(tmp_path, fast_input, capsys):
+    out = str(tmp_path / "sesion.wav")
+    assert cli.main(["-q", "record", out, "--seconds", "0.1", "--samplerate", "8000",
+                     "--device", "a", "--device", "b", "--format", "flac"]) == 0
+    files = json.loads(capsys.readouterr().out)["files"]
+    assert sorted(files) == [str(tmp_path / "sesion_deva.flac"), str(tmp_path / "sesion_devb.flac")]
@@ -0,0 +1,210 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import pytest
+import db
+from db import MIGRATIONS, RecordingRepository, fts_query
+
+# Esquema de la primera versión de la aplicación (db.init_db, sin user_version)
+LEGACY_SCHEMA = """
+CREATE TABLE recordings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT,
+    filename TEXT UNIQUE,
+    description TEXT,
+    created_at TEXT,
+    duration REAL
+)
+"""
+
+
+def user_version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def repository(path):
+    repo = RecordingRepository(path)
+    repo.init_schema()
+    return repo
+
+
+def test_add_update_delete(tmp_path):
+    repo = repository(str(tmp_path / "podcast.db"))
+    repo.add_many([("a.wav", "uno", "", 1.0), ("b.wav", "dos", "", 2.0), ("c.wav", "tres", "", None)])
+    # Un archivo ya registrado no se duplica ni se pisa
+    repo.add("a.wav", title="otro")
+    assert sorted(r[2] for r in repo.list()) == ["a.wav", "b.wav", "c.wav"]
+    assert repo.get("a.wav")[1] == "uno"
+
+    repo.update_meta_many([("a.wav", "uno bis", "notas"), ("b.wav", "dos bis", "")])
+    repo.update_title("c.wav", "tres bis")
+    assert repo.get("a.wav")[1:4] == ("uno bis", "a.wav", "notas")
+    assert repo.get("c.wav")[1] == "tres bis"
+
+    repo.delete_many(["a.wav", "b.wav"])
+    assert repo.get("a.wav") is None
+    assert [r[2] for r in repo.list()] == ["c.wav"]
+
+
+def test_each_thread_has_its_own_connection(tmp_path):
+    repo = repository(str(tmp_path / "podcast.db"))
+    seen = []
+
+    def worker():
+        seen.append(repo.connection())
+        repo.add("hilo.wav", title="desde otro hilo")
+        repo.close()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert seen[0] is not repo.connection()
+    assert repo.connection() is repo.connection()
+    # Lo que escribe un hilo lo ve el resto (WAL, commit por llamada)
+    assert repo.get("hilo.wav")[1] == "desde otro hilo"
+
+
+def test_pages_cover_every_row_once(tmp_path):
+    repo = repository(str(tmp_path / "podcast.db"))
+    # Varias filas con el mismo created_at (una sola llamada) y otras con fechas distintas
+    repo.add_many([(f"lote{i}.wav", "", "", None) for i in range(12)])
+    for i in range(9):
+        repo.add(f"suelta{i}.wav")
+    expected = sorted(repo.list(), key=lambda r: (r[4], r[0]), reverse=True)
+
+    rows = []
+    page = repo.list_page(limit=5)
+    while page:
+        assert len(page) <= 5
+        rows.extend(page)
+        page = repo.list_page(after=(page[-1][4], page[-1][0]), limit=5)
+    assert rows == expected
+    assert repo.count() == len(rows) == 21
+    assert rows[0][2] == "suelta8.wav"
+
+
+def test_search_follows_inserts_updates_and_deletes(tmp_path):
+    repo = repository(str(tmp_path / "podcast.db"))
+    repo.add_many([("a.wav", "Entrevista con Núñez", "episodio piloto", None),
+                   ("b.wav", "Tertulia", "hablamos de la entrevista", None),
+                   ("c.wav", "Música", "", None)])
+    # Prefijos, sin acentos, y el título pesa más que la descripción
+    assert [r[2] for r in repo.search("entrev")] == ["a.wav", "b.wav"]
+    assert [r[2] for r in repo.search("nunez")] == ["a.wav"]
+    assert [r[2] for r in repo.search("entrevista piloto")] == ["a.wav"]
+
+    repo.update_meta("a.wav", "Charla con Núñez", "")
+    assert [r[2] for r in repo.search("entrev")] == ["b.wav"]
+    assert [r[2] for r in repo.search("charla")] == ["a.wav"]
+
+    repo.delete("a.wav")
+    assert repo.search("nunez") == []
+
+
+def test_user_text_cannot_break_the_query(tmp_path):
+    repo = repository(str(tmp_path / "podcast.db"))
+    repo.add("a.wav", title='El "directo" AND NOT')
+    assert fts_query('  "  ') is None
+    assert repo.search('"') == []
+    assert [r[2] for r in repo.search('"directo')] == ["a.wav"]
+    assert [r[2] for r in repo.search("not")] == ["a.wav"]
+
+
+def test_existing_rows_are_indexed(tmp_path):
+    path = str(tmp_path / "podcast.db")
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO recordings (title, filename) VALUES ('Antes del índice', 'viejo.wav')")
+    conn.commit()
+    conn.close()
+    assert [r[2] for r in repository(path).search("indice")] == ["viejo.wav"]
+
+
+def test_legacy_database_is_upgraded(tmp_path):
+    path = str(tmp_path / "podcast.db")
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO recordings (title, filename, description, created_at, duration) "
+                 "VALUES ('Entrevista con Núñez', 'a.wav', 'episodio piloto', '2020-01-01', 12.5)")
+    conn.commit()
+    conn.close()
+
+    repo = repository(path)
+    assert user_version(path) == len(MIGRATIONS)
+    row = repo.get("a.wav")
+    assert row[1:6] == ("Entrevista con Núñez", "a.wav", "episodio piloto", "2020-01-01", 12.5)
+    # El índice FTS se llena con lo que ya había
+    assert [r[2] for r in repo.search("nunez piloto")] == ["a.wav"]
+    # Sin datos técnicos: el analizador la recogerá
+    assert repo.stale_stats() == ["a.wav"]
+
+
+def test_init_schema_is_idempotent(tmp_path):
+    path = str(tmp_path / "podcast.db")
+    repo = repository(path)
+    repo.add("a.wav", title="uno")
+    repo.init_schema()
+    repository(path)
+    assert user_version(path) == len(MIGRATIONS)
+    assert [r[2] for r in repo.list()] == ["a.wav"]
+
+
+def test_failed_migration_is_rolled_back(tmp_path, monkeypatch):
+    path = str(tmp_path / "podcast.db")
+    repository(path).close()
+
+    def broken(conn):
+        conn.execute("CREATE TABLE a_medias (x INTEGER)")
+        raise RuntimeError("falla a mitad")
+
+    monkeypatch.setattr(db, "MIGRATIONS", MIGRATIONS + [broken])
+    with pytest.raises(RuntimeError):
+        repository(path)
+    assert user_version(path) == len(MIGRATIONS)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name='a_medias'").fetchone() is None
+    conn.close()
+
+
+def test_loudness_is_measured_again_after_the_filter_fix(tmp_path, monkeypatch):
+    path = str(tmp_path / "podcast.db")
+    monkeypatch.setattr(db, "MIGRATIONS", MIGRATIONS[:6])
+    repo = repository(path)
+    repo.add("a.wav")
+    repo.update_stats_many([("a.wav", 1, None)])
+    repo.set_loudness_many([("a.wav", {"mtime_ns": 1, "loudness": -20.25, "true_peak": -1.2,
+                                       "sample_peak": -1.3})])
+    assert repo.stale_stats() == [] and repo.loudness_measurements()
+    repo.close()
+
+    monkeypatch.setattr(db, "MIGRATIONS", MIGRATIONS)
+    repo = repository(path)
+    assert repo.loudness_measurements() == {}
+    assert repo.stale_stats() == ["a.wav"]
+
+
+def test_added_and_scanned_rows_share_the_date_format(tmp_path):
+    repo = repository(str(tmp_path / "podcast.db"))
+    now = time.time_ns()
+    # Una grabación copiada a mano (fecha del archivo) entre dos hechas con la aplicación
+    repo.add("antes.wav")
+    repo.upsert_scanned([("grabaciones/copiada.wav", now - 3_600_000_000_000, 100, 1, 8000, 1, 8000)])
+    repo.upsert_scanned([("grabaciones/futura.wav", now + 3_600_000_000_000, 100, 2, 8000, 1, 8000)])
+    repo.add("despues.wav")
+    rows = repo.list()
+    # Todas en UTC y sin sufijo de zona: el texto ordena igual que la fecha
+    assert all(datetime.fromisoformat(row[4]).tzinfo is None for row in rows)
+    assert [row[2] for row in rows] == ["grabaciones/futura.wav", "despues.wav", "antes.wav",
+                                        "grabaciones/copiada.wav"]
+
+    pages = []
+    page = repo.list_page(limit=1)
+    while page:
+        pages.extend(page)
+        page = repo.list_page(after=(page[-1][4], page[-1][0]), limit=1)
+    assert pages == rows
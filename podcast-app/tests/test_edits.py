@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from edits import EditList, EditedAudio
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """Dos archivos cuya muestra i vale i (y 1000 + i) para saber de dónde sale cada frame"""
+    paths = []
+    for name, base in (("a.wav", 0), ("b.wav", 1000)):
+        path = str(tmp_path / name)
+        sf.write(path, (base + np.arange(100, dtype=np.float32)) / 4096, 8000, subtype="FLOAT")
+        paths.append(path)
+    return paths
+
+
+def test_cut_trim_and_join(sources):
+    a, b = sources
+    edits = EditList.full(a)
+    edits.cut(a, 10, 20)
+    assert edits.clips == [(a, 0, 10), (a, 20, 100)]
+    edits.trim(a, 5, 90)
+    assert edits.clips == [(a, 5, 10), (a, 20, 90)]
+    edits.join(b)
+    assert edits.clips == [(a, 5, 10), (a, 20, 90), (b, 0, 100)]
+    assert edits.frames == 175
+    # Cortar un tramo que ya no está no cambia nada
+    edits.cut(a, 10, 20)
+    assert edits.frames == 175
+
+
+def test_empty_clips_are_dropped(sources):
+    a, _b = sources
+    assert EditList([(a, 5, 5), (a, 10, 3), (a, 0, 4)]).clips == [(a, 0, 4)]
+
+
+def test_kept_and_removed(sources):
+    a, _b = sources
+    edits = EditList([(a, 50, 80), (a, 0, 10), (a, 70, 90)])
+    assert edits.kept(a) == [(0, 10), (50, 90)]
+    assert edits.removed(a, 100) == [(10, 50), (90, 100)]
+
+
+def test_position_mapping(sources):
+    a, b = sources
+    edits = EditList([(a, 0, 10), (a, 20, 30), (b, 0, 5)])
+    assert edits.to_source(0) == (a, 0)
+    assert edits.to_source(12) == (a, 22)
+    assert edits.to_source(21) == (b, 1)
+    assert edits.to_source(25) is None
+    assert edits.to_timeline(a, 22) == 12
+    assert edits.to_timeline(a, 15) == 10   # cortado: el siguiente frame que se conserva
+    assert edits.to_timeline(a, 50) is None
+    assert edits.to_timeline(b, 3) == 23
+
+
+def test_edited_audio_reads_the_clips_in_order(sources):
+    a, b = sources
+    edits = EditList([(a, 90, 100), (b, 0, 5), (a, 0, 3)])
+    with EditedAudio(edits) as audio:
+        assert (audio.frames, audio.samplerate, audio.channels) == (18, 8000, 1)
+        expected = np.r_[np.arange(90, 100), 1000 + np.arange(5), np.arange(3)]
+        np.testing.assert_array_equal(audio.read(0, 18)[:, 0] * 4096, expected)
+        # Una lectura que cruza clips y se pasa del final
+        np.testing.assert_array_equal(audio.read(8, 50)[:, 0] * 4096, expected[8:])
+
+
+def test_edited_audio_rejects_empty_and_mixed_formats(sources, tmp_path):
+    a, _b = sources
+    with pytest.raises(ValueError):
+        EditedAudio(EditList([]))
+    stereo = str(tmp_path / "estereo.wav")
+    sf.write(stereo, np.zeros((10, 2), dtype=np.float32), 8000)
+    with pytest.raises(ValueError):
+        EditedAudio(EditList([(a, 0, 10), (stereo, 0, 10)]))
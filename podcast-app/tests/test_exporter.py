@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pytest
+import soundfile as sf
+import exporter
+from exporter import FORMATS, ExportCancelled, transcode
+from export_manager import ExportManager
+
+SAMPLERATE = 44100
+
+
+def write(path, seconds, subtype='PCM_16', channels=2):
+    rng = np.random.default_rng(0)
+    data = (rng.standard_normal((int(seconds * SAMPLERATE), channels)) * 0.1).astype('float32')
+    sf.write(str(path), data, SAMPLERATE, subtype=subtype)
+    return str(path)
+
+
+@pytest.mark.parametrize("fmt", sorted(FORMATS))
+def test_transcode_keeps_every_frame(tmp_path, fmt):
+    src = write(tmp_path / "src.wav", 3.0, subtype='PCM_24')
+    dst = str(tmp_path / f"out{FORMATS[fmt][2]}")
+    transcode(src, dst, fmt, blocksize=10000)
+    info = sf.info(dst)
+    assert (info.frames, info.samplerate, info.channels) == (3 * SAMPLERATE, SAMPLERATE, 2)
+    assert info.format == FORMATS[fmt][0]
+    if fmt == "flac":
+        assert info.subtype == "PCM_24"  # la misma resolución que el origen
+    if fmt != "ogg":
+        a, _ = sf.read(src, dtype='float32')
+        b, _ = sf.read(dst, dtype='float32')
+        assert np.abs(a - b).max() < 1e-4
+    assert not os.path.exists(dst + ".part")
+
+
+def test_cancelled_transcode_leaves_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, "PROGRESS_INTERVAL", 0.0)
+    src = write(tmp_path / "src.wav", 3.0)
+    dst = str(tmp_path / "out.flac")
+
+    def progress(done, total):
+        raise ExportCancelled()
+
+    with pytest.raises(ExportCancelled):
+        transcode(src, dst, "flac", progress, blocksize=1000)
+    assert not os.path.exists(dst) and not os.path.exists(dst + ".part")
+
+
+@pytest.fixture
+def manager(qapp):
+    manager = ExportManager(max_workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def test_cancel_queued_and_running_jobs(tmp_path, manager, wait_for):
+    long_src = write(tmp_path / "long.wav", 120.0, channels=1)
+    short_src = write(tmp_path / "short.wav", 1.0)
+    events = []
+    manager.jobProgress.connect(lambda job_id, f: events.append(("progress", job_id)))
+    manager.jobCancelled.connect(lambda job_id: events.append(("cancelled", job_id)))
+    manager.jobFinished.connect(lambda job_id, result: events.append(("finished", job_id)))
+    manager.jobFailed.connect(lambda job_id, error: events.append(("failed", job_id)))
+    manager.idle.connect(lambda: events.append(("idle", None)))
+
+    running = manager.submit(long_src, "ogg", str(tmp_path / "long.ogg"))
+    queued = manager.submit(short_src, "wav16", str(tmp_path / "short_16.wav"))
+    # Con un solo proceso el segundo aún está en la cola: se cancela sin empezar
+    manager.cancel(queued)
+    wait_for(lambda: ("progress", running) in events)
+    manager.cancel(running)
+    wait_for(lambda: ("idle", None) in events)
+
+    assert ("cancelled", queued) in events and ("cancelled", running) in events
+    assert not any(kind in ("finished", "failed") for kind, _ in events)
+    assert sorted(os.listdir(tmp_path)) == ["long.wav", "short.wav"]
+
+    # El pool sigue sirviendo después de cancelar
+    done = manager.submit(short_src, "flac", str(tmp_path / "short.flac"))
+    wait_for(lambda: ("finished", done) in events)
+    assert sf.info(str(tmp_path / "short.flac")).frames == SAMPLERATE
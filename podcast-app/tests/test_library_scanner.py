@@ -0,0 +1,137 @@
+import os
+import numpy as np
+import pytest
+import soundfile as sf
+from audio_io import load_manifest, segment_files
+from db import RecordingRepository
+from exporter import EXPORTS_DIR, output_path, transcode
+import library_scanner
+from library_scanner import LibraryScanner
+from loudness import normalize, normalized_path
+from segments import ABANDONED_FLUSHES, FLUSH_SECONDS, open_writer
+
+
+def write(path, seconds=0.5, samplerate=8000):
+    sf.write(str(path), np.zeros(int(seconds * samplerate), dtype=np.float32), samplerate)
+    return str(path)
+
+
+def touch(path, seconds):
+    """Adelanta el mtime: dos escrituras seguidas pueden caer en el mismo instante"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + int(seconds * 1e9)))
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = RecordingRepository(str(tmp_path / "podcast.db"))
+    repo.init_schema()
+    return repo
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "grabaciones"
+    folder.mkdir()
+    return folder
+
+
+def test_scan_adds_updates_and_removes(tmp_path, repo, folder):
+    a = write(folder / "a.wav")
+    b = write(folder / "b.flac")
+    (folder / "notas.txt").write_text("no es audio")
+    other = str(tmp_path / "otra" / "c.wav")
+    repo.add(other)  # de otra carpeta: el escáner no la toca
+    scanner = LibraryScanner(repo, str(folder), max_workers=1)
+
+    result = scanner.scan()
+    assert sorted(result["added"]) == [a, b]
+    assert result["scanned"] == 2 and result["failed"] == 0
+    assert repo.get(a)[5] == pytest.approx(0.5)
+    repo.update_meta(a, "Entrevista", "editado a mano")
+
+    # Sin cambios en disco no se abre nada
+    result = scanner.scan()
+    assert (result["added"], result["updated"], result["removed"]) == ([], [], [])
+
+    write(folder / "a.wav", seconds=2.0)
+    touch(a, 1)
+    os.remove(b)
+    result = scanner.scan()
+    assert (result["added"], result["updated"], result["removed"]) == ([], [a], [b])
+    # Se actualiza la duración pero no lo que ha escrito el usuario
+    assert repo.get(a)[1:4] == ("Entrevista", a, "editado a mano")
+    assert repo.get(a)[5] == pytest.approx(2.0)
+    assert repo.get(b) is None
+    assert repo.get(other) is not None
+
+
+def test_unreadable_and_excluded_files_are_skipped(repo, folder):
+    (folder / "roto.wav").write_bytes(b"a medio copiar")
+    recording = write(folder / "grabando.wav")
+    scanner = LibraryScanner(repo, str(folder), max_workers=1)
+    scanner.exclude.add(recording)
+    result = scanner.scan()
+    assert result["added"] == [] and result["failed"] == 1
+    assert repo.list() == []
+
+    scanner.exclude.clear()
+    assert scanner.scan()["added"] == [recording]
+
+
+def test_exports_are_not_cataloged(repo, folder):
+    src = str(folder / "entrevista.wav")
+    sf.write(src, np.full(4410, 0.1, dtype=np.float32), 44100)
+    outputs = [transcode(src, output_path(src, "flac"), "flac")["dst"],
+               transcode(src, output_path(src, "wav16", edited=True), "wav16",
+                         clips=[(src, 0, 2000)])["dst"],
+               normalize(src, normalized_path(src, "ogg"), "ogg", 3.0, -20.0)["dst"]]
+    for dst in outputs:
+        assert os.path.dirname(dst) == str(folder / EXPORTS_DIR)
+        assert os.path.exists(dst)
+
+    LibraryScanner(repo, str(folder), max_workers=1).scan()
+    assert [row[2] for row in repo.list()] == [src]
+
+
+def age(paths, seconds):
+    """Atrasa el mtime de los archivos 'seconds' segundos"""
+    for path in paths:
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - int(seconds * 1e9)))
+
+
+def test_only_abandoned_segmented_recordings_are_recovered(repo, folder):
+    writer = open_writer(str(folder / "directo.wav"), 8000, 1, 'FLOAT', segment_seconds=60)
+    writer.write(np.zeros((4000, 1), dtype=np.float32))
+    writer.flush()
+    scanner = LibraryScanner(repo, str(folder), max_workers=1)
+    # Otro proceso la está grabando: ni se cataloga ni se cierra, y no cuenta como fallo
+    result = scanner.scan()
+    assert result["added"] == [] and result["failed"] == 0
+    assert not load_manifest(writer.filename)["complete"]
+
+    # El proceso muere y los archivos se quedan quietos
+    writer._f.close()
+    age([writer.filename] + segment_files(writer.filename), FLUSH_SECONDS * ABANDONED_FLUSHES + 1)
+    assert scanner.scan()["added"] == [writer.filename]
+    assert load_manifest(writer.filename)["complete"]
+    assert repo.get(writer.filename)[5] == pytest.approx(0.5)
+
+
+def test_failed_files_are_not_probed_again_until_they_change(repo, folder, monkeypatch):
+    broken = folder / "a_medio_copiar.wav"
+    broken.write_bytes(b"RIFF")
+    probes = []
+    probe = library_scanner._probe
+    monkeypatch.setattr(library_scanner, "_probe", lambda path: probes.append(path) or probe(path))
+    scanner = LibraryScanner(repo, str(folder), max_workers=1)
+    assert scanner.scan()["failed"] == 1
+    assert scanner.scan()["failed"] == 0
+    assert probes == [str(broken)]
+
+    # Termina la copia: cambia el archivo y se prueba otra vez
+    write(broken)
+    touch(broken, 1)
+    assert scanner.scan()["added"] == [str(broken)]
+    assert len(probes) == 2
@@ -0,0 +1,58 @@
+import numpy as np
+import soundfile as sf
+import pytest
+from loudness import Limiter, TruePeakDetector, measure
+
+SAMPLERATE = 48000
+CEILING_DB = -1.0
+CEILING = 10 ** (CEILING_DB / 20)
+
+
+def true_peak(data):
+    detector = TruePeakDetector(data.shape[1])
+    tail = np.zeros((64, data.shape[1]), dtype=np.float32)
+    return max(detector.envelope(data).max(), detector.envelope(tail).max())
+
+
+def limit(data, blocks=1):
+    limiter = Limiter(SAMPLERATE, data.shape[1], CEILING_DB)
+    out = np.concatenate([limiter.process(b) for b in np.array_split(data, blocks)] + [limiter.flush()])
+    assert out.shape == data.shape
+    return out
+
+
+def test_true_peak_of_quarter_rate_sine(tmp_path):
+    # fs/4 a 45°: las muestras valen ±0.707 y el pico real es 1.0
+    t = np.arange(SAMPLERATE)
+    sine = np.sin(2 * np.pi * t / 4 + np.pi / 4)
+    # Entrada y salida suaves: un corte en seco tiene su propio rebote por encima de 1
+    fade = np.hanning(SAMPLERATE // 5)
+    sine[:len(fade) // 2] *= fade[:len(fade) // 2]
+    sine[-(len(fade) // 2):] *= fade[len(fade) // 2:]
+    sine = sine.astype(np.float32)
+    path = str(tmp_path / "seno.wav")
+    sf.write(path, sine, SAMPLERATE, subtype="FLOAT")
+    result = measure(path)
+    assert result["true_peak"] == pytest.approx(0.0, abs=0.05)
+    assert result["sample_peak"] == pytest.approx(-3.01, abs=0.01)
+
+
+def test_single_sample_stays_under_ceiling():
+    data = np.zeros((2000, 1), dtype=np.float32)
+    data[700] = 2.0
+    out = limit(data)
+    assert np.abs(out).max() <= CEILING
+    assert np.argmax(np.abs(out)) == 700
+
+
+@pytest.mark.parametrize("blocks", [1, 7, 500])
+def test_transients_stay_under_ceiling(blocks):
+    rng = np.random.default_rng(1)
+    data = rng.normal(0, 0.1, (SAMPLERATE * 2, 2)).astype(np.float32)
+    data[rng.integers(0, len(data), 40)] *= 15
+    out = limit(data, blocks)
+    assert np.abs(out).max() <= CEILING
+    # La ganancia varía dentro del filtro de reconstrucción: se admite un margen mínimo
+    assert 20 * np.log10(true_peak(out)) <= CEILING_DB + 0.05
+    # Lejos de los picos la señal sale intacta
+    assert np.allclose(out[:100], data[:100])
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from meters import k_weighted_power, gated_loudness, LUFS_BLOCK
+
+
+def integrated(data, samplerate):
+    block = int(LUFS_BLOCK * samplerate)
+    full = len(data) - len(data) % block
+    blocks = data[:full].reshape(-1, block, data.shape[1])
+    return gated_loudness(k_weighted_power(blocks, samplerate).sum(axis=1))
+
+
+@pytest.mark.parametrize("samplerate", [44100, 48000])
+def test_997hz_sine_at_minus_20_dbfs_reads_minus_20_lufs(samplerate):
+    # BS.1770: un seno de 997 Hz a -20 dBFS en los dos canales da -20 LUFS
+    t = np.arange(samplerate * 5) / samplerate
+    sine = (0.1 * np.sin(2 * np.pi * 997 * t)).astype(np.float32)
+    assert integrated(np.column_stack([sine, sine]), samplerate) == pytest.approx(-20.0, abs=0.1)
+
+
+def test_silence_has_no_loudness():
+    assert integrated(np.zeros((44100, 1), dtype=np.float32), 44100) is None
@@ -0,0 +1,81 @@
+import os
+import time
+import pytest
+import soundfile as sf
+import multitrack
+from audio_io import open_audio
+from fake_sounddevice import FakeInputStream
+from multitrack import MultiTrackRecorder, TrackSpec
+from segments import manifest_for
+
+
+def record(recorder, seconds, stream):
+    stream.input_frames = int(seconds * recorder.samplerate)
+    recorder.start()
+    deadline = time.monotonic() + 10
+    while (any(t.frames_in < stream.input_frames for t in recorder.tracks)
+           and time.monotonic() < deadline):
+        time.sleep(0.01)
+    recorder.stop()
+
+
+@pytest.fixture
+def tracks():
+    return [TrackSpec("a", 1, "voz"), TrackSpec("b", 2, "invitado"), TrackSpec("c", 1, "musica")]
+
+
+def test_segmented_stems_follow_track_order(tmp_path, tracks, fast_input, monkeypatch):
+    monkeypatch.setattr(fast_input, "input_frames", None)
+    rec = MultiTrackRecorder(str(tmp_path / "sesion.wav"), tracks, samplerate=8000, segment_seconds=1.0)
+    expected = [manifest_for(str(tmp_path / f"sesion_{t.name}.wav")) for t in tracks]
+    assert rec.filenames[:-1] == expected
+    record(rec, 2.5, fast_input)
+    assert rec.stems == expected
+    for path, spec in zip(rec.stems, tracks):
+        with open_audio(path) as audio:
+            assert audio.channels == spec.channels
+
+
+def test_segmented_merge_removes_parts(tmp_path, tracks, fast_input, monkeypatch):
+    monkeypatch.setattr(fast_input, "input_frames", None)
+    rec = MultiTrackRecorder(str(tmp_path / "sesion.wav"), tracks, samplerate=8000,
+                             segment_seconds=1.0, merge=True)
+    record(rec, 2.5, fast_input)
+    assert rec.stems == []
+    assert sf.info(str(tmp_path / "sesion.wav")).channels == 4
+    assert sorted(os.listdir(tmp_path)) == ["sesion.wav"]
+
+
+def test_stems_and_merge_use_the_record_format(tmp_path, tracks, fast_input):
+    rec = MultiTrackRecorder(str(tmp_path / "sesion.wav"), tracks, samplerate=8000, file_format="flac")
+    record(rec, 0.5, fast_input)
+    assert rec.stems == [str(tmp_path / f"sesion_{t.name}.flac") for t in tracks]
+    assert all(sf.info(path).format == "FLAC" for path in rec.stems)
+
+    rec = MultiTrackRecorder(str(tmp_path / "unida.wav"), tracks, samplerate=8000, file_format="ogg",
+                             merge=True)
+    record(rec, 0.5, fast_input)
+    assert rec.filename == str(tmp_path / "unida.ogg")
+    assert sf.info(rec.filename).channels == 4
+
+
+def test_a_failed_start_closes_what_it_opened(tmp_path, tracks, monkeypatch):
+    opened = []
+
+    def input_stream(device=None, **kwargs):
+        if device == "c":
+            raise multitrack.sd.PortAudioError("Device unavailable")
+        stream = FakeInputStream(device=device, **kwargs)
+        opened.append(stream)
+        return stream
+    monkeypatch.setattr(multitrack.sd, "InputStream", input_stream)
+    closed = []
+    monkeypatch.setattr(FakeInputStream, "close", lambda self: closed.append(self))
+
+    rec = MultiTrackRecorder(str(tmp_path / "sesion.wav"), tracks, samplerate=8000)
+    with pytest.raises(multitrack.sd.PortAudioError):
+        rec.start()
+    assert len(opened) == 2 and closed == opened
+    assert all(t.stream is None and t.thread is None for t in rec.tracks)
+    assert os.listdir(tmp_path) == []
+    rec.stop()  # no hay nada que parar
@@ -0,0 +1,126 @@
+import os
+import numpy as np
+import pytest
+import soundfile as sf
+from peaks import (BASE_BLOCK, LEVEL_FACTOR, MIN_BUCKETS, READ_BLOCK, PeakPyramid,
+                   PeaksCancelled, build_peaks, cached_peaks, delete_peaks, load_peaks,
+                   preview_peaks, sidecar_path)
+
+SAMPLERATE = 8000
+
+
+def write(path, data):
+    sf.write(str(path), data, SAMPLERATE, subtype='FLOAT')
+    return str(path)
+
+
+def noise(frames, level=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(-1, 1, (frames, 2)) * level).astype('float32')
+
+
+def test_levels_are_min_max_of_the_mono_mix(tmp_path):
+    data = noise(BASE_BLOCK * 3000 + 100)
+    peaks = build_peaks(write(tmp_path / "a.wav", data))
+    assert peaks.frames == len(data) and peaks.samplerate == SAMPLERATE
+
+    mono = data.mean(axis=1)
+    full = mono[:BASE_BLOCK * 3000].reshape(-1, BASE_BLOCK)
+    mins, maxs = peaks.levels[0]
+    assert len(mins) == 3001  # la última cubeta (100 muestras) queda incompleta
+    np.testing.assert_allclose(mins[:-1], full.min(axis=1), atol=1e-6)
+    np.testing.assert_allclose(maxs[:-1], full.max(axis=1), atol=1e-6)
+    np.testing.assert_allclose([mins[-1], maxs[-1]], [mono[-100:].min(), mono[-100:].max()], atol=1e-6)
+
+    # Cada nivel agrupa LEVEL_FACTOR cubetas del anterior hasta bajar de MIN_BUCKETS
+    for level in range(1, len(peaks.levels)):
+        prev_mins, prev_maxs = peaks.levels[level - 1]
+        mins, maxs = peaks.levels[level]
+        assert len(mins) == -(-len(prev_mins) // LEVEL_FACTOR)
+        assert mins[0] == prev_mins[:LEVEL_FACTOR].min()
+        assert maxs[-1] == prev_maxs[(len(mins) - 1) * LEVEL_FACTOR:].max()
+    assert [len(m) for m, _ in peaks.levels] == [3001, 751, 188]
+    assert len(peaks.levels[-1][0]) <= MIN_BUCKETS < len(peaks.levels[-2][0])
+
+
+def test_envelope_has_one_bucket_per_pixel(tmp_path):
+    peaks = build_peaks(write(tmp_path / "a.wav", noise(BASE_BLOCK * 3000 + 100)))
+    assert peaks.level_for_width(100) == 2
+    assert peaks.level_for_width(500) == 1
+    assert peaks.level_for_width(10**6) == 0
+    x, y = peaks.envelope(500)
+    assert len(x) == len(y) == 2 * 751
+    assert x[2] == peaks.block_size(1) / SAMPLERATE
+    assert np.array_equal(y[0::2], peaks.levels[1][0])
+    assert np.array_equal(y[1::2], peaks.levels[1][1])
+
+
+def test_sidecar_is_reused_until_the_file_changes(tmp_path):
+    path = write(tmp_path / "a.wav", noise(BASE_BLOCK * 100))
+    first = load_peaks(path)
+    signature = (os.stat(path).st_mtime_ns, os.stat(path).st_size)
+    cached = PeakPyramid.load(sidecar_path(path), signature)
+    assert cached is not None
+    assert np.array_equal(cached.levels[0][1], first.levels[0][1])
+
+    # Se regraba el archivo: la firma cambia y la caché vieja no vale
+    write(path, noise(BASE_BLOCK * 100, level=0.1, seed=1))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, signature[0] + 10**9))
+    assert PeakPyramid.load(sidecar_path(path), (os.stat(path).st_mtime_ns, os.stat(path).st_size)) is None
+    second = load_peaks(path)
+    assert second.levels[0][1].max() <= 0.1
+    assert PeakPyramid.load(sidecar_path(path), (os.stat(path).st_mtime_ns, os.stat(path).st_size)) is not None
+
+
+def test_corrupt_sidecar_is_rebuilt(tmp_path):
+    path = write(tmp_path / "a.wav", noise(BASE_BLOCK * 10))
+    with open(sidecar_path(path), "wb") as f:
+        f.write(b"no es un npz")
+    assert load_peaks(path).frames == BASE_BLOCK * 10
+    delete_peaks(path)
+    assert not os.path.exists(sidecar_path(path))
+    delete_peaks(path)  # no pasa nada si ya no está
+
+
+def test_preview_samples_windows_across_the_file(tmp_path):
+    # Primera mitad a +0.25, segunda a -0.5: cada ventana cae entera en una mitad
+    data = np.full((64 * 4096, 2), 0.25, dtype='float32')
+    data[32 * 4096:] = -0.5
+    path = write(tmp_path / "a.wav", data)
+    preview = preview_peaks(path, buckets=64)
+    assert preview.frames == len(data)
+    assert preview.block_size(0) == 4096
+    mins, maxs = preview.levels[0]
+    assert len(mins) == 64
+    assert np.allclose(maxs[:32], 0.25) and np.allclose(mins[32:], -0.5)
+    # Sin sidecar todavía: cached_peaks no construye nada
+    assert cached_peaks(path) is None
+    load_peaks(path)
+    assert cached_peaks(path) is not None
+
+
+def test_build_can_be_cancelled(tmp_path):
+    path = write(tmp_path / "a.wav", noise(READ_BLOCK * 3))
+    with pytest.raises(PeaksCancelled):
+        load_peaks(path, cancelled=lambda: True)
+    assert not os.path.exists(sidecar_path(path))
+
+
+def test_window_envelope_depends_on_the_window_not_the_file(tmp_path):
+    peaks = build_peaks(write(tmp_path / "a.wav", noise(BASE_BLOCK * 3000 + 100)))
+    # Archivo entero en 5 píxeles: el nivel más grueso
+    assert peaks.level_for_width(5) == 2
+    # Un segundo (8000 muestras) en 5 píxeles: nivel 1 (7.8 cubetas de 1024)
+    assert peaks.level_for_width(5, SAMPLERATE) == 1
+    x, y = peaks.envelope(5, start=10.0, stop=11.0)
+    block = peaks.block_size(1) / SAMPLERATE
+    assert np.allclose(np.diff(x[0::2]), block)
+    # Solo las cubetas de la ventana, más una de margen a cada lado
+    assert 10.0 - 2 * block <= x[0] <= 10.0
+    assert 11.0 <= x[-1] <= 11.0 + 2 * block
+    first = int(x[0] / block)
+    assert np.array_equal(y[0::2], peaks.levels[1][0][first:first + len(x) // 2])
+    # Más zoom que el nivel 0: se queda en el nivel 0
+    assert peaks.level_for_width(1000, SAMPLERATE) == 0
+    assert peaks.envelope(1000, 10.0, 10.1)[0][0] < 10.0
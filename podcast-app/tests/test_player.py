@@ -0,0 +1,70 @@
+import time
+import numpy as np
+import pytest
+import soundfile as sf
+import sounddevice as sd
+from player import Player
+
+SAMPLERATE = 8000
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    """Lista de los OutputStream que abre el reproductor"""
+    opened = []
+
+    class CountingStream(sd.OutputStream):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened.append(self)
+
+    monkeypatch.setattr(sd, "OutputStream", CountingStream)
+    return opened
+
+
+@pytest.fixture
+def player(tmp_path):
+    path = str(tmp_path / "two_seconds.wav")
+    sf.write(path, np.zeros(2 * SAMPLERATE, dtype='float32'), SAMPLERATE)
+    player = Player(blocksize=256)
+    player.load(path)
+    yield player
+    player.close()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "tiempo de espera agotado"
+        time.sleep(0.005)
+
+
+def test_seek_while_playing_keeps_the_stream(player, streams):
+    player.play()
+    wait_until(lambda: player.position > 0.05)
+    player.seek(1.0)
+    # El cursor salta ya y nunca se ve antes del seek, aunque suene lo leído por delante
+    assert player.position >= 1.0
+    wait_until(lambda: player.position > 1.05)
+    assert player.position < 1.5
+    assert len(streams) == 1 and streams[0].active
+
+
+def test_pause_holds_the_position(player, streams):
+    player.play()
+    wait_until(lambda: player.position > 0.05)
+    player.pause()
+    paused = player.position
+    time.sleep(0.05)
+    assert player.position == paused
+    player.play()
+    wait_until(lambda: player.position > paused)
+    assert len(streams) == 1
+    player.stop()
+    assert player.position == 0.0
+
+
+def test_play_at_the_end_starts_over(player, streams):
+    player.seek(player.duration)
+    player.play()
+    assert player.position < 0.5
@@ -0,0 +1,79 @@
+import time
+import pytest
+import soundfile as sf
+from audio_io import open_audio
+from recorder import Recorder
+
+SAMPLERATE = 44100
+FRAMES = 1024 * 300  # ~7 s, múltiplo del bloque de la entrada de mentira
+
+
+def capture(tmp_path, stream, **kwargs):
+    """Graba FRAMES frames de la entrada de mentira y para"""
+    stream.input_frames = FRAMES
+    rec = Recorder(str(tmp_path / "rec.wav"), samplerate=SAMPLERATE, **kwargs)
+    rec.start()
+    time.sleep(FRAMES / SAMPLERATE / stream.speed + 0.5)
+    rec.stop()
+    return rec
+
+
+def test_every_captured_frame_is_written(tmp_path, fast_input):
+    rec = capture(tmp_path, fast_input)
+    assert rec.overflows == 0 and rec.xruns == 0
+    assert 0 < rec.max_fill < 1
+    data, _ = sf.read(rec.filename, dtype='float32')
+    assert len(data) == FRAMES
+    assert abs(data).max() > 0.01
+    assert rec.current_amplitude > 0
+
+
+def test_full_buffer_drops_frames_without_growing(tmp_path, fast_input):
+    # Un buffer más pequeño que el bloque del callback: se llena y se descarta lo que no cabe
+    rec = capture(tmp_path, fast_input, buffer_seconds=0.01)
+    assert rec.overflows > 0
+    assert rec.max_fill == 1.0
+    assert sf.info(rec.filename).frames + rec.overflows == FRAMES
+
+
+def record(tmp_path, fmt, stream, **kwargs):
+    stream.input_frames = FRAMES
+    # flush_seconds muy corto: con la entrada a 50x se vuelca varias veces durante la grabación
+    rec = Recorder(str(tmp_path / "rec"), samplerate=SAMPLERATE, file_format=fmt,
+                   flush_seconds=0.01, **kwargs)
+    rec.start()
+    deadline = time.monotonic() + 10
+    while rec.encoded_frames + rec.overflows < FRAMES and time.monotonic() < deadline:
+        time.sleep(0.005)
+    rec.stop()
+    assert rec.overflows == 0
+    return rec
+
+
+@pytest.mark.parametrize("fmt", ["wav", "flac", "ogg"])
+def test_every_frame_reaches_the_file(tmp_path, fmt, fast_input):
+    rec = record(tmp_path, fmt, fast_input)
+    assert sf.info(rec.filename).frames == FRAMES
+
+
+@pytest.mark.parametrize("fmt", ["wav", "flac", "ogg"])
+def test_every_frame_reaches_the_segments(tmp_path, fmt, fast_input):
+    rec = record(tmp_path, fmt, fast_input, segment_seconds=2.0)
+    with open_audio(rec.filename) as audio:
+        assert audio.frames == FRAMES
+        assert len(audio.read(0, FRAMES)) == FRAMES
+
+
+def test_wav_header_is_current_while_recording(tmp_path, fast_input):
+    # La cabecera se reescribe en cada flush: si el proceso muere, el WAV se lee hasta ahí
+    fast_input.input_frames = FRAMES
+    rec = Recorder(str(tmp_path / "rec"), samplerate=SAMPLERATE, flush_seconds=0.01)
+    rec.start()
+    try:
+        deadline = time.monotonic() + 10
+        while rec.encoded_frames < FRAMES // 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        time.sleep(0.05)
+        assert sf.info(rec.filename).frames > 0
+    finally:
+        rec.stop()
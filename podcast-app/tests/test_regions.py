@@ -0,0 +1,46 @@
+from regions import SPEECH, SILENCE, find_regions, long_pauses, segment_starts
+
+# Bloques de 0.1 s para que las cuentas salgan redondas
+BLOCK = 0.1
+
+
+def regions(levels, **kwargs):
+    return [(round(s, 6), round(e, 6), kind) for s, e, kind in
+            find_regions(levels, block_seconds=BLOCK, **kwargs)]
+
+
+def test_empty():
+    assert find_regions([]) == []
+
+
+def test_regions_cover_the_whole_recording():
+    levels = [-60] * 10 + [-20] * 20 + [-60] * 30 + [-20] * 5
+    assert regions(levels) == [(0.0, 1.0, SILENCE), (1.0, 3.0, SPEECH),
+                               (3.0, 6.0, SILENCE), (6.0, 6.5, SPEECH)]
+
+
+def test_hysteresis_keeps_state_inside_the_band():
+    # -40 dB está entre SILENCE_DB y SPEECH_DB: no empieza voz ni la termina
+    assert regions([-40] * 5 + [-20] * 5 + [-40] * 10 + [-60] * 10) == [
+        (0.0, 0.5, SILENCE), (0.5, 2.0, SPEECH), (2.0, 3.0, SILENCE)]
+
+
+def test_short_silence_does_not_split_speech():
+    # Una respiración de 0.2 s (< MIN_SILENCE_SECONDS) queda dentro de la voz
+    assert regions([-20] * 10 + [-60] * 2 + [-20] * 10) == [(0.0, 2.2, SPEECH)]
+
+
+def test_short_speech_is_dropped():
+    # Un clic de 0.1 s (< MIN_SPEECH_SECONDS) no es voz
+    assert regions([-60] * 10 + [-10] + [-60] * 10) == [(0.0, 2.1, SILENCE)]
+
+
+def test_edges_are_kept_even_if_short():
+    assert regions([-20] + [-60] * 10) == [(0.0, 0.1, SPEECH), (0.1, 1.1, SILENCE)]
+
+
+def test_pauses_and_jump_points():
+    found = find_regions([-20] * 10 + [-60] * 25 + [-20] * 10 + [-60] * 10 + [-20] * 5,
+                         block_seconds=BLOCK)
+    assert [(round(s, 6), round(e, 6)) for s, e, _ in long_pauses(found)] == [(1.0, 3.5)]
+    assert [round(s, 6) for s in segment_starts(found)] == [0.0, 3.5, 5.5]
@@ -0,0 +1,51 @@
+import numpy as np
+from ringbuffer import RingBuffer
+
+
+def frames(start, stop, channels=2):
+    # Frame i vale i en todos los canales: así se ve el orden al leer
+    return np.repeat(np.arange(start, stop, dtype='float32')[:, None], channels, axis=1)
+
+
+def test_wraparound_keeps_the_order():
+    ring = RingBuffer(8, 2)
+    assert ring.write(frames(0, 6)) == 6
+    out = np.zeros((4, 2), dtype='float32')
+    assert ring.read_into(out) == 4
+    assert np.array_equal(out, frames(0, 4))
+    # 2 pendientes + 5 nuevos: la escritura da la vuelta al final del buffer
+    assert ring.write(frames(6, 11)) == 5
+    assert ring.readable() == 7 and ring.writable() == 1
+    out = np.zeros((7, 2), dtype='float32')
+    assert ring.read_into(out) == 7
+    assert np.array_equal(out, frames(4, 11))
+    assert ring.readable() == 0 and ring.writable() == 8
+
+
+def test_overflow_only_writes_what_fits():
+    ring = RingBuffer(8, 2)
+    assert ring.write(frames(0, 10)) == 8
+    assert ring.writable() == 0
+    assert ring.write(frames(10, 12)) == 0
+    out = np.zeros((10, 2), dtype='float32')
+    # Lectura más larga que lo disponible: devuelve lo que había, sin tocar el resto
+    assert ring.read_into(out) == 8
+    assert np.array_equal(out[:8], frames(0, 8))
+    assert not out[8:].any()
+
+
+def test_read_from_empty_buffer():
+    ring = RingBuffer(4, 1)
+    assert ring.read_into(np.zeros((4, 1), dtype='float32')) == 0
+
+
+def test_clear_discards_pending_frames():
+    ring = RingBuffer(8, 1, dtype='int16')
+    ring.write(np.ones((5, 1), dtype='int16'))
+    ring.clear()
+    assert ring.readable() == 0 and ring.writable() == 8
+    ring.write(np.arange(3, dtype='int16')[:, None])
+    out = np.zeros((3, 1), dtype='int16')
+    assert ring.read_into(out) == 3
+    assert out[:, 0].tolist() == [0, 1, 2]
+    assert ring.dtype == np.int16
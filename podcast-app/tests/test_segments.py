@@ -0,0 +1,68 @@
+import os
+import json
+import numpy as np
+from audio_io import SegmentedAudio, load_manifest, open_audio
+from segments import delete_audio, manifest_for, open_writer, parts_dir, recover
+
+SAMPLERATE = 1000
+SEGMENT_SECONDS = 0.1  # 100 frames por tramo
+
+
+def ramp(frames):
+    return np.linspace(-0.5, 0.5, frames, dtype=np.float32)[:, None]
+
+
+def record(path, data):
+    with open_writer(path, SAMPLERATE, 1, 'FLOAT', SEGMENT_SECONDS) as writer:
+        # Bloques que no coinciden con los tramos: alguno cruza el límite
+        for chunk in np.array_split(data, [30, 170, 171, 300]):
+            writer.write(chunk)
+    return writer.filename
+
+
+def test_segments_rotate_and_read_as_one_recording(tmp_path):
+    data = ramp(350)
+    manifest = record(str(tmp_path / "rec.wav"), data)
+    assert manifest == manifest_for(str(tmp_path / "rec.wav"))
+    info = load_manifest(manifest)
+    assert info["complete"]
+    assert [seg["frames"] for seg in info["segments"]] == [100, 100, 100, 50]
+    assert sorted(os.listdir(parts_dir(manifest))) == ["0000.wav", "0001.wav", "0002.wav", "0003.wav"]
+
+    with open_audio(manifest) as audio:
+        assert isinstance(audio, SegmentedAudio)
+        assert audio.frames == 350
+        assert np.array_equal(audio.read(0, 350), data)
+        assert np.array_equal(audio.read(95, 205), data[95:205])
+
+    delete_audio(manifest)
+    assert not os.path.exists(manifest) and not os.path.exists(parts_dir(manifest))
+
+
+def test_recover_closes_an_interrupted_recording(tmp_path):
+    data = ramp(250)
+    manifest = record(str(tmp_path / "rec.wav"), data)
+    # Como si el proceso hubiera muerto: manifiesto sin cerrar y con los frames del
+    # último flush, cabecera del último tramo sin tamaños y un tramo que no llegó a crearse
+    info = load_manifest(manifest)
+    info["complete"] = False
+    info["segments"][-1]["frames"] = 10
+    info["segments"].append({"file": info["segments"][-1]["file"].replace("0002", "0003"), "frames": 0})
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    last = os.path.join(parts_dir(manifest), "0002.wav")
+    with open(last, "r+b") as f:
+        raw = f.read()
+        f.seek(4)
+        f.write(b"\0\0\0\0")
+        f.seek(raw.index(b"data") + 4)
+        f.write(b"\0\0\0\0")
+
+    assert recover(manifest)
+    info = load_manifest(manifest)
+    assert info["complete"]
+    assert [seg["frames"] for seg in info["segments"]] == [100, 100, 50]
+    with open_audio(manifest) as audio:
+        assert np.array_equal(audio.read(0, audio.frames), data)
+    # Ya estaba completa: no hay nada más que hacer
+    assert not recover(manifest)
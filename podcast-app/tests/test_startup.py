@@ -0,0 +1,70 @@
+import io
+import os
+import sys
+import subprocess
+import pytest
+import startup_profile
+from db import RecordingRepository
+from startup_loader import StartupLoader
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def test_main_window_module_only_needs_qt():
+    # Lo pesado (numpy, pyqtgraph, soundfile, PortAudio) se carga después de mostrar la ventana
+    code = ("import sys, ui_main; "
+            "print(sorted(m for m in ('numpy', 'pyqtgraph', 'soundfile', 'sounddevice') "
+            "if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True,
+                         text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+@pytest.fixture
+def loader(qapp, tmp_path):
+    repo = RecordingRepository(str(tmp_path / "podcast.db"))
+    repo.init_schema()
+    repo.add_many([(f"{i}.wav", "", "", None) for i in range(5)])
+    loader = StartupLoader(repo, page_size=3)
+    events = {}
+    loader.catalogReady.connect(lambda page: events.setdefault("catalog", page))
+    loader.catalogFailed.connect(lambda error: events.setdefault("catalog", error))
+    loader.deviceReady.connect(lambda info: events.setdefault("device", info))
+    loader.deviceFailed.connect(lambda error: events.setdefault("device", error))
+    loader.events = events
+    yield loader
+    loader.pool.waitForDone()
+
+
+def test_catalog_and_device_load_in_the_background(loader, wait_for):
+    loader.start()
+    wait_for(lambda: len(loader.events) == 2)
+    assert len(loader.events["catalog"]) == 3
+    assert loader.events["device"]["name"] == "fake"
+
+
+def test_missing_portaudio_is_reported(loader, wait_for, monkeypatch):
+    # import sounddevice falla (como sin la biblioteca PortAudio): la ventana sigue
+    monkeypatch.setitem(sys.modules, "sounddevice", None)
+    loader.start()
+    wait_for(lambda: len(loader.events) == 2)
+    assert isinstance(loader.events["device"], str)
+    assert len(loader.events["catalog"]) == 3
+
+
+def test_profile_reports_imports_and_marks(tmp_path, monkeypatch):
+    (tmp_path / "modulo_de_prueba.py").write_text("VALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    startup_profile.enable()
+    try:
+        monkeypatch.setattr(startup_profile, "MIN_IMPORT_MS", 0.0)
+        import modulo_de_prueba  # noqa: F401
+        startup_profile.mark("ventana creada")
+    finally:
+        out = io.StringIO()
+        startup_profile.report(out)
+    assert "modulo_de_prueba" in out.getvalue()
+    assert "ventana creada" in out.getvalue()
+    # report() deja de medir
+    assert not startup_profile.enabled()
+    monkeypatch.delitem(sys.modules, "modulo_de_prueba")
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+import numpy as np
+import pytest
+import soundfile as sf
+from analysis import analyze
+from db import RecordingRepository
+from waveform_loader import WaveformLoader
+
+SAMPLERATE = 8000
+
+
+def write(path, seconds):
+    sf.write(str(path), np.zeros(int(seconds * SAMPLERATE), dtype='float32'), SAMPLERATE)
+    return str(path)
+
+
+@pytest.fixture
+def loader(qapp):
+    loader = WaveformLoader(delay_ms=10)
+    events = []
+    loader.ready.connect(lambda f, peaks, preview: events.append(("ready", f, preview)))
+    loader.missing.connect(lambda f: events.append(("missing", f, None)))
+    loader.failed.connect(lambda f, error: events.append(("failed", f, None)))
+    loader.events = events
+    yield loader
+    loader.cancel()
+    loader.pool.waitForDone()
+
+
+def test_only_the_last_request_is_delivered(tmp_path, loader, wait_for):
+    a = write(tmp_path / "a.wav", 5)
+    b = write(tmp_path / "b.wav", 5)
+    loader.request(a)
+    loader.request(b)
+    wait_for(lambda: ("ready", b, False) in loader.events)
+    # Primero la vista previa y luego la pirámide completa, y nada de 'a'
+    assert loader.events == [("ready", b, True), ("ready", b, False)]
+
+
+def test_results_of_a_stale_request_are_dropped(tmp_path, loader, wait_for, qapp):
+    a = write(tmp_path / "a.wav", 600)
+    b = write(tmp_path / "b.wav", 1)
+    loader.request(a)
+    wait_for(lambda: ("ready", a, True) in loader.events)
+    del loader.events[:]
+    loader.request(b)
+    wait_for(lambda: ("ready", b, False) in loader.events)
+    # La pirámide de 'a' (si llegó a terminarse) se emitió con una generación vieja
+    loader.pool.waitForDone()
+    qapp.processEvents()
+    assert all(f == b for _, f, _ in loader.events)
+
+
+def test_missing_and_unreadable_files(tmp_path, loader, wait_for):
+    gone = str(tmp_path / "borrado.wav")
+    loader.request(gone)
+    wait_for(lambda: loader.events)
+    assert loader.events == [("missing", gone, None)]
+
+    broken = tmp_path / "roto.wav"
+    broken.write_bytes(b"esto no es audio")
+    loader.request(str(broken))
+    wait_for(lambda: len(loader.events) == 2)
+    assert loader.events[1] == ("failed", str(broken), None)
+
+
+def test_cancel_drops_the_pending_request(tmp_path, loader, wait_for, qapp):
+    loader.request(write(tmp_path / "a.wav", 1))
+    loader.cancel()
+    deadline = time.monotonic() + 0.1  # más que el retardo de agrupación
+    while time.monotonic() < deadline:
+        qapp.processEvents()
+    loader.pool.waitForDone()
+    qapp.processEvents()
+    assert loader.events == []
+
+
+def test_details_are_read_in_the_pool_before_the_waveform(tmp_path, qapp, wait_for, monkeypatch):
+    filename = str(tmp_path / "a.wav")
+    t = np.arange(5 * SAMPLERATE) / SAMPLERATE
+    sf.write(filename, (0.3 * np.sin(2 * np.pi * 200 * t) * (t % 2 < 1)).astype(np.float32), SAMPLERATE)
+    repo = RecordingRepository(str(tmp_path / "podcast.db"))
+    repo.init_schema()
+    repo.add(filename)
+    repo.update_stats_many([(filename, os.stat(filename).st_mtime_ns, analyze(filename))])
+    repo.set_edits(filename, [(filename, 0, 8000), (filename, 16000, 40000)])
+    threads = []
+    regions = repo.regions
+    monkeypatch.setattr(repo, "regions", lambda f: threads.append(threading.current_thread()) or regions(f))
+
+    loader = WaveformLoader(delay_ms=10, repo=repo)
+    events = []
+    loader.details.connect(lambda f, details: events.append(("details", details)))
+    loader.ready.connect(lambda f, peaks, preview: events.append(("ready", preview)))
+    loader.request(filename)
+    wait_for(lambda: ("ready", False) in events)
+    loader.pool.waitForDone()
+
+    assert threads and threading.main_thread() not in threads
+    kind, details = events[0]
+    assert kind == "details"
+    assert details["regions"] == regions(filename) != []
+    assert [tuple(clip) for clip in details["edits"]] == [(filename, 0, 8000), (filename, 16000, 40000)]
+    assert (details["samplerate"], details["frames"]) == (SAMPLERATE, 5 * SAMPLERATE)
+    # La miniatura guardada, la vista previa y la pirámide completa, en ese orden
+    assert details["thumbnail"]
+    assert events[1:] == [("ready", True), ("ready", True), ("ready", False)]
@@ -0,0 +1,104 @@
+import threading
+import numpy as np
+import pytest
+import soundfile as sf
+import waveform_widget
+from audio_io import open_audio
+from peaks import build_peaks
+from waveform_widget import ScopeHistory, WaveformWidget
+
+SAMPLERATE = 8000
+
+
+def pairs(values):
+    """Pares (min, max) con min = -v y max = v"""
+    values = np.asarray(values, dtype=np.float32)
+    return np.column_stack((-values, values))
+
+
+def test_points_are_grouped_one_bucket_per_pixel():
+    history = ScopeHistory(points=12, group=3)
+    assert history.size == 4
+    # 2 pares no completan la cubeta: se guardan para la siguiente llamada
+    assert history.push(pairs([1, 2])) == 0
+    assert history.count == 0
+    assert history.push(pairs([3, 4, 5, 6, 7])) == 2
+    mins, maxs = history.window()
+    assert maxs[-2:].tolist() == [3, 6]
+    assert mins[-2:].tolist() == [-3, -6]
+
+
+def test_window_wraps_around_without_copies():
+    history = ScopeHistory(points=4)
+    for value in range(1, 11):
+        history.push(pairs([value]))
+    mins, maxs = history.window()
+    # Los últimos 'size' valores, del más viejo al más nuevo, y son vistas del array
+    assert maxs.tolist() == [7, 8, 9, 10]
+    assert np.shares_memory(maxs, history.maxs) and np.shares_memory(mins, history.mins)
+    assert history.count == 10
+
+
+def test_a_push_longer_than_the_window_keeps_the_newest():
+    history = ScopeHistory(points=4)
+    history.push(pairs([1]))
+    assert history.push(pairs(range(100, 110))) == 4
+    assert history.window()[1].tolist() == [106, 107, 108, 109]
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Cuenta las lecturas de muestras del widget y en qué hilo se hacen"""
+    calls = []
+
+    def counting_open(filename):
+        audio = open_audio(filename)
+        read = audio.read
+
+        def counted(start, stop, out=None):
+            calls.append((start, stop, threading.current_thread()))
+            return read(start, stop, out)
+        audio.read = counted
+        return audio
+    monkeypatch.setattr(waveform_widget, "open_audio", counting_open)
+    return calls
+
+
+@pytest.fixture
+def widget(tmp_path, qapp):
+    filename = str(tmp_path / "voz.wav")
+    t = np.arange(SAMPLERATE * 60) / SAMPLERATE
+    sf.write(filename, (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), SAMPLERATE)
+    widget = WaveformWidget()
+    widget.resize(800, 300)
+    widget.show_peaks(build_peaks(filename), filename)
+    yield widget
+    widget.clear()
+    widget._sample_loader.pool.waitForDone()
+
+
+def test_zoomed_in_samples_are_read_off_the_gui_thread(widget, reads, wait_for):
+    widget.setXRange(30.0, 30.05, padding=0)
+    widget._draw_peaks()
+    # Mientras llegan se pinta la pirámide, sin tocar el archivo aquí
+    assert widget._samples is None
+    wait_for(lambda: widget._samples is not None)
+    assert len(reads) == 1 and reads[0][2] is not threading.main_thread()
+    x, y = widget._curve.getData()
+    first, last = widget._view_frames()
+    assert x[0] * SAMPLERATE <= first and x[-1] * SAMPLERATE >= last - 1
+
+
+def test_panning_inside_the_cached_window_does_no_io(widget, reads, wait_for):
+    widget.setXRange(30.0, 30.05, padding=0)
+    widget._draw_peaks()
+    wait_for(lambda: widget._samples is not None)
+    for start in (30.02, 29.98, 30.01):
+        widget.setXRange(start, start + 0.04, padding=0)
+        widget._draw_peaks()
+    assert len(reads) == 1 and widget._samples_wanted is None
+    # Fuera de la ventana sí se pide otra
+    widget.setXRange(40.0, 40.05, padding=0)
+    widget._draw_peaks()
+    wait_for(lambda: widget._samples[1] >= 40.05 * SAMPLERATE)
+    assert len(reads) == 2